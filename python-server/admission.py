@@ -0,0 +1,227 @@
+"""
+Admission control for expensive endpoints
+Each endpoint class (analysis, hull, mlip) admits a bounded number of
+concurrent requests and queues a bounded number more, cheapest priority
+first; a full queue makes room for a cheaper request by displacing its
+most expensive waiter. Requests that cannot be admitted before their
+deadline, or that find the queue full, are rejected with 429 and a
+Retry-After estimate.
+Unclassified routes (lookups, stats, health) are never queued.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.routing import APIRoute
+
+import metrics
+from executor import POOL_CONFIG
+
+
+def _class_config(prefix: str, concurrent: int, queue: int, timeout: float) -> dict:
+    return {
+        "max_concurrent": int(os.environ.get(f"{prefix}_MAX_CONCURRENT", concurrent)),
+        "max_queue": int(os.environ.get(f"{prefix}_MAX_QUEUE", queue)),
+        "timeout": float(os.environ.get(f"{prefix}_TIMEOUT", timeout)),  # seconds, queueing + running
+    }
+
+
+# Concurrency defaults follow the pool sizes so the priority queue, not the
+# pools' FIFO queues, decides what runs next
+ADMISSION_CONFIG = {
+    "analysis": _class_config("ANALYSIS", 2 * POOL_CONFIG["analysis"]["workers"], 64, 60),
+    "hull": _class_config("HULL", POOL_CONFIG["hull"]["workers"], 16, 120),
+    "mlip": _class_config("MLIP", POOL_CONFIG["mlip"]["workers"], 16, 300),
+}
+
+
+class DeadlineExceeded(Exception):
+    """Raised inside work that has run past its request deadline"""
+
+
+class Saturated(Exception):
+    """Raised when a request cannot be admitted"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionQueue:
+    """Concurrency slots plus a bounded priority queue of waiters (lower priority value first)"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, timeout: float):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._avg_seconds = 1.0  # moving average of slot hold time
+        self.counters = {"admitted": 0, "queued": 0, "displaced": 0, "rejected_full": 0, "rejected_deadline": 0}
+
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up for a new request"""
+        ahead = self.waiting() + 1
+        return max(1, math.ceil(self._avg_seconds * ahead / self.max_concurrent))
+
+    async def acquire(self, priority: int, deadline: float):
+        if self.active < self.max_concurrent and not self.waiting():
+            self.active += 1
+            self.counters["admitted"] += 1
+            return
+        if self.waiting() >= self.max_queue and not self._displace(priority):
+            self.counters["rejected_full"] += 1
+            raise Saturated(f"{self.name} queue is full", self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self.counters["queued"] += 1
+        try:
+            await asyncio.wait_for(future, max(0.0, deadline - time.time()))
+        except asyncio.TimeoutError:
+            self.counters["rejected_deadline"] += 1
+            raise Saturated(f"{self.name} deadline passed while queued", self.retry_after())
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(0.0)  # the slot was handed over as the client went away
+            raise
+        self.counters["admitted"] += 1
+
+    def _displace(self, priority: int) -> bool:
+        """Reject the last-in, lowest-priority waiter to make room for a higher-priority request"""
+        pending = [w for w in self._waiters if not w[2].done()]
+        if not pending:
+            return False
+        worst = max(pending, key=lambda w: (w[0], w[1]))
+        if worst[0] <= priority:
+            return False
+        worst[2].set_exception(Saturated(f"{self.name} queue is full (displaced by a cheaper request)",
+                                         self.retry_after()))
+        self.counters["displaced"] += 1
+        return True
+
+    def release(self, held_seconds: float):
+        if held_seconds > 0:
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * held_seconds
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)  # hand the slot over
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "active": self.active,
+            "waiting": self.waiting(),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "timeout_s": self.timeout,
+            "avg_hold_s": round(self._avg_seconds, 3),
+        }
+
+
+class AdmissionControl:
+    """Endpoint classes and the route -> (class, priority) table"""
+
+    def __init__(self, routes: Dict[str, Tuple[str, int]], config: Optional[dict] = None):
+        config = config or ADMISSION_CONFIG
+        self.routes = routes
+        self.queues = {name: AdmissionQueue(name, **cfg) for name, cfg in config.items()}
+
+    def policy(self, path: str) -> Optional[Tuple[AdmissionQueue, int]]:
+        entry = self.routes.get(path)
+        if entry is None:
+            return None
+        name, priority = entry
+        return self.queues[name], priority
+
+    def stats(self) -> dict:
+        return {name: queue.stats() for name, queue in self.queues.items()}
+
+
+def request_deadline(request: Request, timeout: float) -> float:
+    """
+    Absolute (epoch) deadline: the class timeout, or sooner if the client
+    sends X-Request-Timeout (seconds)
+    """
+    requested = request.headers.get("x-request-timeout")
+    if requested:
+        try:
+            timeout = min(timeout, max(0.0, float(requested)))
+        except ValueError:
+            pass
+    return time.time() + timeout
+
+
+def admission_route(control: AdmissionControl, base: type = APIRoute) -> type:
+    """Route class that admits requests to classified routes before running them"""
+
+    class AdmissionRoute(base):
+        def get_route_handler(self) -> Callable:
+            handler = super().get_route_handler()
+            policy = control.policy(self.path)
+            if policy is None:
+                return handler
+            queue, priority = policy
+
+            async def route_handler(request: Request) -> Response:
+                deadline = request_deadline(request, queue.timeout)
+                request.state.deadline = deadline
+                try:
+                    with metrics.stage("queue"):
+                        await queue.acquire(priority, deadline)
+                except Saturated as e:
+                    metrics.inc(metrics.ADMISSION_REJECTED.name, **{"class": queue.name})
+                    return JSONResponse(status_code=429, content={"detail": str(e), "retry_after": e.retry_after},
+                                        headers={"Retry-After": str(e.retry_after)})
+
+                start = time.perf_counter()
+                try:
+                    response = await handler(request)
+                except BaseException:
+                    queue.release(time.perf_counter() - start)
+                    raise
+                if isinstance(response, StreamingResponse):
+                    return _HeldSlot(response, queue, start)
+                queue.release(time.perf_counter() - start)
+                return response
+
+            return route_handler
+
+    return AdmissionRoute
+
+
+class _HeldSlot:
+    """
+    Streamed response that holds the slot until it is sent. The slot is
+    released however sending ends: completed, failed, or the client went
+    away before the first chunk (when the body iterator never starts)
+    """
+
+    def __init__(self, response: StreamingResponse, queue: AdmissionQueue, start: float):
+        self.response = response
+        self.queue = queue
+        self.start = start
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.response(scope, receive, send)
+        finally:
+            self.queue.release(time.perf_counter() - self.start)
@@ -0,0 +1,309 @@
+"""
+Computation server benchmark suite
+Runs offline against the in-process FastAPI app with a fixture-backed
+MPRester stand-in and a deterministic calculator in place of UPET, then
+reports latency percentiles and throughput per case.
+
+    python benchmarks/bench.py                          # all suites
+    python benchmarks/bench.py --suite analyze --repeat 20
+    python benchmarks/bench.py --compare benchmarks/results/<old>.json
+    python benchmarks/bench.py --record fixture.json.gz  # needs MP_API_KEY
+
+Results are written as JSON (one record per case plus run metadata) to
+benchmarks/results/<commit>.json unless --output is given.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(HERE)
+sys.path.insert(0, SERVER_DIR)
+sys.path.insert(0, HERE)
+
+# Deterministic server configuration, set before main is imported
+os.environ.setdefault("MLIP_PRELOAD", "")
+os.environ.setdefault("WARM_IMPORTS", "analysis,conversion,phase_diagram,mlip")
+os.environ.setdefault("MP_API_KEY", "offline-benchmark")
+
+SUITES = ("analyze", "convert", "phase_diagram", "mlip")
+
+
+# ============ Measurement ============
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Linear-interpolated percentile of an already sorted list"""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    pos = (len(sorted_values) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def measure(fn: Callable[[], None], repeat: int, warmup: int, reset: Optional[Callable[[], None]] = None) -> dict:
+    """Call fn warmup + repeat times; latency stats over the timed calls"""
+    for _ in range(warmup):
+        if reset:
+            reset()
+        fn()
+
+    latencies = []
+    for _ in range(repeat):
+        if reset:
+            reset()
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+
+    ordered = sorted(latencies)
+    total = sum(latencies)
+    ms = lambda v: round(v * 1000, 3)
+    return {
+        "n": repeat,
+        "warmup": warmup,
+        "latency_ms": {
+            "mean": ms(total / repeat),
+            "stdev": ms(statistics.stdev(latencies)) if repeat > 1 else 0.0,
+            "min": ms(ordered[0]),
+            "p50": ms(percentile(ordered, 50)),
+            "p90": ms(percentile(ordered, 90)),
+            "p99": ms(percentile(ordered, 99)),
+            "max": ms(ordered[-1]),
+        },
+        "throughput_per_s": round(repeat / total, 3) if total > 0 else None,
+    }
+
+
+def post_ok(client, path: str, payload: dict) -> Callable[[], None]:
+    def call():
+        response = client.post(path, json=payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.text[:200]}")
+    return call
+
+
+# ============ Suites ============
+
+def rock_salt(supercell: int = 1, rattle: float = 0.0):
+    """Conventional NaCl cell; rattle displaces sites by a fixed-seed random amount (Angstrom)"""
+    import numpy as np
+    from pymatgen.core import Lattice, Structure
+
+    structure = Structure.from_spacegroup("Fm-3m", Lattice.cubic(5.69), ["Na", "Cl"],
+                                          [[0, 0, 0], [0.5, 0.5, 0.5]])
+    structure.make_supercell([supercell] * 3)
+    if rattle:
+        rng = np.random.default_rng(0)
+        for i in range(len(structure)):
+            structure.translate_sites([i], rng.normal(scale=rattle, size=3), frac_coords=False)
+    return structure
+
+
+def bench_analyze(ctx: dict) -> List[dict]:
+    """analyze_structure over supercells, symmetric and with rattled positions"""
+    import main
+
+    cases = []
+    for n in ctx["sizes"]:
+        for rattled in (False, True):
+            # Rattling breaks symmetry, so every site is distinct
+            structure = rock_salt(n, rattle=0.05 if rattled else 0.0)
+            label = f"analyze_structure/{len(structure)}_sites" + ("/rattled" if rattled else "")
+            stats = measure(lambda: main.analyze_structure(structure), ctx["repeat"], ctx["warmup"])
+            cases.append({"case": label, "params": {"supercell": n, "rattled": rattled}, **stats})
+    return cases
+
+
+def bench_convert(ctx: dict) -> List[dict]:
+    """/convert across every ordered pair of supported formats with a periodic source"""
+    from conversion import FORMATS, write_frame
+
+    structure = rock_salt()
+    cases = []
+    for src in FORMATS:
+        if src == "xyz":  # plain XYZ carries no cell, so it cannot become a periodic structure
+            continue
+        content = write_frame(structure, src)
+        for dst in FORMATS:
+            if src == dst:
+                continue
+            payload = {"content": content, "from_format": src, "to_format": dst}
+            stats = measure(post_ok(ctx["client"], "/convert", payload), ctx["repeat"], ctx["warmup"])
+            cases.append({"case": f"convert/{src}->{dst}", "params": {"from": src, "to": dst}, **stats})
+    return cases
+
+
+def bench_phase_diagram(ctx: dict) -> List[dict]:
+    """/phase-diagram for 2-, 3- and 4-element systems, hull cache cleared before every call"""
+    import main
+    from hull import HullCache
+
+    def reset():
+        main.result_cache.clear()
+        main.hull_cache = HullCache(max_hulls=main.hull_cache.max_hulls)
+
+    cases = []
+    for elements in (["Li", "O"], ["Li", "Fe", "O"], ["Li", "Fe", "P", "O"]):
+        stats = measure(post_ok(ctx["client"], "/phase-diagram", {"elements": elements}),
+                        ctx["repeat"], ctx["warmup"], reset=None if ctx["warm_cache"] else reset)
+        cases.append({"case": f"phase_diagram/{len(elements)}_elements",
+                      "params": {"elements": elements}, **stats})
+    return cases
+
+
+def bench_mlip(ctx: dict) -> List[dict]:
+    """/mlip/energy and /mlip/relax with the deterministic calculator"""
+    import main
+    from pymatgen.io.cif import CifWriter
+
+    reset = None if ctx["warm_cache"] else main.result_cache.clear
+    cases = []
+    for n in (1, 2):
+        structure = rock_salt(n)
+        cif = str(CifWriter(structure))
+        stats = measure(post_ok(ctx["client"], "/mlip/energy", {"cif_string": cif}),
+                        ctx["repeat"], ctx["warmup"], reset=reset)
+        cases.append({"case": f"mlip/energy/{len(structure)}_atoms", "params": {"supercell": n}, **stats})
+
+    structure = rock_salt(rattle=0.1)
+    payload = {"cif_string": str(CifWriter(structure)), "fmax": 0.05, "steps": 50}
+    stats = measure(post_ok(ctx["client"], "/mlip/relax", payload), ctx["repeat"], ctx["warmup"], reset=reset)
+    cases.append({"case": "mlip/relax/perturbed_rock_salt", "params": {"fmax": 0.05, "steps": 50}, **stats})
+    return cases
+
+
+SUITE_FUNCTIONS = {
+    "analyze": bench_analyze,
+    "convert": bench_convert,
+    "phase_diagram": bench_phase_diagram,
+    "mlip": bench_mlip,
+}
+
+
+# ============ Results ============
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def metadata(args) -> dict:
+    import ase
+    import numpy
+    import pymatgen.core
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": {"pymatgen": pymatgen.core.__version__, "ase": ase.__version__, "numpy": numpy.__version__},
+        "config": {"repeat": args.repeat, "warmup": args.warmup, "warm_cache": args.warm_cache,
+                   "fixture": args.fixture or "synthetic"},
+    }
+
+
+def print_table(results: List[dict]):
+    print(f"{'case':<44} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'ops/s':>10}")
+    for r in results:
+        lat = r["latency_ms"]
+        print(f"{r['suite'] + ':' + r['case']:<44} {lat['p50']:>10.2f} {lat['p90']:>10.2f} "
+              f"{lat['p99']:>10.2f} {r['throughput_per_s'] or 0:>10.2f}")
+
+
+def compare(results: List[dict], baseline_path: str, threshold: float) -> int:
+    """Print p50 changes against a previous results file; returns the number of regressions"""
+    with open(baseline_path) as f:
+        baseline = {(r["suite"], r["case"]): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    print(f"\nAgainst {baseline_path} (regression threshold {threshold:.0%} on p50)")
+    print(f"{'case':<44} {'old p50':>10} {'new p50':>10} {'change':>9}")
+    for r in results:
+        old = baseline.get((r["suite"], r["case"]))
+        if old is None:
+            print(f"{r['suite'] + ':' + r['case']:<44} {'-':>10} {r['latency_ms']['p50']:>10.2f} {'new':>9}")
+            continue
+        before, after = old["latency_ms"]["p50"], r["latency_ms"]["p50"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{r['suite'] + ':' + r['case']:<44} {before:>10.2f} {after:>10.2f} {change:>+9.1%}{flag}")
+    return regressions
+
+
+# ============ Entry point ============
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--suite", action="append", choices=SUITES, help="Suites to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed calls per case")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed calls per case")
+    parser.add_argument("--sizes", default="1,2,3", help="Supercell multipliers for the analyze suite")
+    parser.add_argument("--warm-cache", action="store_true", help="Keep result/hull caches between calls")
+    parser.add_argument("--fixture", help="MP store snapshot to serve (default: synthetic data set)")
+    parser.add_argument("--output", help="Results JSON path (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p50 slowdown counted as regression")
+    parser.add_argument("--record", metavar="PATH", help="Record a fixture snapshot from the live API and exit")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        from fixtures import record_snapshot
+        record_snapshot(args.record, os.environ.get("MP_API_KEY", ""))
+        print(f"✓ Fixture recorded to {args.record}")
+        return 0
+
+    from fastapi.testclient import TestClient
+    from fixtures import DeterministicCalculator, FixtureMPRester, synthetic_mprester
+    from mp_store import MPStore
+    import main
+
+    rester = FixtureMPRester.from_snapshot(args.fixture) if args.fixture else synthetic_mprester()
+    main.mp_store = MPStore(client_factory=lambda: rester)
+    main.model_registry.loader = lambda spec: DeterministicCalculator()
+
+    ctx = {
+        "repeat": max(1, args.repeat),
+        "warmup": max(0, args.warmup),
+        "warm_cache": args.warm_cache,
+        "sizes": [int(n) for n in args.sizes.split(",")],
+    }
+    results = []
+    with TestClient(main.app) as client:
+        ctx["client"] = client
+        while client.get("/health/ready").status_code != 200:
+            time.sleep(0.1)
+        for suite in args.suite or SUITES:
+            print(f"Running {suite}...", file=sys.stderr)
+            for case in SUITE_FUNCTIONS[suite](ctx):
+                results.append({"suite": suite, **case})
+
+    print_table(results)
+    output = args.output or os.path.join(HERE, "results", f"{git_commit()}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"meta": metadata(args), "results": results}, f, indent=2)
+    print(f"✓ Results written to {output}")
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,163 @@
+"""
+Offline stand-ins for the benchmark suite
+A fixture-backed MPRester replacement (recorded MP store snapshots or a
+deterministic synthetic data set) and a deterministic ASE calculator used
+in place of UPET
+"""
+
+import gzip
+import itertools
+import json
+import zlib
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from ase.calculators.calculator import all_changes
+from ase.calculators.lj import LennardJones
+from ase.data import atomic_numbers, covalent_radii
+from monty.json import MontyDecoder
+
+# Chemical systems and materials the suite queries (and --record captures)
+BENCH_CHEMSYS = ["Li-O", "Fe-Li-O", "Fe-Li-O-P"]
+BENCH_MATERIAL_IDS = ["mp-22862", "mp-149", "mp-13"]  # NaCl, Si, Fe
+
+# Elemental reference energies (eV/atom) of the synthetic data set
+_SYNTHETIC_REFS = {"Li": -1.91, "Fe": -8.47, "P": -5.41, "O": -4.95}
+
+
+class _FixtureSummary:
+    def __init__(self, rester: "FixtureMPRester"):
+        self._rester = rester
+
+    def search(self, material_ids: List[str], fields: Optional[List[str]] = None):
+        self._rester.calls += 1
+        return [
+            SimpleNamespace(material_id=mid, structure=self._rester.structures[mid])
+            for mid in material_ids if mid in self._rester.structures
+        ]
+
+
+class FixtureMPRester:
+    """
+    Serves the two MPRester calls the server makes from fixture data:
+    materials.summary.search (structures by material_id) and
+    get_entries_in_chemsys (any subsystem of a recorded chemsys)
+    """
+
+    def __init__(self, entries: list, structures: Optional[Dict[str, object]] = None):
+        self.entries = entries
+        self.structures = structures or {}
+        self.calls = 0
+        self.materials = SimpleNamespace(summary=_FixtureSummary(self))
+        self.session = SimpleNamespace(close=lambda: None)
+
+    @classmethod
+    def from_snapshot(cls, path: str) -> "FixtureMPRester":
+        """Load a snapshot written by MPStore.save_snapshot (e.g. via --record)"""
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt") as f:
+            data = json.load(f)
+        decoder = MontyDecoder()
+        entries, seen = [], set()
+        for record in data.get("entries", {}).values():
+            for entry in decoder.process_decoded(record["value"]):
+                key = entry.entry_id or (entry.composition.formula, entry.energy)
+                if key not in seen:
+                    seen.add(key)
+                    entries.append(entry)
+        structures = {
+            mid: decoder.process_decoded(record["value"])
+            for mid, record in data.get("structures", {}).items()
+        }
+        return cls(entries, structures)
+
+    def get_entries_in_chemsys(self, elements: Iterable[str]) -> list:
+        self.calls += 1
+        allowed = set(elements)
+        return [e for e in self.entries if {str(el) for el in e.composition.elements} <= allowed]
+
+
+def _seeded(text: str) -> np.random.Generator:
+    return np.random.default_rng(zlib.crc32(text.encode()))
+
+
+def synthetic_entries(elements: Iterable[str] = tuple(_SYNTHETIC_REFS), max_atoms: int = 6,
+                      polymorphs: int = 2) -> list:
+    """
+    Deterministic ComputedEntry set: every integer composition up to
+    max_atoms atoms per formula unit, a few polymorphs each, with formation
+    energies drawn from a generator seeded by the formula
+    """
+    from pymatgen.core import Composition
+    from pymatgen.entries.computed_entries import ComputedEntry
+
+    elements = sorted(elements)
+    entries = []
+    for el in elements:
+        for k in range(polymorphs):
+            entries.append(ComputedEntry(el, _SYNTHETIC_REFS[el] + 0.05 * k, entry_id=f"synthetic-{el}-{k}"))
+
+    for n in range(2, len(elements) + 1):
+        for subset in itertools.combinations(elements, n):
+            for counts in itertools.product(range(1, max_atoms + 1), repeat=n):
+                if sum(counts) > max_atoms:
+                    continue
+                comp = Composition(dict(zip(subset, counts)))
+                if comp.get_reduced_composition_and_factor()[1] != 1:
+                    continue
+                formula = comp.formula.replace(" ", "")
+                rng = _seeded(formula)
+                reference = sum(_SYNTHETIC_REFS[str(el)] * amt for el, amt in comp.items())
+                for k in range(polymorphs):
+                    e_form = rng.uniform(-1.5, 0.3) * comp.num_atoms
+                    entries.append(ComputedEntry(comp, reference + e_form, entry_id=f"synthetic-{formula}-{k}"))
+    return entries
+
+
+def synthetic_structures() -> Dict[str, object]:
+    from pymatgen.core import Lattice, Structure
+
+    return {
+        "mp-22862": Structure.from_spacegroup("Fm-3m", Lattice.cubic(5.69), ["Na", "Cl"],
+                                              [[0, 0, 0], [0.5, 0.5, 0.5]]),
+        "mp-149": Structure.from_spacegroup("Fd-3m", Lattice.cubic(5.47), ["Si"], [[0, 0, 0]]),
+        "mp-13": Structure.from_spacegroup("Im-3m", Lattice.cubic(2.84), ["Fe"], [[0, 0, 0]]),
+    }
+
+
+def synthetic_mprester() -> FixtureMPRester:
+    return FixtureMPRester(synthetic_entries(), synthetic_structures())
+
+
+def record_snapshot(path: str, api_key: str):
+    """Fetch BENCH_CHEMSYS and BENCH_MATERIAL_IDS from the live API into a fixture snapshot"""
+    from mp_store import MPStore
+
+    store = MPStore(api_key=api_key)
+    for chemsys in BENCH_CHEMSYS:
+        store.get_entries(chemsys.split("-"))
+    store.get_structures(BENCH_MATERIAL_IDS)
+    store.save_snapshot(path)
+    store.close()
+
+
+class DeterministicCalculator(LennardJones):
+    """
+    UPET stand-in: Lennard-Jones with sigma set from the covalent radii of
+    the structure being evaluated, so relaxations converge near physical
+    bond lengths. Energy, forces and stress depend only on the input.
+    """
+
+    def __init__(self, epsilon: float = 0.1, **kwargs):
+        super().__init__(epsilon=epsilon, sigma=2.0, rc=6.0, **kwargs)
+
+    def calculate(self, atoms=None, properties=None, system_changes=all_changes):
+        symbols = (atoms if atoms is not None else self.atoms).get_chemical_symbols()
+        sigma = 2 * float(np.mean([covalent_radii[atomic_numbers[s]] for s in symbols])) / 2 ** (1 / 6)
+        if sigma != self.parameters.sigma:
+            self.parameters.sigma = sigma
+            self.parameters.rc = 3 * sigma
+            self.parameters.ro = 0.66 * self.parameters.rc
+            self.nl = None
+        super().calculate(atoms, properties, system_changes)
@@ -0,0 +1,179 @@
+"""
+Content-addressed result cache
+Results are keyed by a structure fingerprint (canonical for scalar
+results, exact for orientation- or site-order-dependent ones) plus endpoint
+parameters and model version, with an in-memory LRU tier and an optional
+on-disk tier that survives restarts
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_TOLERANCE = 1e-3  # fractional coordinate / lattice quantization
+
+
+def text_digest(text: str) -> str:
+    """Digest of raw input text, used as a cheap alias before parsing"""
+    return "raw:" + hashlib.sha256(text.encode()).hexdigest()
+
+
+def structure_fingerprint(structure, tolerance: float = DEFAULT_TOLERANCE) -> str:
+    """
+    Canonical fingerprint of a structure.
+
+    Built from the Niggli-reduced lattice parameters, species and wrapped
+    fractional coordinates, all quantized to the given tolerance, so that
+    the same crystal written in a different site order or cell setting
+    maps to the same key.
+    """
+    reduced = structure.get_reduced_structure()
+    lattice = reduced.lattice
+    params = np.array(list(lattice.abc) + list(lattice.angles))
+
+    scale = int(round(1 / tolerance))
+    frac = np.rint(np.mod(reduced.frac_coords, 1.0) * scale).astype(np.int64) % scale
+    species = np.array([site.species_string for site in reduced])
+    order = np.lexsort((frac[:, 2], frac[:, 1], frac[:, 0], species))
+
+    h = hashlib.sha256()
+    h.update(f"tol={tolerance}".encode())
+    h.update(np.rint(params / tolerance).astype(np.int64).tobytes())
+    h.update("|".join(species[order]).encode())
+    h.update(frac[order].tobytes())
+    return h.hexdigest()
+
+
+def exact_fingerprint(structure, tolerance: float = DEFAULT_TOLERANCE) -> str:
+    """
+    Fingerprint of a structure exactly as submitted: lattice matrix, site
+    order, species and fractional coordinates. Used for results that depend
+    on the cell orientation or site order (lattice parameters, per-site
+    labels, force and stress arrays, Cij)
+    """
+    h = hashlib.sha256()
+    h.update(f"exact:tol={tolerance}".encode())
+    h.update(np.rint(structure.lattice.matrix / tolerance).astype(np.int64).tobytes())
+    h.update("|".join(site.species_string for site in structure).encode())
+    h.update(np.rint(structure.frac_coords / tolerance).astype(np.int64).tobytes())
+    return h.hexdigest()
+
+
+def make_key(endpoint: str, fingerprint: str, params: Optional[dict] = None, version: str = "") -> str:
+    """Cache key for an endpoint result"""
+    payload = json.dumps(
+        {"endpoint": endpoint, "structure": fingerprint, "params": params or {}, "version": version},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """Two-tier (memory LRU + optional disk) cache of JSON results"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 max_aliases: int = 10000):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_aliases = max_aliases
+        self._memory = OrderedDict()  # key -> serialized result
+        self._aliases = OrderedDict()  # raw input key -> canonical key
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "stores": 0}
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _remember(self, key: str, blob: bytes):
+        """Insert into the memory tier and evict least recently used entries"""
+        if len(blob) > self.max_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._memory[key] = blob
+        self._bytes += len(blob)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.counters["evictions"] += 1
+
+    def get(self, key: str, count_miss: bool = True) -> Optional[dict]:
+        with self._lock:
+            key = self._aliases.get(key, key)
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return json.loads(blob)
+
+            if self.disk_dir:
+                path = self._disk_path(key)
+                if os.path.exists(path):
+                    try:
+                        with open(path, "rb") as f:
+                            blob = f.read()
+                        value = json.loads(blob)
+                    except (OSError, ValueError):
+                        value = None
+                    if value is not None:
+                        self._remember(key, blob)
+                        self.counters["disk_hits"] += 1
+                        return value
+
+            if count_miss:
+                self.counters["misses"] += 1
+            return None
+
+    def put(self, key: str, value: dict):
+        blob = json.dumps(value).encode()
+        with self._lock:
+            self._remember(key, blob)
+            self.counters["stores"] += 1
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+
+    def alias(self, raw_key: str, key: str):
+        """Point a raw-input key at a canonical key"""
+        if raw_key == key:
+            return
+        with self._lock:
+            self._aliases[raw_key] = key
+            self._aliases.move_to_end(raw_key)
+            while len(self._aliases) > self.max_aliases:
+                self._aliases.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._aliases.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            hits = lookups - self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._memory),
+                "aliases": len(self._aliases),
+                "memory_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk_dir": self.disk_dir,
+            }
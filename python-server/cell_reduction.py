@@ -0,0 +1,101 @@
+"""
+Cell reduction for MLIP evaluation
+Evaluates a structure in its primitive (or Niggli-reduced) cell and maps
+the results back to the submitted cell: extensive energies scale by the
+number of primitive cells, forces are copied to the equivalent sites, and
+a relaxed reduced cell is expanded into the submitted setting
+"""
+
+import time
+from typing import Optional
+
+import numpy as np
+
+REDUCE_MODES = ("primitive", "niggli")
+
+SYMPREC = 1e-3  # fractional tolerance when finding the primitive cell and mapping sites
+
+
+class CellReduction:
+    """
+    Reduced cell of a structure plus the mapping back to it.
+
+    Reduced lattice vectors are integer combinations of the original ones in
+    the same Cartesian frame (original = matrix @ reduced), so cell strain
+    found in the reduced cell applies to the original cell unchanged.
+    """
+
+    def __init__(self, structure, mode: str = "primitive", tolerance: float = SYMPREC):
+        if mode not in REDUCE_MODES:
+            raise ValueError(f"Unknown cell reduction: {mode} (supported: {', '.join(REDUCE_MODES)})")
+        if not structure.is_ordered:
+            raise ValueError("Cell reduction needs an ordered structure")
+        self.mode = mode
+        self.original = structure
+        start = time.perf_counter()
+        reduced = structure.get_primitive_structure(tolerance=tolerance) if mode == "primitive" else structure
+        self.reduced = reduced.get_reduced_structure("niggli")
+        self.reduce_seconds = time.perf_counter() - start
+
+        matrix = structure.lattice.matrix @ np.linalg.inv(self.reduced.lattice.matrix)
+        self.matrix = np.rint(matrix).astype(int)
+        if not np.allclose(matrix, self.matrix, atol=1e-4):
+            raise ValueError("Reduced cell is not a sublattice of the submitted cell")
+        self.site_map, self.offsets = self._map_sites(tolerance)
+
+    @property
+    def factor(self) -> int:
+        """Reduced cells per original cell"""
+        return len(self.original) // len(self.reduced)
+
+    def _map_sites(self, tolerance: float):
+        """Reduced site and reduced-frame offset of every original site"""
+        coords = self.reduced.lattice.get_fractional_coords(self.original.cart_coords)
+        reduced_frac = self.reduced.frac_coords
+        species = [site.specie for site in self.reduced]
+        site_map = np.empty(len(self.original), dtype=int)
+        offsets = np.empty((len(self.original), 3))
+        for i, site in enumerate(self.original):
+            delta = coords[i] - reduced_frac
+            residual = np.abs(delta - np.rint(delta)).max(axis=1)
+            candidates = [j for j in np.argsort(residual) if species[j] == site.specie]
+            if not candidates or residual[candidates[0]] > 10 * tolerance:
+                raise ValueError(f"Site {i} has no equivalent in the reduced cell")
+            site_map[i] = candidates[0]
+            offsets[i] = delta[candidates[0]]
+        return site_map, offsets
+
+    def expand(self, relaxed):
+        """Original-cell structure from a relaxed reduced cell (same site order)"""
+        from pymatgen.core import Lattice, Structure
+
+        lattice = Lattice(self.matrix @ relaxed.lattice.matrix)
+        frac = relaxed.frac_coords[self.site_map] + self.offsets
+        cart = frac @ relaxed.lattice.matrix
+        return Structure(lattice, self.original.species, cart, coords_are_cartesian=True,
+                         site_properties=self.original.site_properties or None)
+
+    def expand_forces(self, forces: np.ndarray) -> np.ndarray:
+        return np.asarray(forces)[self.site_map]
+
+    def summary(self, elapsed: Optional[float] = None, full_cell_call_s: Optional[float] = None,
+                calls: int = 1) -> dict:
+        """
+        Report for the response. With the measured time of one full-cell
+        model call, speedup compares calls x that time against the reduced
+        run including the reduction itself
+        """
+        report = {
+            "mode": self.mode,
+            "original_atoms": len(self.original),
+            "reduced_atoms": len(self.reduced),
+            "cells_per_original": self.factor,
+            "reduction_s": round(self.reduce_seconds, 4),
+        }
+        if elapsed is not None:
+            report["elapsed_s"] = round(elapsed, 4)
+        if elapsed is not None and full_cell_call_s is not None:
+            full_cell_s = full_cell_call_s * calls
+            report["full_cell_estimate_s"] = round(full_cell_s, 4)
+            report["speedup"] = round(full_cell_s / (elapsed + self.reduce_seconds), 2)
+        return report
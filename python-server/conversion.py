@@ -0,0 +1,236 @@
+"""
+In-memory structure format conversion
+Splits multi-frame CIF, POSCAR and (ext)XYZ text (plain or inside tar/zip
+archives) into per-frame blocks lazily and converts frames through string
+buffers, without temp files
+"""
+
+import io
+import os
+import re
+import tarfile
+import zipfile
+from typing import Iterator, List, Optional, Tuple
+
+import metrics
+
+FORMATS = ("cif", "poscar", "xyz", "extxyz")
+
+_CIF_BLOCK = re.compile(r"^\s*data_", re.IGNORECASE)
+
+
+def normalize_format(fmt: str) -> str:
+    fmt = fmt.lower()
+    if fmt == "vasp":
+        fmt = "poscar"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt} (supported: {', '.join(FORMATS)})")
+    return fmt
+
+
+def _is_floats(line: str, n: int) -> bool:
+    parts = line.split()
+    if len(parts) != n:
+        return False
+    try:
+        [float(p) for p in parts]
+    except ValueError:
+        return False
+    return True
+
+
+def _next_nonblank(lines: Iterator[str]):
+    for line in lines:
+        if line.strip():
+            return line
+    return None
+
+
+def _split_cif(lines: Iterator[str]) -> Iterator[str]:
+    block: List[str] = []
+    in_block = False
+    for line in lines:
+        if _CIF_BLOCK.match(line):
+            if in_block:
+                yield "".join(block)
+                block = []
+            in_block = True
+        block.append(line)
+    if in_block:
+        yield "".join(block)
+
+
+def _split_xyz(lines: Iterator[str]) -> Iterator[str]:
+    while True:
+        header = _next_nonblank(lines)
+        if header is None:
+            return
+        try:
+            n_atoms = int(header.split()[0])
+        except ValueError:
+            raise ValueError(f"Expected an atom count, got: {header.strip()[:80]}")
+        block = [header, next(lines, "\n")]
+        for _ in range(n_atoms):
+            line = next(lines, None)
+            if line is None:
+                raise ValueError("XYZ frame truncated")
+            block.append(line)
+        yield "".join(block)
+
+
+def _split_poscar(lines: Iterator[str]) -> Iterator[str]:
+    """
+    Concatenated POSCAR/CONTCAR blocks, optionally separated by blank lines.
+
+    A velocity block (one blank line, then one three-number line per atom)
+    stays with its frame.
+    """
+    pending = None
+    while True:
+        comment = pending if pending is not None else _next_nonblank(lines)
+        pending = None
+        if comment is None:
+            return
+        block = [comment] + [next(lines, "") for _ in range(4)]  # scale + lattice
+        line = next(lines, "")
+        block.append(line)
+        if not all(p.isdigit() for p in line.split()):  # species line, counts follow
+            line = next(lines, "")
+            block.append(line)
+        try:
+            n_atoms = sum(int(p) for p in line.split())
+        except ValueError:
+            raise ValueError(f"Expected POSCAR atom counts, got: {line.strip()[:80]}")
+        line = next(lines, "")
+        block.append(line)
+        if line.strip()[:1] in ("s", "S"):  # selective dynamics
+            block.append(next(lines, ""))
+        for _ in range(n_atoms):
+            line = next(lines, None)
+            if line is None:
+                raise ValueError("POSCAR frame truncated")
+            block.append(line)
+
+        following = _next_nonblank(lines)
+        if following is not None and _is_floats(following, 3):
+            velocities = [following] + [next(lines, "") for _ in range(n_atoms - 1)]
+            if all(_is_floats(v, 3) for v in velocities):
+                block += ["\n"] + velocities
+            else:
+                raise ValueError("Could not split POSCAR frames")
+        else:
+            pending = following
+        yield "".join(block)
+
+
+_SPLITTERS = {"cif": _split_cif, "poscar": _split_poscar, "xyz": _split_xyz, "extxyz": _split_xyz}
+
+
+def iter_frames(content: str, fmt: str) -> Iterator[str]:
+    """Yield the text of each frame in content, one at a time"""
+    return _SPLITTERS[normalize_format(fmt)](iter(io.StringIO(content)))
+
+
+def format_for_name(name: str) -> Optional[str]:
+    """Structure format from a file name, None for files that are not structures"""
+    base = os.path.basename(name)
+    ext = os.path.splitext(base)[1].lower()
+    if ext == ".cif":
+        return "cif"
+    if ext in (".xyz", ".extxyz"):
+        return "extxyz"
+    if ext == ".vasp" or base.upper().startswith(("POSCAR", "CONTCAR")):
+        return "poscar"
+    return None
+
+
+def _read_member(name: str, fmt: str, stream, max_bytes: Optional[int]) -> Tuple[str, Optional[str], str]:
+    """Decode one archive member, reading at most max_bytes + 1 bytes of it"""
+    data = stream.read() if max_bytes is None else stream.read(max_bytes + 1)
+    if max_bytes is not None and len(data) > max_bytes:
+        return name, None, f"Member larger than {max_bytes} bytes"
+    return name, fmt, data.decode("utf-8", errors="replace")
+
+
+def iter_archive(data: bytes, max_member_bytes: Optional[int] = None) -> Iterator[Tuple[str, Optional[str], str]]:
+    """
+    Yield (member name, format, text) for each structure file in a tar or
+    zip archive. A member over max_member_bytes once decompressed yields
+    (name, None, error message) and is not read further
+    """
+    buffer = io.BytesIO(data)
+    if zipfile.is_zipfile(buffer):
+        with zipfile.ZipFile(buffer) as archive:
+            for info in archive.infolist():
+                fmt = format_for_name(info.filename)
+                if fmt and not info.is_dir():
+                    with archive.open(info) as stream:
+                        yield _read_member(info.filename, fmt, stream, max_member_bytes)
+        return
+
+    buffer.seek(0)
+    with tarfile.open(fileobj=buffer, mode="r:*") as archive:
+        for member in archive:
+            fmt = format_for_name(member.name)
+            if fmt and member.isfile():
+                yield _read_member(member.name, fmt, archive.extractfile(member), max_member_bytes)
+
+
+def is_archive(data: bytes) -> bool:
+    """zip, compressed tar or plain ustar tar, by magic bytes"""
+    if data[:4] == b"PK\x03\x04" or data[:2] == b"\x1f\x8b" or data[:3] == b"BZh" or data[:6] == b"\xfd7zXZ\x00":
+        return True
+    return len(data) > 262 and data[257:262] == b"ustar"
+
+
+def read_frame(text: str, fmt: str):
+    """Parse one frame into a pymatgen Structure"""
+    fmt = normalize_format(fmt)
+    if fmt == "cif":
+        from pymatgen.io.cif import CifParser
+        return CifParser.from_str(text).get_structures()[0]
+    if fmt == "poscar":
+        from pymatgen.io.vasp import Poscar
+        return Poscar.from_str(text).structure
+
+    from ase.io import read
+    from pymatgen.io.ase import AseAtomsAdaptor
+    atoms = read(io.StringIO(text), format="extxyz")  # also reads plain XYZ
+    return AseAtomsAdaptor.get_structure(atoms)
+
+
+def write_frame(structure, fmt: str) -> str:
+    """Serialize one Structure to text"""
+    fmt = normalize_format(fmt)
+    if fmt == "cif":
+        from pymatgen.io.cif import CifWriter
+        return str(CifWriter(structure))
+    if fmt == "poscar":
+        from pymatgen.io.vasp import Poscar
+        return Poscar(structure).get_str()
+
+    from ase.io import write
+    from pymatgen.io.ase import AseAtomsAdaptor
+    buffer = io.StringIO()
+    write(buffer, AseAtomsAdaptor.get_atoms(structure), format=fmt)
+    return buffer.getvalue()
+
+
+def convert_frames(frames: List[str], from_format: str, to_format: str) -> List[dict]:
+    """Convert a chunk of frames (runs on the analysis pool); failures are per frame"""
+    results = []
+    for text in frames:
+        try:
+            with metrics.stage("read_frame"):
+                structure = read_frame(text, from_format)
+            with metrics.stage("write_frame"):
+                output = write_frame(structure, to_format)
+            results.append({
+                "success": True,
+                "formula": structure.composition.reduced_formula,
+                "n_atoms": len(structure),
+                "output": output,
+            })
+        except Exception as e:
+            results.append({"success": False, "error": str(e)})
+    return results
@@ -0,0 +1,126 @@
+"""
+Strained-cell sets for equations of state and elastic constants
+One structure expands into a set of cells (the unstrained reference,
+isotropically scaled cells for the EOS and +/- Voigt strains for Cij)
+that is evaluated in batched model calls; the reference is evaluated once
+and shared by both fits
+"""
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+EV_A3_TO_GPA = 160.21766208
+VOIGT = ("xx", "yy", "zz", "yz", "xz", "xy")
+EOS_MODELS = ("birch_murnaghan", "murnaghan", "vinet", "pourier_tarantola", "birch")
+_VOIGT_INDEX = ((0, 0), (1, 1), (2, 2), (1, 2), (0, 2), (0, 1))
+
+
+def voigt_strain(component: int, magnitude: float) -> np.ndarray:
+    """Symmetric strain tensor for one Voigt component (shear as engineering strain)"""
+    strain = np.zeros((3, 3))
+    i, j = _VOIGT_INDEX[component]
+    if i == j:
+        strain[i, i] = magnitude
+    else:
+        strain[i, j] = strain[j, i] = magnitude / 2
+    return strain
+
+
+def deform(structure, deformation: np.ndarray):
+    """Structure with its lattice deformed by F (fractional coordinates kept)"""
+    from pymatgen.core import Lattice, Structure
+
+    lattice = Lattice(structure.lattice.matrix @ deformation.T)
+    return Structure(lattice, structure.species, structure.frac_coords,
+                     site_properties=structure.site_properties or None)
+
+
+class StrainSet:
+    """
+    Cells to evaluate and what each one is for. Cell 0 is the unstrained
+    reference; with an odd number of EOS points it is also the EOS midpoint
+    """
+
+    def __init__(self, structure, eos_points: int = 7, eos_max_volume_strain: float = 0.06,
+                 strain_magnitudes: Optional[Sequence[float]] = (0.005, 0.01)):
+        self.cells = [structure]
+        self.eos = [0] if eos_points % 2 else []  # cell indices along the EOS
+        self.elastic = []  # (cell index, Voigt component, strain)
+
+        if eos_points:
+            for volume_strain in np.linspace(-eos_max_volume_strain, eos_max_volume_strain, eos_points):
+                if abs(volume_strain) < 1e-12:
+                    continue
+                scale = (1 + volume_strain) ** (1 / 3)
+                self.eos.append(self._add(deform(structure, scale * np.eye(3))))
+            self.eos.sort(key=lambda i: self.cells[i].volume)
+
+        for component in range(6) if strain_magnitudes else ():
+            for magnitude in strain_magnitudes:
+                for signed in (-magnitude, magnitude):
+                    index = self._add(deform(structure, np.eye(3) + voigt_strain(component, signed)))
+                    self.elastic.append((index, component, signed))
+
+    def _add(self, cell) -> int:
+        self.cells.append(cell)
+        return len(self.cells) - 1
+
+
+def fit_eos(volumes: Sequence[float], energies: Sequence[float], model: str = "birch_murnaghan") -> dict:
+    """Equation-of-state fit of E(V) per cell"""
+    from pymatgen.analysis.eos import EOS
+
+    fit = EOS(eos_name=model).fit(list(volumes), list(energies))
+    residuals = np.asarray(fit.func(np.asarray(volumes))) - np.asarray(energies)
+    return {
+        "model": model,
+        "v0_A3": round(float(fit.v0), 6),
+        "e0_eV": round(float(fit.e0), 6),
+        "b0_GPa": round(float(fit.b0_GPa), 4),
+        "b1": round(float(fit.b1), 4),
+        "rms_residual_eV": round(float(np.sqrt(np.mean(residuals ** 2))), 8),
+        "volumes_A3": [round(float(v), 6) for v in volumes],
+        "energies_eV": [round(float(e), 6) for e in energies],
+    }
+
+
+def fit_elastic(strains: List[tuple], stresses: np.ndarray, reference_stress: np.ndarray) -> dict:
+    """
+    Cij (GPa) from stress-strain pairs: for each strained component, the
+    least-squares slope through the origin of (stress - reference stress)
+    against strain, then symmetrized
+    """
+    stresses = (np.asarray(stresses) - np.asarray(reference_stress)) * EV_A3_TO_GPA
+    raw = np.zeros((6, 6))
+    for component in range(6):
+        rows = [n for n, (_, c, _) in enumerate(strains) if c == component]
+        delta = np.array([strains[n][2] for n in rows])
+        raw[:, component] = delta @ stresses[rows] / (delta @ delta)
+    cij = (raw + raw.T) / 2
+    eigenvalues = np.linalg.eigvalsh(cij)
+
+    result = {
+        "C_GPa": np.round(cij, 3).tolist(),
+        "asymmetry_GPa": round(float(np.abs(raw - raw.T).max() / 2), 3),
+        "eigenvalues_GPa": np.round(eigenvalues, 3).tolist(),
+        "mechanically_stable": bool(eigenvalues.min() > 0),
+    }
+    c = cij
+    k_voigt = (c[0, 0] + c[1, 1] + c[2, 2] + 2 * (c[0, 1] + c[1, 2] + c[0, 2])) / 9
+    g_voigt = (c[0, 0] + c[1, 1] + c[2, 2] - (c[0, 1] + c[1, 2] + c[0, 2])
+               + 3 * (c[3, 3] + c[4, 4] + c[5, 5])) / 15
+    moduli = {"bulk_modulus_voigt_GPa": k_voigt, "shear_modulus_voigt_GPa": g_voigt}
+    if abs(np.linalg.det(c)) > 1e-12:
+        s = np.linalg.inv(c)
+        k_reuss = 1 / (s[0, 0] + s[1, 1] + s[2, 2] + 2 * (s[0, 1] + s[1, 2] + s[0, 2]))
+        g_reuss = 15 / (4 * (s[0, 0] + s[1, 1] + s[2, 2]) - 4 * (s[0, 1] + s[1, 2] + s[0, 2])
+                        + 3 * (s[3, 3] + s[4, 4] + s[5, 5]))
+        moduli.update({
+            "bulk_modulus_reuss_GPa": k_reuss,
+            "shear_modulus_reuss_GPa": g_reuss,
+            "bulk_modulus_hill_GPa": (k_voigt + k_reuss) / 2,
+            "shear_modulus_hill_GPa": (g_voigt + g_reuss) / 2,
+        })
+    result.update({name: round(float(value), 3) for name, value in moduli.items()})
+    return result
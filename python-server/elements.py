@@ -0,0 +1,100 @@
+"""
+Periodic-table index
+Element properties are computed once into an in-memory table of
+pre-serialized JSON rows; single and bulk lookups are dictionary reads
+and byte joins. Each response carries a content-derived ETag so clients
+and proxies can cache it
+"""
+
+import hashlib
+import json
+import math
+import warnings
+from typing import Dict, List, Optional, Sequence
+
+
+def _value(fn):
+    """Property value, or None where pymatgen has no data (e.g. superheavy elements)"""
+    try:
+        return fn()
+    except (KeyError, AttributeError, ValueError, TypeError):
+        return None
+
+
+def _number(value) -> Optional[float]:
+    """float, with missing values (None, 0, NaN) as None"""
+    return float(value) if value and not math.isnan(value) else None
+
+
+def element_properties(el) -> dict:
+    """Properties reported for one pymatgen Element"""
+    oxidation_states = _value(lambda: el.oxidation_states)
+    electronegativity = _value(lambda: el.X)
+    atomic_radius = _value(lambda: el.atomic_radius)
+    return {
+        "symbol": el.symbol,
+        "name": el.long_name,
+        "atomic_number": el.Z,
+        "atomic_mass": round(float(el.atomic_mass), 4),
+        "electronic_structure": _value(lambda: el.electronic_structure),
+        "group": el.group,
+        "row": el.row,
+        "block": _value(lambda: el.block),
+        "is_metal": el.is_metal,
+        "is_metalloid": el.is_metalloid,
+        "is_transition_metal": el.is_transition_metal,
+        "oxidation_states": list(oxidation_states) if oxidation_states else [],
+        "electronegativity": _number(electronegativity),
+        "atomic_radius": _number(atomic_radius),
+    }
+
+
+class ElementIndex:
+    """All elements by symbol, in atomic-number order, built once"""
+
+    def __init__(self):
+        from pymatgen.core import Element
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # missing-data warnings for sparse elements
+            # D and T are Element members too, but report the symbol H
+            rows = sorted((element_properties(el) for el in Element if el.name == el.symbol),
+                          key=lambda r: r["atomic_number"])
+        self.properties: Dict[str, dict] = {row["symbol"]: row for row in rows}
+        self.symbols: List[str] = [row["symbol"] for row in rows]
+        self._rows: Dict[str, bytes] = {s: json.dumps(row, separators=(",", ":"), allow_nan=False).encode()
+                                        for s, row in self.properties.items()}
+        self._lower = {s.lower(): s for s in self.symbols}
+        self.version = hashlib.sha256(b"\n".join(self._rows[s] for s in self.symbols)).hexdigest()[:16]
+        self._all = self._body(self.symbols)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def resolve(self, symbols: Sequence[str]) -> List[str]:
+        """Canonical symbols (case-insensitive, duplicates dropped); ValueError lists unknown ones"""
+        resolved, unknown = [], []
+        for symbol in symbols:
+            canonical = self._lower.get(symbol.strip().lower())
+            if canonical is None:
+                unknown.append(symbol)
+            elif canonical not in resolved:
+                resolved.append(canonical)
+        if unknown:
+            raise ValueError(f"Unknown element symbols: {', '.join(unknown)}")
+        return resolved
+
+    def row(self, symbol: str) -> bytes:
+        """Serialized properties of one element"""
+        return self._rows[self.resolve([symbol])[0]]
+
+    def _body(self, symbols: Sequence[str]) -> bytes:
+        return b'{"count":%d,"elements":[%s]}' % (len(symbols), b",".join(self._rows[s] for s in symbols))
+
+    def body(self, symbols: Optional[Sequence[str]] = None) -> bytes:
+        """{"count", "elements"} for the given symbols (all when None), in request order"""
+        return self._all if symbols is None else self._body(symbols)
+
+    def etag(self, symbols: Optional[Sequence[str]] = None) -> str:
+        key = self.version if symbols is None else f"{self.version}:{','.join(symbols)}"
+        return 'W/"%s"' % hashlib.sha256(key.encode()).hexdigest()[:24]
@@ -0,0 +1,133 @@
+"""
+Execution layer for CPU-bound and blocking work
+Keeps the event loop free by running analysis, MLIP inference and
+Materials Project I/O on bounded worker pools
+"""
+
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Tuple
+
+import metrics
+
+# Pool configuration: kind is "process" or "thread", workers is the size limit
+POOL_CONFIG = {
+    # Symmetry, CrystalNN, neighbor lists, phase diagrams, format conversion
+    "analysis": {
+        "kind": os.environ.get("ANALYSIS_POOL", "process"),
+        "workers": int(os.environ.get("ANALYSIS_WORKERS", os.cpu_count() or 2)),
+    },
+    # Model inference. Threads share one calculator, so the default is a single
+    # worker; use MLIP_POOL=process to run one model copy per worker process.
+    "mlip": {
+        "kind": os.environ.get("MLIP_POOL", "thread"),
+        "workers": int(os.environ.get("MLIP_WORKERS", 1)),
+    },
+    # Phase diagram hulls. Threads, so built hulls stay in the shared in-process cache
+    "hull": {
+        "kind": "thread",
+        "workers": int(os.environ.get("HULL_WORKERS", 2)),
+    },
+    # Blocking HTTP calls (MPRester)
+    "io": {
+        "kind": "thread",
+        "workers": int(os.environ.get("IO_WORKERS", 8)),
+    },
+}
+
+_pools: Dict[str, Executor] = {}
+# Per-pool (fn, args) run once in every worker before it takes work
+_initializers: Dict[str, Tuple[Callable, tuple]] = {}
+
+
+def set_initializer(name: str, fn: Callable, *args):
+    """Run fn(*args) in every worker of a pool; only applies to pools not started yet"""
+    _initializers[name] = (fn, args)
+
+
+def get_pool(name: str) -> Executor:
+    """Create pools lazily so worker processes are not spawned at import"""
+    if name not in _pools:
+        config = POOL_CONFIG[name]
+        workers = max(1, config["workers"])
+        initializer, initargs = _initializers.get(name, (None, ()))
+        if config["kind"] == "process":
+            _pools[name] = ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+        elif config["kind"] == "thread":
+            _pools[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-pool",
+                                              initializer=initializer, initargs=initargs)
+        else:
+            raise ValueError(f"Unknown pool kind for {name}: {config['kind']}")
+    return _pools[name]
+
+
+async def run_in_pool(name: str, fn: Callable, *args, **kwargs):
+    """
+    Run fn on the named pool and await its result; stage timings are
+    recorded for the current request. A cancelled caller returns once the
+    work is dequeued or, if already running, finished
+    """
+    request = metrics.current_request()
+    profile = request is not None and request.profile
+    work = get_pool(name).submit(metrics.measured_call, fn, args, kwargs, profile)
+    future = asyncio.wrap_future(work)
+    try:
+        result, measurements = await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # Work already running cannot be stopped; the cancelled caller waits
+        # for it so whatever capacity it holds (an admission slot) covers it
+        if not work.cancel():
+            await asyncio.wait([future])
+            if not future.cancelled():
+                future.exception()  # nobody is left to receive a failure; don't log it as unretrieved
+        raise
+    metrics.apply(measurements)
+    return result
+
+
+async def run_analysis(fn: Callable, *args, **kwargs):
+    return await run_in_pool("analysis", fn, *args, **kwargs)
+
+
+async def run_mlip(fn: Callable, *args, **kwargs):
+    return await run_in_pool("mlip", fn, *args, **kwargs)
+
+
+async def run_hull(fn: Callable, *args, **kwargs):
+    return await run_in_pool("hull", fn, *args, **kwargs)
+
+
+async def run_io(fn: Callable, *args, **kwargs):
+    return await run_in_pool("io", fn, *args, **kwargs)
+
+
+def _noop():
+    return None
+
+
+async def start_process_pools():
+    """
+    Fork process pool workers up front, before other threads start importing:
+    a child forked while another thread holds an import lock deadlocks.
+    The first submission forks every worker; its result is not awaited, so
+    slow initializers do not hold up startup
+    """
+    for name, config in POOL_CONFIG.items():
+        if config["kind"] == "process":
+            get_pool(name).submit(_noop)
+
+
+def pool_status() -> dict:
+    """Configured size and kind of each pool"""
+    return {
+        name: {"kind": config["kind"], "workers": config["workers"], "started": name in _pools}
+        for name, config in POOL_CONFIG.items()
+    }
+
+
+def shutdown_pools(wait: bool = True):
+    """Shut down all started pools"""
+    for pool in _pools.values():
+        pool.shutdown(wait=wait, cancel_futures=True)
+    _pools.clear()
@@ -0,0 +1,244 @@
+"""
+Phase diagram cache
+Convex hulls are built once per sorted chemsys, subsystems are served from
+a cached parent hull, energies above hull are evaluated for all entries in
+one batched NumPy pass, and new entries update the hull incrementally
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+HULL_TOL = 1e-8
+FACET_CHUNK_ELEMENTS = 4_000_000  # bound on facets * entries * dim per batch
+
+
+def chemsys_key(elements: Iterable[str]) -> str:
+    return "-".join(sorted(set(str(el) for el in elements)))
+
+
+def entry_key(entry) -> str:
+    """Identity of an entry across refreshes; a corrected energy is a new entry"""
+    return f"{entry.entry_id or entry.composition.formula}:{entry.energy:.8f}"
+
+
+def entry_elements(entry) -> frozenset:
+    return frozenset(str(el) for el in entry.composition.elements)
+
+
+def hull_energies(comp: np.ndarray, vertex_comp: np.ndarray, vertex_energy: np.ndarray,
+                  facets: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Hull energy per atom at each composition.
+
+    comp: (E, n) atomic fractions, vertex_comp: (V, n), vertex_energy: (V,),
+    facets: (F, n) vertex indices. Returns (hull_energy, facet_index,
+    barycentric_weights) for every composition, solving all facets at once.
+    """
+    n_entries, dim = comp.shape
+    hull_e = np.full(n_entries, np.inf)
+    best_facet = np.full(n_entries, -1, dtype=np.int64)
+    best_w = np.zeros((n_entries, dim))
+
+    # Barycentric transform of every facet; degenerate facets are dropped
+    simplices = vertex_comp[facets]  # (F, n, n)
+    ok = np.abs(np.linalg.det(simplices)) > 1e-12
+    facets, simplices = facets[ok], simplices[ok]
+    if len(facets) == 0:
+        return hull_e, best_facet, best_w
+    inverse = np.linalg.inv(simplices)
+    facet_e = vertex_energy[facets]  # (F, n)
+
+    chunk = max(1, FACET_CHUNK_ELEMENTS // max(1, n_entries * dim))
+    for start in range(0, len(facets), chunk):
+        stop = start + chunk
+        w = np.einsum("en,fnm->fem", comp, inverse[start:stop])  # (f, E, n)
+        inside = np.all(w >= -1e-9, axis=2)
+        e = np.einsum("fem,fm->fe", w, facet_e[start:stop])
+        e = np.where(inside, e, np.inf)
+        local = np.argmin(e, axis=0)
+        local_e = e[local, np.arange(n_entries)]
+        better = local_e < hull_e
+        hull_e[better] = local_e[better]
+        best_facet[better] = start + local[better]
+        best_w[better] = w[local[better], np.flatnonzero(better)]
+
+    best_facet = np.where(best_facet >= 0, np.flatnonzero(ok)[np.maximum(best_facet, 0)], -1)
+    return hull_e, best_facet, best_w
+
+
+class Hull:
+    """A built convex hull plus e_above_hull for every entry of one chemsys"""
+
+    def __init__(self, entries: List, elements: Optional[List[str]] = None):
+        self.elements = sorted(elements or {el for e in entries for el in entry_elements(e)})
+        self.lock = threading.RLock()
+        self.entries: List = []
+        self._keys: Dict[str, int] = {}
+        self.comp = np.zeros((0, len(self.elements)))
+        self.energy = np.zeros(0)
+        self._append(entries)
+        self._build(list(self.entries))
+
+    def _append(self, entries: List):
+        entries = [e for e in entries if entry_key(e) not in self._keys]
+        for e in entries:
+            self._keys[entry_key(e)] = len(self.entries)
+            self.entries.append(e)
+        if entries:
+            comp = np.array([[e.composition.get_atomic_fraction(el) for el in self.elements] for e in entries])
+            energy = np.array([e.energy_per_atom for e in entries])
+            self.comp = np.vstack([self.comp, comp])
+            self.energy = np.concatenate([self.energy, energy])
+        return entries
+
+    def _build(self, hull_entries: List):
+        """Run qhull on hull_entries and re-evaluate every entry against it"""
+        from pymatgen.analysis.phase_diagram import PhaseDiagram
+
+        self.pd = PhaseDiagram(hull_entries)
+        vertices = list(self.pd.qhull_entries)
+        vertex_index = [self._keys[entry_key(e)] for e in vertices]
+        self.vertex_index = np.array(vertex_index, dtype=np.int64)
+        self.facets = np.array(self.pd.facets, dtype=np.int64).reshape(-1, len(self.elements))
+        self._evaluate()
+
+    def _evaluate(self):
+        hull_e, facet, weights = hull_energies(
+            self.comp, self.comp[self.vertex_index], self.energy[self.vertex_index], self.facets
+        )
+        # Compositions that fall outside every facet by round-off
+        for i in np.flatnonzero(~np.isfinite(hull_e)):
+            hull_e[i] = self.pd.get_hull_energy_per_atom(self.entries[i].composition)
+        self.e_above_hull = self.energy - hull_e
+        self.facet_of = facet
+        self.weights = weights
+
+        # Stable = hull vertices used by a facet (lowest energy per composition)
+        used = np.unique(self.facets) if len(self.facets) else np.arange(len(self.vertex_index))
+        self.stable = np.zeros(len(self.entries), dtype=bool)
+        self.stable[self.vertex_index[used]] = True
+        self.e_above_hull[self.stable] = 0.0
+
+    def add_entries(self, entries: List) -> bool:
+        """
+        Add entries without a full rebuild.
+
+        Entries above the current hull only need their e_above_hull. If any
+        falls below it, qhull is re-run on the current stable set plus the
+        new entries; previously unstable entries cannot become stable.
+        Returns True when the hull changed.
+        """
+        start = len(self.entries)
+        new = self._append(entries)
+        if not new:
+            return False
+
+        hull_e, facet, weights = hull_energies(
+            self.comp[start:], self.comp[self.vertex_index], self.energy[self.vertex_index], self.facets
+        )
+        e_above = self.energy[start:] - hull_e
+        if np.all(np.isfinite(e_above)) and np.all(e_above >= -HULL_TOL):
+            self.e_above_hull = np.concatenate([self.e_above_hull, e_above])
+            self.facet_of = np.concatenate([self.facet_of, facet])
+            self.weights = np.vstack([self.weights, weights])
+            self.stable = np.concatenate([self.stable, np.zeros(len(new), dtype=bool)])
+            return False
+
+        stable_entries = [self.entries[i] for i in np.flatnonzero(self.stable)]
+        self._build(stable_entries + new)
+        return True
+
+    def index_of(self, entry) -> int:
+        return self._keys[entry_key(entry)]
+
+    def decomposition(self, index: int) -> List[Tuple[object, float]]:
+        """Hull phases and atom fractions an entry decomposes into"""
+        facet = self.facet_of[index]
+        if facet < 0:
+            decomp = self.pd.get_decomposition(self.entries[index].composition)
+            return [(entry, float(amount)) for entry, amount in decomp.items()]
+        vertices = self.vertex_index[self.facets[facet]]
+        w = self.weights[index]
+        return [(self.entries[v], float(a)) for v, a in zip(vertices, w) if a > 1e-8]
+
+    def subsystem(self, elements: Iterable[str]) -> List[int]:
+        """Indices of entries that lie in a subsystem of this chemsys"""
+        elements = frozenset(elements)
+        return [i for i, e in enumerate(self.entries) if entry_elements(e) <= elements]
+
+
+class HullCache:
+    """LRU cache of built hulls keyed by sorted chemsys"""
+
+    def __init__(self, max_hulls: int = 32):
+        self.max_hulls = max_hulls
+        self._hulls: "OrderedDict[str, Hull]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.counters = {"hits": 0, "parent_hits": 0, "builds": 0, "incremental_updates": 0, "rebuilds": 0,
+                         "stale_rebuilds": 0}
+
+    def _parent(self, elements: frozenset) -> Optional[Hull]:
+        for key, hull in self._hulls.items():
+            if elements < frozenset(key.split("-")):
+                return hull
+        return None
+
+    def get(self, elements: Iterable[str], entries: List) -> Tuple[Hull, List[int]]:
+        """
+        Hull for a chemsys and the indices of its entries.
+
+        A cached hull for the same chemsys is updated with any entries it
+        has not seen; a cached superset chemsys serves the subsystem
+        directly, since the parent hull restricted to a face is the
+        subsystem hull. A cached hull holding entries the given set no
+        longer has (withdrawn or re-corrected) is rebuilt from scratch.
+        """
+        key = chemsys_key(elements)
+        wanted = frozenset(key.split("-"))
+        keys = {entry_key(e) for e in entries}
+        with self._lock:
+            hull = self._hulls.get(key)
+            if hull is not None:
+                self._hulls.move_to_end(key)
+            parent = self._parent(wanted) if hull is None else None
+
+        if hull is not None:
+            with hull.lock:
+                stale = not keys.issuperset(hull._keys)
+                if not stale:
+                    fresh = [e for e in entries if entry_key(e) not in hull._keys]
+                    changed = hull.add_entries(fresh) if fresh else False
+            if not stale:
+                with self._lock:
+                    if not fresh:
+                        self.counters["hits"] += 1
+                    elif changed:
+                        self.counters["rebuilds"] += 1
+                    else:
+                        self.counters["incremental_updates"] += 1
+                return hull, list(range(len(hull.entries)))
+
+        if parent is not None:
+            with parent.lock:
+                indices = parent.subsystem(wanted)
+                if {entry_key(parent.entries[i]) for i in indices} == keys:
+                    with self._lock:
+                        self.counters["parent_hits"] += 1
+                    return parent, indices
+
+        # Build outside the cache lock so different systems build concurrently
+        stale = hull is not None
+        hull = Hull(entries, sorted(wanted))
+        with self._lock:
+            self.counters["stale_rebuilds" if stale else "builds"] += 1
+            self._hulls[key] = hull
+            while len(self._hulls) > self.max_hulls:
+                self._hulls.popitem(last=False)
+        return hull, list(range(len(hull.entries)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "hulls": list(self._hulls)}
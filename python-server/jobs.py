@@ -0,0 +1,248 @@
+"""
+Background job subsystem
+Long computations (e.g. relaxations) are submitted as jobs, run on a fixed
+set of workers, report per-step progress, can be cancelled and stream
+their progress as Server-Sent Events
+"""
+
+import asyncio
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+TERMINAL_STATES = ("completed", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once cancellation was requested"""
+
+
+class ProgressChannel:
+    """
+    Progress and cancellation link between a job and its worker.
+
+    Thread pools share a plain queue and event; process pools need
+    multiprocessing manager proxies, which pickle across processes.
+    """
+
+    def __init__(self, manager=None):
+        if manager is not None:
+            self.queue = manager.Queue()
+            self.cancel_event = manager.Event()
+        else:
+            self.queue = queue.Queue()
+            self.cancel_event = threading.Event()
+
+    # Worker side
+    def report(self, **data):
+        self.queue.put(data)
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled("Job cancelled")
+
+    # Event-loop side
+    def drain(self) -> list:
+        items = []
+        while True:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                return items
+
+
+class Job:
+    def __init__(self, kind: str, params: dict, runner: Callable[["Job"], Awaitable[dict]],
+                 channel: ProgressChannel, key: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.kind = kind
+        self.params = params
+        self.runner = runner
+        self.channel = channel
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events: list = []
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "n_events": len(self.events),
+            "progress": self.events[-1] if self.events else None,
+        }
+        if self.started_at:
+            data["elapsed_s"] = round((self.finished_at or time.time()) - self.started_at, 3)
+        if include_result:
+            data["result"] = self.result
+            data["error"] = self.error
+        return data
+
+
+class JobManager:
+    """Fixed worker set consuming a FIFO job queue, with bounded history"""
+
+    def __init__(self, workers: int = 1, history: int = 100, poll_interval: float = 0.2,
+                 use_processes: bool = False):
+        self.workers = max(1, workers)
+        self.history = history
+        self.poll_interval = poll_interval
+        self.use_processes = use_processes
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active_keys: dict = {}  # dedupe key -> id of its queued/running job
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+        self._manager = None
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _channel(self) -> ProgressChannel:
+        if self.use_processes:
+            if self._manager is None:
+                import multiprocessing
+                self._manager = multiprocessing.Manager()
+            return ProgressChannel(self._manager)
+        return ProgressChannel()
+
+    def submit(self, kind: str, params: dict, runner: Callable[[Job], Awaitable[dict]],
+               key: Optional[str] = None) -> Job:
+        """
+        Queue a job; runner(job) is awaited on a worker, reporting through
+        job.channel. key marks it for active()
+        """
+        self._ensure_started()
+        job = Job(kind, params, runner, self._channel(), key)
+        self._jobs[job.id] = job
+        if key is not None:
+            self._active_keys[key] = job.id
+        self._queue.put_nowait(job)
+        return job
+
+    def active(self, key: str) -> Optional[Job]:
+        """Queued or running job submitted with key, if any"""
+        job = self._jobs.get(self._active_keys.get(key))
+        return job if job is not None and job.status not in TERMINAL_STATES else None
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self, kind: Optional[str] = None) -> list:
+        return [job for job in self._jobs.values() if kind is None or job.kind == kind]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None or job.status in TERMINAL_STATES:
+            return job
+        job.channel.cancel_event.set()
+        if job.status == "queued":
+            self._finish(job, "cancelled", error="Job cancelled")
+        return job
+
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def running(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == "running")
+
+    def retry_after(self) -> int:
+        """Seconds until the queue is likely to have room, from recent job durations"""
+        durations = [job.finished_at - job.started_at for job in self._jobs.values()
+                     if job.started_at and job.finished_at]
+        average = sum(durations) / len(durations) if durations else 10.0
+        return max(1, round(average * (self.queued() + 1) / self.workers))
+
+    def _finish(self, job: Job, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        if job.key is not None and self._active_keys.get(job.key) == job.id:
+            del self._active_keys[job.key]
+        job._notify()
+        self._prune()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in TERMINAL_STATES]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def _collect(self, job: Job):
+        events = job.channel.drain()
+        if events:
+            job.events.extend(events)
+            job._notify()
+
+    async def _worker(self):
+        jobs = self._queue  # stop() drops the manager's reference while workers unwind
+        while True:
+            job = await jobs.get()
+            try:
+                if job.status == "queued":
+                    await self._run(job)
+            finally:
+                jobs.task_done()
+
+    async def _run(self, job: Job):
+        job.status = "running"
+        job.started_at = time.time()
+        job._notify()
+
+        task = asyncio.ensure_future(job.runner(job))
+        while not task.done():
+            await asyncio.wait({task}, timeout=self.poll_interval)
+            self._collect(job)
+
+        try:
+            result = task.result()
+        except JobCancelled:
+            self._finish(job, "cancelled", error="Job cancelled")
+        except Exception as e:
+            self._finish(job, "failed", error=str(e))
+        else:
+            self._finish(job, "completed", result=result)
+
+    async def stream(self, job: Job, start: int = 0):
+        """Server-Sent Events: replay events from start, then follow until the job ends"""
+        index = start
+        while True:
+            changed = job._changed
+            while index < len(job.events):
+                yield f"id: {index}\nevent: progress\ndata: {json.dumps(job.events[index])}\n\n"
+                index += 1
+            if job.status in TERMINAL_STATES:
+                yield f"event: {job.status}\ndata: {json.dumps(job.to_dict())}\n\n"
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=15)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._queue = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
@@ -3,63 +3,259 @@ Materials Data Portal - Python Computation Server
 Provides Pymatgen, ASE, and UPET (MLIP) based computational tools
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
+from contextlib import asynccontextmanager
+import importlib.util
+import asyncio
 import tempfile
+import json
+import time
 import os
-import numpy as np
-
-# Pymatgen imports
-from pymatgen.core import Structure, Element, Composition
-from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
-from pymatgen.analysis.local_env import CrystalNN
-from pymatgen.analysis.phase_diagram import PhaseDiagram
-from pymatgen.io.cif import CifParser, CifWriter
-from pymatgen.io.vasp import Poscar
-from pymatgen.io.ase import AseAtomsAdaptor
-
-# New MP API
-from mp_api.client import MPRester
-
-# ASE imports
-from ase.io import read, write
-from ase.optimize import BFGS
-try:
-    from ase.filters import ExpCellFilter  # ASE >= 3.23
-except ImportError:
-    from ase.constraints import ExpCellFilter  # ASE < 3.23
-
-# UPET (MLIP) - lazy loading to avoid startup delay
-_upet_calculator = None
-
-def get_upet_calculator(device: str = "cpu"):
-    """Lazy load UPET calculator"""
-    global _upet_calculator
-    if _upet_calculator is None:
+
+# Startup profiling (STARTUP_PROFILE=1 prints every step once the server is up)
+from startup import (profile_step, resolve_groups, warm_import_groups, profile_report,
+                     print_report, PROFILE_ENABLED)
+
+with profile_step("import fastapi"):
+    from fastapi import FastAPI, HTTPException, Request
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+    from starlette.routing import Match
+    from pydantic import BaseModel
+
+with profile_step("import numpy"):
+    import numpy as np
+
+# Pymatgen core only; analysis, IO, phase diagram, MP client and ASE modules
+# are imported on first use or in the WARM_IMPORTS warm-up phase
+with profile_step("import pymatgen.core"):
+    from pymatgen.core import Structure, Element, Composition
+
+# Local modules
+with profile_step("import local modules"):
+    from neighbors import bond_analysis, DEFAULT_BOND_CUTOFF
+    from executor import (run_analysis, run_mlip, run_hull, run_io, pool_status, shutdown_pools,
+                          start_process_pools, set_initializer, POOL_CONFIG)
+    from cache import ResultCache, exact_fingerprint, make_key, structure_fingerprint, text_digest
+    from mp_store import MPStore, chemsys_key, material_id_of
+    from hull import Hull, HullCache, entry_elements
+    from mlip_batch import pack_batches, predict_batch, DEFAULT_MAX_ATOMS_PER_BATCH
+    from jobs import Job, JobManager
+    from model_registry import ModelRegistry, ModelSpec, UnknownModelError, check_spec, parse_specs, resolve_spec
+    import metrics
+    from singleflight import SingleFlight
+    from structure_store import StructureStore, CompactStructure, UnknownHandleError, upload_handle
+    from wire import (WireRoute, response_format, structure_arrays, structure_from_dict, encode,
+                      RESPONSE_MEDIA_TYPES)
+    from admission import AdmissionControl, DeadlineExceeded, Saturated, admission_route, request_deadline
+    from cell_reduction import CellReduction
+    from trajectory import TrajectoryStore, TrajectoryWriter, read_frames, read_meta, trajectory_bytes, FIELDS
+    from elements import ElementIndex
+    from screening import Candidate, Pipeline
+    from elastic import StrainSet, fit_eos, fit_elastic, EOS_MODELS, EV_A3_TO_GPA, VOIGT
+    from references import ReferenceStore, candidate_structures, formation_energies
+    from conversion import convert_frames, iter_frames, iter_archive, is_archive, normalize_format, read_frame
+
+# Endpoint groups to import during startup warm-up ("all" or e.g. "analysis,mlip")
+WARM_IMPORTS = resolve_groups(os.environ.get("WARM_IMPORTS", ""))
+
+
+def exp_cell_filter(atoms):
+    try:
+        from ase.filters import ExpCellFilter  # ASE >= 3.23
+    except ImportError:
+        from ase.constraints import ExpCellFilter  # ASE < 3.23
+    return ExpCellFilter(atoms)
+
+# UPET (MLIP) - models load lazily through the registry, or at startup when
+# listed in MLIP_PRELOAD ("model:version:device,..."; empty disables warm-up)
+model_registry = ModelRegistry(max_loaded=int(os.environ.get("MLIP_MAX_LOADED", 2)))
+MLIP_PRELOAD = parse_specs(os.environ.get("MLIP_PRELOAD", str(resolve_spec())))
+# Specs clients may request (same syntax); defaults to the default spec plus MLIP_PRELOAD.
+# Anything else is rejected so requests cannot trigger arbitrary downloads or evict warm models
+MLIP_MODELS = parse_specs(os.environ.get("MLIP_MODELS", "")) or list(dict.fromkeys([resolve_spec(), *MLIP_PRELOAD]))
+
+
+def requested_spec(model: Optional[str] = None, version: Optional[str] = None,
+                   device: Optional[str] = None) -> ModelSpec:
+    """Spec of a request, with defaults filled in; UnknownModelError unless listed in MLIP_MODELS"""
+    return check_spec(resolve_spec(model, version, device), MLIP_MODELS)
+
+def get_upet_calculator(device: Optional[str] = None, spec: Optional[ModelSpec] = None):
+    """Load (or reuse) the UPET calculator for a model/version/device"""
+    spec = spec or resolve_spec(device=device)
+    try:
+        return model_registry.get(spec)
+    except ImportError:
+        print("⚠ UPET not installed. Run: pip install upet")
+        return None
+    except Exception as e:
+        print(f"⚠ UPET loading failed for {spec}: {e}")
+        return None
+
+
+def model_label(spec: Optional[ModelSpec] = None) -> str:
+    spec = spec or resolve_spec()
+    label = spec.model.upper()
+    if spec.model.startswith("pet-mad"):
+        label += " (PBEsol level)"
+    return label
+
+
+class MLIPUnavailableError(RuntimeError):
+    """Raised inside worker pools when the UPET calculator cannot be loaded"""
+
+
+def require_upet_calculator(spec: Optional[ModelSpec] = None):
+    """Get the UPET calculator or raise MLIPUnavailableError"""
+    calc = get_upet_calculator(spec=spec)
+    if calc is None:
+        raise MLIPUnavailableError("UPET not available. Install with: pip install upet")
+    return calc
+
+
+# Startup warm-up state, reported by /health/ready
+warmup_state = {"status": "pending", "imports": {}, "models": {}, "errors": {}}
+
+
+async def warm_up_imports():
+    """Import WARM_IMPORTS groups in this process and in every analysis worker"""
+    try:
+        with profile_step("warm-up imports"):
+            jobs = [run_io(warm_import_groups, WARM_IMPORTS)]
+            if POOL_CONFIG["analysis"]["kind"] == "process":
+                jobs += [run_analysis(warm_import_groups, WARM_IMPORTS)
+                         for _ in range(POOL_CONFIG["analysis"]["workers"])]
+            timings = await asyncio.gather(*jobs)
+        warmup_state["imports"] = timings[0]
+    except Exception as e:
+        warmup_state["errors"]["imports"] = str(e)
+        print(f"⚠ Import warm-up failed: {e}")
+
+
+# Warm-up time of each model this worker process loaded in its pool initializer
+worker_warmup: Dict[str, float] = {}
+
+
+def warm_up_worker(specs: List[ModelSpec]):
+    """
+    Initializer of MLIP worker processes, so every worker loads the
+    preloaded models before taking work. Errors are only printed here,
+    raising would break the pool; warm_up_model retries and reports them
+    """
+    for spec in specs:
         try:
-            from upet.calculator import UPETCalculator
-            _upet_calculator = UPETCalculator(
-                model="pet-mad-s",  # Fast and universal
-                version="1.0.2",
-                device=device
-            )
-            print("✓ UPET Calculator loaded successfully")
-        except ImportError:
-            print("⚠ UPET not installed. Run: pip install upet")
-            return None
+            worker_warmup[str(spec)] = model_registry.warm_up(spec)
         except Exception as e:
-            print(f"⚠ UPET loading failed: {e}")
-            return None
-    return _upet_calculator
+            print(f"⚠ MLIP worker warm-up failed for {spec}: {e}")
+
+
+if POOL_CONFIG["mlip"]["kind"] == "process" and MLIP_PRELOAD:
+    set_initializer("mlip", warm_up_worker, MLIP_PRELOAD)
+
+
+def warm_up_model(spec: ModelSpec) -> float:
+    """
+    Load a model and run a dummy forward pass (runs on the MLIP pool);
+    workers that already warmed it in their initializer report that time
+    """
+    if str(spec) in worker_warmup:
+        return worker_warmup[str(spec)]
+    return model_registry.warm_up(spec)
+
+
+async def warm_up_models():
+    """
+    Preload MLIP_PRELOAD models. Process workers load them in their pool
+    initializer; the submissions here wait for that and collect errors
+    """
+    workers = POOL_CONFIG["mlip"]["workers"] if POOL_CONFIG["mlip"]["kind"] == "process" else 1
+    for spec in MLIP_PRELOAD:
+        try:
+            times = await asyncio.gather(*[run_mlip(warm_up_model, spec) for _ in range(workers)])
+            warmup_state["models"][str(spec)] = round(max(times), 3)
+        except Exception as e:
+            warmup_state["errors"][str(spec)] = str(e)
+            print(f"⚠ MLIP warm-up failed for {spec}: {e}")
+
+
+async def warm_up():
+    """Startup warm-up: imports first, then models; /health/ready waits for both"""
+    warmup_state["status"] = "running"
+    if WARM_IMPORTS:
+        await warm_up_imports()
+    if MLIP_PRELOAD:
+        with profile_step("warm-up models"):
+            await warm_up_models()
+    warmup_state["status"] = "done"
+    if PROFILE_ENABLED:
+        print_report()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_process_pools()
+    with metrics.request_context("startup"):
+        warmup_task = asyncio.create_task(warm_up())
+    yield
+    if not warmup_task.done():
+        warmup_task.cancel()
+    await job_manager.stop()
+    shutdown_pools()
+    mp_store.close()
+
 
 app = FastAPI(
     title="Materials Computation API",
     description="Pymatgen & ASE based computational tools",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+
+@app.exception_handler(UnknownModelError)
+async def unknown_model_handler(request: Request, exc: UnknownModelError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+# Admission control: route -> (endpoint class, priority; lower runs first).
+# Routes not listed (element lookups, stats, health, job polling) are never queued.
+# The class timeout bounds queueing; once admitted, the multi-step mlip routes
+# (relax, elastic, batches, reference relaxations) stop at request.state.deadline,
+# while single model calls and analysis/hull work run to completion.
+ADMISSION_ROUTES = {
+    "/analyze/cif": ("analysis", 0),
+    "/analyze/material": ("analysis", 0),
+    "/convert": ("analysis", 0),
+    "/structures": ("analysis", 0),
+    "/analyze/bulk": ("analysis", 2),
+    "/convert/stream": ("analysis", 2),
+    "/phase-diagram": ("hull", 0),
+    "/mlip/energy": ("mlip", 0),
+    "/mlip/formation-energy": ("mlip", 0),
+    "/mlip/relax": ("mlip", 1),
+    "/mlip/energy/batch": ("mlip", 2),
+    "/mlip/formation-energy/batch": ("mlip", 2),
+    "/mlip/references/compute": ("mlip", 2),
+    "/mlip/elastic": ("mlip", 2),
+}
+admission = AdmissionControl(ADMISSION_ROUTES)
+
+# Every route also speaks msgpack/npz (Content-Type for requests, Accept for responses);
+# routes in ADMISSION_ROUTES are admitted first
+app.router.route_class = admission_route(admission, WireRoute)
+
+# Relaxation caps: BFGS steps per request and wall-clock seconds per background job
+MAX_RELAX_STEPS = int(os.environ.get("MAX_RELAX_STEPS", 1000))
+RELAX_JOB_TIMEOUT = float(os.environ.get("RELAX_JOB_TIMEOUT", 1800))
+# Queued relaxation jobs before submissions get 429
+MAX_QUEUED_JOBS = int(os.environ.get("MAX_QUEUED_JOBS", 64))
+# MD caps: steps per job, trajectory file size, wall-clock seconds, frames per slice request
+MAX_MD_STEPS = int(os.environ.get("MAX_MD_STEPS", 200000))
+MD_MAX_TRAJECTORY_MB = float(os.environ.get("MD_MAX_TRAJECTORY_MB", 2048))
+MD_JOB_TIMEOUT = float(os.environ.get("MD_JOB_TIMEOUT", 4 * 3600))
+MD_MAX_FRAMES_PER_REQUEST = int(os.environ.get("MD_MAX_FRAMES_PER_REQUEST", 1000))
+MD_PROGRESS_INTERVAL = float(os.environ.get("MD_PROGRESS_INTERVAL", 0.5))  # seconds between progress events
+
 # CORS for Next.js frontend
 app.add_middleware(
     CORSMiddleware,
@@ -69,17 +265,121 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ?profile=1 (or X-Profile: 1) returns a cProfile summary of the request's pool work
+REQUEST_PROFILING = os.environ.get("REQUEST_PROFILING", "0") == "1"
+
+
+def route_template(request: Request) -> str:
+    """Route path (e.g. /mlip/relax/jobs/{job_id}) so metric labels stay bounded"""
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """Request and stage timings for /metrics and the Server-Timing header"""
+    endpoint = route_template(request)
+    profile = REQUEST_PROFILING and "1" in (request.query_params.get("profile"), request.headers.get("x-profile"))
+    start = time.perf_counter()
+    with metrics.request_context(endpoint, profile) as ctx:
+        response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    metrics.REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
+    response.headers["Server-Timing"] = metrics.server_timing(ctx, elapsed)
+
+    if profile and response.headers.get("content-type", "").startswith("application/json"):
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        # Keep what inner layers set (CORS, Vary, ETag, Server-Timing); the length changes
+        headers = {k: v for k, v in response.headers.items() if k not in ("content-length", "content-type")}
+        return JSONResponse(
+            status_code=response.status_code,
+            content={"result": json.loads(body), "profile": {"stages": ctx.stages, "calls": ctx.profiles}},
+            headers=headers,
+        )
+    return response
+
 # Environment
 MP_API_KEY = os.environ.get("MP_API_KEY", "")
 
+# Result cache: memory tier size in MB, optional directory for the disk tier
+result_cache = ResultCache(
+    max_bytes=int(float(os.environ.get("RESULT_CACHE_MB", 64)) * 1024 * 1024),
+    disk_dir=os.environ.get("RESULT_CACHE_DIR") or None,
+)
+ANALYSIS_VERSION = "analysis-3"
+
+# Identical concurrent requests share one computation
+inflight = SingleFlight()
+
+# Uploaded structures by handle, memory budget in MB
+structure_store = StructureStore(
+    max_bytes=int(float(os.environ.get("STRUCTURE_STORE_MB", 256)) * 1024 * 1024),
+)
+
+# Local Materials Project store: one client per I/O thread, TTL refresh, LRU-bounded
+# memory tables, optional on-disk persistence and offline mode seeded from a snapshot
+mp_store = MPStore(
+    api_key=MP_API_KEY,
+    store_dir=os.environ.get("MP_STORE_DIR") or None,
+    ttl=float(os.environ.get("MP_STORE_TTL", 7 * 86400)),
+    offline=os.environ.get("MP_OFFLINE", "0") == "1",
+    max_structures=int(os.environ.get("MP_STORE_MAX_STRUCTURES", 10000)),
+    max_entry_sets=int(os.environ.get("MP_STORE_MAX_ENTRY_SETS", 128)),
+)
+if os.environ.get("MP_STORE_SNAPSHOT"):
+    with profile_step("load MP store snapshot"):
+        mp_store.load_snapshot(os.environ["MP_STORE_SNAPSHOT"])
+
+# Periodic table, built once; lookups are dictionary reads
+with profile_step("build element index"):
+    element_index = ElementIndex()
+ELEMENT_CACHE_MAX_AGE = int(os.environ.get("ELEMENT_CACHE_MAX_AGE", 86400))  # seconds, Cache-Control max-age
+
+# Built convex hulls, keyed by sorted chemsys
+hull_cache = HullCache(max_hulls=int(os.environ.get("HULL_CACHE_SIZE", 32)))
+
+# MLIP elemental references per model/version, persisted as JSON
+reference_store = ReferenceStore(
+    directory=os.environ.get("REFERENCE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                              "mlip_references"),
+)
+REFERENCE_FMAX = float(os.environ.get("REFERENCE_FMAX", 0.02))
+REFERENCE_STEPS = int(os.environ.get("REFERENCE_STEPS", 300))
+REFERENCE_CANDIDATES = int(os.environ.get("REFERENCE_CANDIDATES", 3))
+# Seconds a reference computed from prototypes while MP was unreachable is kept before retrying MP
+REFERENCE_FALLBACK_TTL = float(os.environ.get("REFERENCE_FALLBACK_TTL", 600))
+
+# Background relaxation jobs: a fixed worker set, each job runs on the MLIP pool
+job_manager = JobManager(
+    workers=int(os.environ.get("RELAX_WORKERS", POOL_CONFIG["mlip"]["workers"])),
+    history=int(os.environ.get("JOB_HISTORY", 100)),
+    use_processes=POOL_CONFIG["mlip"]["kind"] == "process",
+)
+
+# Memory-mapped MD trajectories, one file per job
+trajectory_store = TrajectoryStore(
+    os.environ.get("MD_TRAJECTORY_DIR") or os.path.join(tempfile.gettempdir(), "materials-md-trajectories"),
+)
+
 
 # ============ Models ============
 
 class CifInput(BaseModel):
-    cif_string: str
+    cif_string: Optional[str] = None
+    structure_handle: Optional[str] = None  # From POST /structures, in place of cif_string
+    bond_cutoff: float = DEFAULT_BOND_CUTOFF  # Angstrom
 
 class MaterialIdInput(BaseModel):
     material_id: str
+    bond_cutoff: float = DEFAULT_BOND_CUTOFF  # Angstrom
+
+class StructureUploadInput(BaseModel):
+    content: Optional[str] = None
+    format: str = "cif"  # cif, poscar, xyz or extxyz; the first frame is stored
+    structure_dict: Optional[dict] = None  # In place of content, see wire.structure_from_dict
 
 class ConversionInput(BaseModel):
     content: str
@@ -89,68 +389,186 @@ class ConversionInput(BaseModel):
 class PhaseDiagramInput(BaseModel):
     elements: List[str]
 
-class EnergyInput(BaseModel):
+class MaterialIdsInput(BaseModel):
+    material_ids: List[str]
+
+class MLIPModelInput(BaseModel):
+    model: Optional[str] = None    # Defaults to UPET_MODEL (pet-mad-s)
+    version: Optional[str] = None  # Defaults to UPET_VERSION
+    device: Optional[str] = None   # Defaults to UPET_DEVICE (cpu)
+
+    def model_spec(self) -> ModelSpec:
+        return requested_spec(self.model, self.version, self.device)
+
+class EnergyInput(MLIPModelInput):
     material_id: Optional[str] = None
     cif_string: Optional[str] = None
-    structure_dict: Optional[dict] = None
+    structure_handle: Optional[str] = None
+    structure_dict: Optional[dict] = None  # Structure.as_dict() or arrays, see wire.structure_from_dict
+    reduce_cell: Optional[str] = None  # "primitive" or "niggli": evaluate in the reduced cell
 
-class RelaxInput(BaseModel):
+class RelaxInput(MLIPModelInput):
     material_id: Optional[str] = None
     cif_string: Optional[str] = None
+    structure_handle: Optional[str] = None
+    structure_dict: Optional[dict] = None
     fmax: float = 0.05  # Force convergence threshold
     steps: int = 100    # Max optimization steps
+    reduce_cell: Optional[str] = None  # Relax the primitive/Niggli cell, mapped back to this one
+    measure_speedup: bool = False  # With reduce_cell: time one full-cell call to report the speedup
 
-class FormationEnergyInput(BaseModel):
+class FormationEnergyInput(MLIPModelInput):
     material_id: Optional[str] = None
     cif_string: Optional[str] = None
+    structure_handle: Optional[str] = None
+    structure_dict: Optional[dict] = None
     elements_reference: Optional[dict] = None  # Custom reference energies
+    reference: str = "mlip"  # "mlip": relaxed elements with this model; "table": approximate PBEsol values
+    reduce_cell: Optional[str] = None
+
+class BatchStructureInput(BaseModel):
+    id: Optional[str] = None  # Client label echoed back in the result
+    material_id: Optional[str] = None
+    cif_string: Optional[str] = None
+    structure_handle: Optional[str] = None
+    structure_dict: Optional[dict] = None
+
+class BatchEnergyInput(MLIPModelInput):
+    structures: List[BatchStructureInput]
+    max_atoms_per_batch: int = DEFAULT_MAX_ATOMS_PER_BATCH
+    include_forces: bool = True
+    include_stress: bool = True
+
+class CompoundInput(BatchStructureInput):
+    formula: Optional[str] = None    # With energy_eV, skips the model call
+    energy_eV: Optional[float] = None  # Total energy of formula, computed with the same model
+
+class BatchFormationEnergyInput(MLIPModelInput):
+    compounds: List[CompoundInput]
+    max_atoms_per_batch: int = DEFAULT_MAX_ATOMS_PER_BATCH
+    elements_reference: Optional[dict] = None
+    reference: str = "mlip"
+
+class ReferencesInput(MLIPModelInput):
+    elements: List[str]
+    recompute: bool = False  # Discard the stored references and compute them again
+
+class MDInput(MLIPModelInput):
+    material_id: Optional[str] = None
+    cif_string: Optional[str] = None
+    structure_handle: Optional[str] = None
+    structure_dict: Optional[dict] = None
+    ensemble: str = "nvt"  # "nvt" (Langevin) or "npt" (Berendsen)
+    temperature_K: float = 300.0
+    timestep_fs: float = 1.0
+    steps: int = 1000
+    interval: int = 10  # Steps between trajectory frames
+    pressure_GPa: float = 0.0  # NPT only
+    friction_per_fs: float = 0.01  # NVT Langevin friction
+    taut_fs: float = 100.0  # NPT thermostat time constant
+    taup_fs: float = 1000.0  # NPT barostat time constant
+    compressibility_per_GPa: float = 0.01  # NPT barostat coupling
+    seed: Optional[int] = None
+
+class ScreeningInput(MLIPModelInput):
+    elements: List[str]
+    max_candidates: int = 50
+    max_dft_e_above_hull: Optional[float] = 0.2  # eV/atom MP prefilter; None screens every compound
+    max_atoms: int = 200  # Larger cells are skipped
+    relax: bool = True  # False: single-point energies of the MP structures
+    fmax: float = 0.05
+    steps: int = 200
+    workers: Optional[int] = None  # Concurrent evaluations, default MLIP pool size + 1
+
+class ElasticInput(MLIPModelInput):
+    material_id: Optional[str] = None
+    cif_string: Optional[str] = None
+    structure_handle: Optional[str] = None
+    structure_dict: Optional[dict] = None
+    relax: bool = False  # Relax the reference (cell + positions) before straining
+    # Clamped-ion Cij (the default) are only right for Bravais lattices; relax_ions relaxes the
+    # positions in the reference and every strained cell (e.g. C44 of diamond or zincblende)
+    relax_ions: bool = False
+    fmax: float = 0.01
+    eos_points: int = 7  # 0 skips the EOS; an odd count reuses the reference as the midpoint
+    eos_max_volume_strain: float = 0.06
+    eos_model: str = "birch_murnaghan"
+    strain_magnitudes: List[float] = [0.005, 0.01]  # Empty skips Cij
+    max_atoms_per_batch: int = DEFAULT_MAX_ATOMS_PER_BATCH
 
 
 # ============ Structure Analysis ============
 
-def analyze_structure(structure: Structure) -> dict:
-    """Common structure analysis logic"""
-    # Symmetry analysis
-    sga = SpacegroupAnalyzer(structure)
+# CrystalNN runs on at most this many symmetry-distinct sites (low-symmetry cells have one per atom)
+MAX_COORDINATION_SITES = int(os.environ.get("MAX_COORDINATION_SITES", 16))
 
-    # Crystal NN for coordination
-    cnn = CrystalNN()
-    coordination_info = []
+def site_classes(sga) -> List[dict]:
+    """Symmetry-distinct sites: representative index, Wyckoff symbol and equivalent indices"""
+    symmetrized = sga.get_symmetrized_structure()
+    return [
+        {"index": indices[0], "wyckoff": wyckoff, "equivalent_sites": list(indices)}
+        for indices, wyckoff in zip(symmetrized.equivalent_indices, symmetrized.wyckoff_symbols)
+    ]
 
-    for i, site in enumerate(structure):
-        if i >= 10:  # Limit to first 10 sites
-            break
-        try:
-            nn_info = cnn.get_nn_info(structure, i)
-            coord_num = len(nn_info)
-            neighbors = [f"{n['site'].specie}({n['weight']:.2f})" for n in nn_info[:5]]
-            coordination_info.append({
-                "site": f"{site.specie} #{i+1}",
-                "coordination_number": coord_num,
-                "neighbors": neighbors
-            })
-        except:
-            coordination_info.append({
-                "site": f"{site.specie} #{i+1}",
-                "coordination_number": "N/A",
-                "neighbors": []
-            })
 
-    # Bond lengths
-    bond_lengths = []
-    for i, site1 in enumerate(structure):
-        for j, site2 in enumerate(structure):
-            if i < j:
-                dist = site1.distance(site2)
-                if dist < 3.5:
-                    bond_lengths.append({
-                        "bond": f"{site1.specie}-{site2.specie}",
-                        "length": round(dist, 4)
-                    })
+def coordination_for_sites(structure: Structure, indices: List[int]) -> List[dict]:
+    """CrystalNN environment of each given site (runs on the analysis pool)"""
+    from pymatgen.analysis.local_env import CrystalNN
 
-    bond_lengths = sorted(bond_lengths, key=lambda x: x["length"])[:20]
+    cnn = CrystalNN()
+    environments = []
+    with metrics.stage("crystalnn"):
+        for i in indices:
+            try:
+                nn_info = cnn.get_nn_info(structure, i)
+                environments.append({
+                    "coordination_number": len(nn_info),
+                    "neighbors": [f"{n['site'].specie}({n['weight']:.2f})" for n in nn_info[:5]]
+                })
+            except Exception:
+                environments.append({"coordination_number": "N/A", "neighbors": []})
+    return environments
+
+
+def coordination_entries(structure: Structure, classes: List[dict], environments: List[dict]) -> List[dict]:
+    """One entry per distinct site, applying to every equivalent site"""
+    return [
+        {
+            "site": f"{structure[c['index']].specie} #{c['index'] + 1}",
+            **env,
+            "wyckoff": c["wyckoff"],
+            "multiplicity": len(c["equivalent_sites"]),
+            "equivalent_sites": [i + 1 for i in c["equivalent_sites"]],
+        }
+        for c, env in zip(classes, environments)
+    ]
 
-    return {
+
+def structure_summary(structure: Structure, bond_cutoff: float = DEFAULT_BOND_CUTOFF):
+    """Everything but coordination, plus the symmetry-distinct site classes"""
+    from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
+
+    # Symmetry analysis
+    with metrics.stage("symmetry"):
+        sga = SpacegroupAnalyzer(structure)
+        symmetry = {
+            "space_group": sga.get_space_group_symbol(),
+            "space_group_number": sga.get_space_group_number(),
+            "crystal_system": sga.get_crystal_system(),
+            "point_group": sga.get_point_group_symbol(),
+        }
+        classes = site_classes(sga)
+
+    # Bond lengths (periodic neighbor list, each bond counted once)
+    with metrics.stage("bonds"):
+        bond_lengths, bond_statistics = bond_analysis(
+            [str(site.specie) for site in structure],
+            structure.cart_coords,
+            structure.lattice.matrix,
+            cutoff=bond_cutoff,
+        )
+
+    summary = {
         "formula": structure.composition.reduced_formula,
         "num_sites": len(structure),
         "volume": round(structure.volume, 4),
@@ -164,45 +582,318 @@ def analyze_structure(structure: Structure) -> dict:
             "gamma": round(structure.lattice.gamma, 2),
             "volume": round(structure.lattice.volume, 4)
         },
-        "symmetry": {
-            "space_group": sga.get_space_group_symbol(),
-            "space_group_number": sga.get_space_group_number(),
-            "crystal_system": sga.get_crystal_system(),
-            "point_group": sga.get_point_group_symbol(),
-        },
-        "coordination": coordination_info,
+        "symmetry": symmetry,
+        "coordination": [],
+        "coordination_truncated": False,
         "bond_lengths": bond_lengths,
+        "bond_statistics": bond_statistics,
         "elements": [str(el) for el in structure.composition.elements],
         "composition": {str(k): v for k, v in structure.composition.as_dict().items()}
     }
+    return summary, classes
+
+
+def coordination_classes(result: dict, classes: List[dict]) -> List[dict]:
+    """The site classes CrystalNN evaluates, flagging the result when the cap drops some"""
+    result["coordination_truncated"] = len(classes) > MAX_COORDINATION_SITES
+    return classes[:MAX_COORDINATION_SITES]
+
+
+def analyze_structure(structure: Structure, bond_cutoff: float = DEFAULT_BOND_CUTOFF) -> dict:
+    """
+    Common structure analysis logic; CrystalNN runs once per symmetry-distinct
+    site, up to MAX_COORDINATION_SITES of them
+    """
+    result, classes = structure_summary(structure, bond_cutoff)
+    classes = coordination_classes(result, classes)
+    environments = coordination_for_sites(structure, [c["index"] for c in classes])
+    result["coordination"] = coordination_entries(structure, classes, environments)
+    return result
+
+
+async def analyze_structure_parallel(structure: Structure, bond_cutoff: float = DEFAULT_BOND_CUTOFF) -> dict:
+    """analyze_structure with the distinct sites split across the analysis pool"""
+    result, classes = await run_analysis(structure_summary, structure, bond_cutoff)
+    classes = coordination_classes(result, classes)
+    indices = [c["index"] for c in classes]
+    n_chunks = max(1, min(len(indices), POOL_CONFIG["analysis"]["workers"]))
+    chunks = [indices[k::n_chunks] for k in range(n_chunks)]
+    parts = await asyncio.gather(*[run_analysis(coordination_for_sites, structure, chunk) for chunk in chunks])
+
+    by_index = {}
+    for chunk, part in zip(chunks, parts):
+        by_index.update(zip(chunk, part))
+    result["coordination"] = coordination_entries(structure, classes, [by_index[i] for i in indices])
+    return result
+
+
+def analyze_cif_string(cif_string: str, bond_cutoff: float = DEFAULT_BOND_CUTOFF) -> dict:
+    """Parse and analyze a CIF string (runs on the analysis pool)"""
+    from pymatgen.io.cif import CifParser
+
+    parser = CifParser.from_str(cif_string)
+    structure = parser.get_structures()[0]
+    return analyze_structure(structure, bond_cutoff)
+
+
+def parse_cif_with_fingerprint(cif_string: str):
+    """Parse a CIF string and fingerprint the first structure"""
+    from pymatgen.io.cif import CifParser
+
+    with metrics.stage("parse_cif"):
+        structure = CifParser.from_str(cif_string).get_structures()[0]
+    with metrics.stage("fingerprint"):
+        return structure, structure_fingerprint(structure)
+
+
+def normalize_material_id(material_id: str) -> str:
+    return material_id.strip().lower()
+
+
+def input_id(material_id: Optional[str] = None, cif_string: Optional[str] = None,
+             structure_handle: Optional[str] = None, structure_dict: Optional[dict] = None) -> Optional[str]:
+    """Normalized identity of a request's structure input, for coalescing"""
+    if structure_handle:
+        return "handle:" + structure_handle
+    if material_id:
+        return "mp:" + normalize_material_id(material_id)
+    if cif_string:
+        return text_digest(cif_string.strip())
+    if structure_dict:
+        return text_digest(json.dumps(structure_dict, sort_keys=True))
+    return None
+
+
+def raw_cif_input(material_id: Optional[str] = None, cif_string: Optional[str] = None,
+                  structure_handle: Optional[str] = None) -> Optional[str]:
+    """The CIF text when it is the input actually parsed (see get_structure_from_input)"""
+    return None if structure_handle or material_id else cif_string
+
+
+async def cached_compute(endpoint: str, params: dict, version: str, load, compute,
+                         raw_input: Optional[str] = None, request_id: Optional[str] = None,
+                         exact: bool = False) -> dict:
+    """
+    Serve an endpoint result from the result cache.
+
+    load() is awaited to get (structure, fingerprint) and compute(structure)
+    to produce the result on a miss. raw_input (e.g. the CIF text) lets
+    repeated identical requests skip parsing entirely. Results that depend
+    on the cell orientation or site order pass exact=True and are keyed on
+    the structure as submitted rather than the canonical fingerprint.
+
+    Concurrent requests with the same request_id (see input_id) share one
+    load and computation; different inputs of the same structure share the
+    computation once fingerprinted.
+    """
+    run = lambda: _cached_compute(endpoint, params, version, load, compute, raw_input, exact)
+    if request_id is None:
+        return await run()
+    return await inflight.do(make_key(f"request:{endpoint}", request_id, params, version), run)
+
+
+async def _cached_compute(endpoint: str, params: dict, version: str, load, compute,
+                          raw_input: Optional[str] = None, exact: bool = False) -> dict:
+    raw_key = None
+    if raw_input:
+        raw_key = make_key(endpoint, text_digest(raw_input), params, version)
+        cached = result_cache.get(raw_key, count_miss=False)
+        if cached is not None:
+            return cached
+
+    structure, fingerprint = await load()
+    if exact:
+        fingerprint = exact_fingerprint(structure)
+    key = make_key(endpoint, fingerprint, params, version)
+    result = result_cache.get(key)
+    if result is None:
+        result = await inflight.do(key, lambda: compute(structure))
+        if not result.get("success", True):
+            return result
+        result_cache.put(key, result)
+    if raw_key:
+        result_cache.alias(raw_key, key)
+    return result
+
+
+def fetch_mp_structures(material_id: str) -> list:
+    """Fetch a structure through the local MP store (runs on the I/O pool)"""
+    with metrics.stage("mp_fetch"):
+        structure = mp_store.get_structure(material_id)
+    return [structure] if structure is not None else []
 
 
 @app.post("/analyze/cif")
 async def analyze_cif(data: CifInput):
-    """Analyze a CIF structure"""
+    """Analyze a CIF structure (or an uploaded structure handle)"""
+    if data.structure_handle:
+        load = lambda: run_io(structure_store.load, data.structure_handle)
+    elif data.cif_string:
+        load = lambda: run_analysis(parse_cif_with_fingerprint, data.cif_string)
+    else:
+        raise HTTPException(status_code=400, detail="Either cif_string or structure_handle required")
+
     try:
-        parser = CifParser.from_str(data.cif_string)
-        structure = parser.get_structures()[0]
-        return analyze_structure(structure)
+        return await cached_compute(
+            "analyze", {"bond_cutoff": data.bond_cutoff, "coordination_sites": MAX_COORDINATION_SITES},
+            ANALYSIS_VERSION,
+            load=load,
+            compute=lambda structure: analyze_structure_parallel(structure, data.bond_cutoff),
+            raw_input=raw_cif_input(cif_string=data.cif_string, structure_handle=data.structure_handle),
+            request_id=input_id(cif_string=data.cif_string, structure_handle=data.structure_handle),
+            exact=True,
+        )
+    except UnknownHandleError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+# Analyses queued on the analysis pool per worker during bulk runs
+BULK_QUEUE_PER_WORKER = int(os.environ.get("BULK_QUEUE_PER_WORKER", 4))
+# Bulk upload caps: request body, and each archive member once decompressed
+MAX_BULK_BYTES = int(os.environ.get("MAX_BULK_BYTES", 256 * 1024 * 1024))
+MAX_BULK_MEMBER_BYTES = int(os.environ.get("MAX_BULK_MEMBER_BYTES", 32 * 1024 * 1024))
+
+
+def analyze_frame(text: str, fmt: str, bond_cutoff: float = DEFAULT_BOND_CUTOFF) -> dict:
+    """Parse and analyze one frame (runs on the analysis pool); errors are returned, not raised"""
+    try:
+        with metrics.stage("parse"):
+            structure = read_frame(text, fmt)
+        return {"success": True, **analyze_structure(structure, bond_cutoff)}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def iter_bulk_frames(body: bytes, fmt: str):
+    """
+    (id, format, frame text) for each structure in an archive or a
+    multi-frame text body; a member that cannot be split yields
+    (id, None, error message) and the remaining members still follow
+    """
+    if is_archive(body):
+        members = iter_archive(body, MAX_BULK_MEMBER_BYTES)
+    else:
+        members = [("", fmt, body.decode("utf-8", errors="replace"))]
+    for name, member_fmt, text in members:
+        if member_fmt is None:
+            yield name, None, text
+            continue
+        n = 0
+        try:
+            for frame in iter_frames(text, member_fmt):
+                yield f"{name}#{n}" if name else str(n), member_fmt, frame
+                n += 1
+        except ValueError as e:
+            yield f"{name}#{n}" if name else str(n), None, str(e)
+
+
+async def read_limited_body(request: Request, max_bytes: int) -> bytes:
+    """Request body, rejected with 413 past max_bytes (declared Content-Length or bytes received)"""
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Request body larger than {max_bytes} bytes")
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Request body larger than {max_bytes} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+@app.post("/analyze/bulk")
+async def analyze_bulk(request: Request, format: str = "cif", bond_cutoff: float = DEFAULT_BOND_CUTOFF):
+    """
+    Analyze every structure in a tar/zip archive (.cif, .xyz/.extxyz,
+    POSCAR/CONTCAR/.vasp members) or a multi-block CIF / multi-frame body.
+
+    Structures are spread over the analysis pool; NDJSON records stream
+    back in completion order, followed by a summary record. Bodies over
+    MAX_BULK_BYTES get 413; archive members are unpacked on the I/O pool.
+    """
+    body = await read_limited_body(request, MAX_BULK_BYTES)
+    try:
+        fmt = normalize_format(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not body:
+        raise HTTPException(status_code=400, detail="Empty request body")
+
+    async def stream():
+        start = time.perf_counter()
+        n_total = n_ok = 0
+        frames = iter_bulk_frames(body, fmt)
+        max_in_flight = max(1, POOL_CONFIG["analysis"]["workers"]) * BULK_QUEUE_PER_WORKER
+        pending = {}
+        exhausted = False
+
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                try:
+                    item = await run_io(next, frames, None)  # decompression and decoding stay off the loop
+                except Exception as e:  # unreadable archive
+                    exhausted = True
+                    yield json.dumps({"index": n_total, "id": None, "success": False, "error": str(e)}) + "\n"
+                    n_total += 1
+                else:
+                    if item is None:
+                        exhausted = True
+                        continue
+                    item_id, item_fmt, text = item
+                    if item_fmt is None:
+                        yield json.dumps({"index": n_total, "id": item_id, "success": False, "error": text}) + "\n"
+                        n_total += 1
+                        continue
+                    task = asyncio.ensure_future(run_analysis(analyze_frame, text, item_fmt, bond_cutoff))
+                    pending[task] = (n_total, item_id)
+                    n_total += 1
+            if not pending:
+                break
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, item_id = pending.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    result = {"success": False, "error": str(e)}
+                n_ok += result["success"]
+                yield json.dumps({"index": index, "id": item_id, **result}) + "\n"
+
+        elapsed = time.perf_counter() - start
+        yield json.dumps({
+            "summary": True,
+            "n_structures": n_total,
+            "n_succeeded": n_ok,
+            "n_failed": n_total - n_ok,
+            "workers": POOL_CONFIG["analysis"]["workers"],
+            "elapsed_s": round(elapsed, 4),
+            "structures_per_s": round(n_ok / elapsed, 2) if elapsed > 0 else None
+        }) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @app.post("/analyze/material")
 async def analyze_material(data: MaterialIdInput):
     """Analyze a material from Materials Project using new API"""
-    try:
-        with MPRester(MP_API_KEY) as mpr:
-            # Use new API to get structure
-            docs = mpr.materials.summary.search(material_ids=[data.material_id], fields=["structure"])
-            if not docs or len(docs) == 0:
-                raise HTTPException(status_code=404, detail=f"Material {data.material_id} not found")
-            structure = docs[0].structure
+    async def analyze():
+        structures = await run_io(fetch_mp_structures, data.material_id)
+        if not structures:
+            raise HTTPException(status_code=404, detail=f"Material {data.material_id} not found")
+        structure = structures[0]
 
         if structure is None:
             raise HTTPException(status_code=404, detail=f"Material {data.material_id} structure not found")
 
-        return analyze_structure(structure)
+        return await analyze_structure_parallel(structure, data.bond_cutoff)
+
+    try:
+        key = make_key("request:analyze/material", input_id(data.material_id), {"bond_cutoff": data.bond_cutoff},
+                       ANALYSIS_VERSION)
+        return await inflight.do(key, analyze)
     except HTTPException:
         raise
     except Exception as e:
@@ -213,62 +904,232 @@ async def analyze_material(data: MaterialIdInput):
 
 # ============ Structure Conversion ============
 
+# Frames per analysis-pool task when streaming conversions
+CONVERT_CHUNK_FRAMES = int(os.environ.get("CONVERT_CHUNK_FRAMES", 32))
+
+
+def convert_content(content: str, from_format: str, to_format: str) -> dict:
+    """Convert every frame between CIF, POSCAR, (ext)XYZ formats (runs on the analysis pool)"""
+    results = convert_frames(list(iter_frames(content, from_format)), from_format, to_format)
+    if not results:
+        raise ValueError(f"No {from_format} frames found")
+    for n, result in enumerate(results):
+        if not result["success"]:
+            raise ValueError(f"Frame {n}: {result['error']}")
+
+    separator = "" if normalize_format(to_format) in ("xyz", "extxyz") else "\n"
+    return {
+        "success": True,
+        "from_format": from_format,
+        "to_format": to_format,
+        "formula": results[0]["formula"],
+        "n_frames": len(results),
+        "output": separator.join(result["output"] for result in results)
+    }
+
+
 @app.post("/convert")
 async def convert_structure(data: ConversionInput):
     """Convert between CIF, POSCAR, XYZ formats"""
     try:
-        structure = None
-
-        if data.from_format.lower() == "cif":
-            parser = CifParser.from_str(data.content)
-            structure = parser.get_structures()[0]
-        elif data.from_format.lower() == "poscar":
-            poscar = Poscar.from_str(data.content)
-            structure = poscar.structure
-        elif data.from_format.lower() == "xyz":
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.xyz', delete=False) as f:
-                f.write(data.content)
-                f.flush()
-                atoms = read(f.name, format='xyz')
-                structure = AseAtomsAdaptor.get_structure(atoms)
-            os.unlink(f.name)
-        else:
-            raise HTTPException(status_code=400, detail=f"Unsupported input format: {data.from_format}")
-
-        output = ""
-
-        if data.to_format.lower() == "cif":
-            writer = CifWriter(structure)
-            output = str(writer)
-        elif data.to_format.lower() == "poscar":
-            poscar = Poscar(structure)
-            output = poscar.get_str()
-        elif data.to_format.lower() == "xyz":
-            atoms = AseAtomsAdaptor.get_atoms(structure)
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.xyz', delete=False) as f:
-                write(f.name, atoms, format='xyz')
-            with open(f.name, 'r') as f:
-                output = f.read()
-            os.unlink(f.name)
-        else:
-            raise HTTPException(status_code=400, detail=f"Unsupported output format: {data.to_format}")
+        return await run_analysis(convert_content, data.content, data.from_format, data.to_format)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        return {
-            "success": True,
+
+@app.post("/convert/stream")
+async def convert_structure_stream(data: ConversionInput):
+    """
+    Convert multi-frame input frame by frame, streaming NDJSON records in
+    frame order as chunks finish on the analysis pool
+    """
+    try:
+        normalize_format(data.from_format)
+        normalize_format(data.to_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def split_error(e: Exception) -> list:
+        return [{"success": False, "error": str(e)}]
+
+    def chunks():
+        chunk = []
+        try:
+            for frame in iter_frames(data.content, data.from_format):
+                chunk.append(frame)
+                if len(chunk) == CONVERT_CHUNK_FRAMES:
+                    yield chunk
+                    chunk = []
+        except ValueError:
+            if chunk:
+                yield chunk
+            raise
+        if chunk:
+            yield chunk
+
+    async def stream():
+        start = time.perf_counter()
+        index = n_ok = 0
+        in_flight = []
+        frames = chunks()
+        while True:
+            # Keep one chunk per analysis worker in flight; results go out in order
+            while len(in_flight) < max(1, POOL_CONFIG["analysis"]["workers"]):
+                try:
+                    chunk = next(frames)
+                except StopIteration:
+                    break
+                except ValueError as e:
+                    # Unsplittable input ends the stream after the frames already queued
+                    in_flight.append(asyncio.ensure_future(split_error(e)))
+                    frames = iter(())
+                    break
+                in_flight.append(asyncio.ensure_future(
+                    run_analysis(convert_frames, chunk, data.from_format, data.to_format)
+                ))
+            if not in_flight:
+                break
+            try:
+                results = await in_flight.pop(0)
+            except Exception as e:
+                results = [{"success": False, "error": str(e)}]
+            for result in results:
+                n_ok += result["success"]
+                yield json.dumps({"index": index, **result}) + "\n"
+                index += 1
+
+        elapsed = time.perf_counter() - start
+        yield json.dumps({
+            "summary": True,
             "from_format": data.from_format,
             "to_format": data.to_format,
-            "formula": structure.composition.reduced_formula,
-            "output": output
-        }
+            "n_frames": index,
+            "n_succeeded": n_ok,
+            "elapsed_s": round(elapsed, 4),
+            "frames_per_s": round(n_ok / elapsed, 2) if elapsed > 0 else None
+        }) + "\n"
 
-    except HTTPException:
-        raise
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+# ============ Structure Store ============
+
+def parse_for_store(content: Optional[str], fmt: str, structure_dict: Optional[dict] = None):
+    """Parse the first frame into its compact form plus fingerprint (runs on the analysis pool)"""
+    if structure_dict:
+        with metrics.stage("parse"):
+            structure = structure_from_dict(structure_dict)
+    else:
+        text = next(iter_frames(content, fmt), None)
+        if text is None:
+            raise ValueError("No structure found in content")
+        with metrics.stage("parse"):
+            structure = read_frame(text, fmt)
+    with metrics.stage("fingerprint"):
+        fingerprint = structure_fingerprint(structure)
+    return CompactStructure.from_structure(structure), fingerprint, structure.composition.reduced_formula
+
+
+@app.post("/structures")
+async def upload_structure(data: StructureUploadInput):
+    """
+    Parse a structure once and return a handle that analysis and MLIP
+    endpoints accept as structure_handle in place of cif_string
+    """
+    if not data.content and not data.structure_dict:
+        raise HTTPException(status_code=400, detail="Either content or structure_dict required")
+    try:
+        if data.structure_dict:
+            fmt = "dict"
+            handle = upload_handle(json.dumps(data.structure_dict, sort_keys=True), fmt)
+        else:
+            fmt = normalize_format(data.format)
+            handle = upload_handle(data.content, fmt)
+        record = structure_store.record(handle)
+        if record is not None:
+            return {**record.to_dict(), "reused": True}
+        compact, fingerprint, formula = await run_analysis(parse_for_store, data.content, fmt, data.structure_dict)
+        record = structure_store.put(handle, compact, fingerprint, formula)
+        return {**record.to_dict(), "reused": False}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.get("/structures/stats")
+async def structure_store_stats():
+    """Uploaded structure counts, hits and memory use"""
+    return structure_store.stats()
+
+
+def get_record_or_404(handle: str):
+    record = structure_store.record(handle)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Structure handle {handle} not found")
+    return record
+
+
+@app.get("/structures/{handle}")
+async def get_structure(handle: str):
+    """Metadata of an uploaded structure"""
+    return get_record_or_404(handle).to_dict()
+
+
+@app.delete("/structures/{handle}")
+async def delete_structure(handle: str):
+    """Release an uploaded structure"""
+    if not structure_store.delete(handle):
+        raise HTTPException(status_code=404, detail=f"Structure handle {handle} not found")
+    return {"status": "deleted", "handle": handle}
+
+
 # ============ Phase Diagram ============
 
+def fetch_chemsys_entries(elements: List[str]) -> list:
+    """Fetch computed entries through the local MP store (runs on the I/O pool)"""
+    with metrics.stage("mp_fetch"):
+        return mp_store.get_entries(elements)
+
+
+def summarize_phase_diagram(elements: List[str], entries: list) -> dict:
+    """Summarize the cached hull for a chemsys (runs on the hull pool)"""
+    with metrics.stage("hull"):
+        hull, indices = hull_cache.get(elements, entries)
+
+    with hull.lock:
+        # Get stable entries
+        stable_entries = []
+        for i in indices:
+            if hull.stable[i]:
+                entry = hull.entries[i]
+                stable_entries.append({
+                    "formula": entry.composition.reduced_formula,
+                    "energy_per_atom": round(entry.energy_per_atom, 4),
+                })
+
+        # Unstable entries, 20 lowest energies above hull, with decomposition
+        unstable = [i for i in indices if not hull.stable[i]]
+        unstable = sorted(unstable, key=lambda i: hull.e_above_hull[i])[:20]
+        unstable_entries = []
+        for i in unstable:
+            decomp_formula = " + ".join([f"{v:.2f} {k.composition.reduced_formula}"
+                                         for k, v in hull.decomposition(i)])
+            unstable_entries.append({
+                "formula": hull.entries[i].composition.reduced_formula,
+                "energy_above_hull": round(float(hull.e_above_hull[i]), 4),
+                "decomposition": decomp_formula
+            })
+
+    return {
+        "success": True,
+        "elements": elements,
+        "num_entries": len(indices),
+        "num_stable": len(stable_entries),
+        "stable_phases": stable_entries,
+        "unstable_phases": unstable_entries,
+        "summary": f"{'-'.join(elements)} system: {len(stable_entries)} stable, {len(indices) - len(stable_entries)} unstable phases"
+    }
+
+
 @app.post("/phase-diagram")
 async def get_phase_diagram(data: PhaseDiagramInput):
     """Generate phase diagram data for given elements"""
@@ -276,53 +1137,19 @@ async def get_phase_diagram(data: PhaseDiagramInput):
         if len(data.elements) < 2 or len(data.elements) > 4:
             raise HTTPException(status_code=400, detail="Phase diagram requires 2-4 elements")
 
-        with MPRester(MP_API_KEY) as mpr:
-            # Get entries using new API
-            entries = mpr.get_entries_in_chemsys(data.elements)
+        async def build():
+            entries = await run_io(fetch_chemsys_entries, data.elements)
 
-        if not entries:
-            return {
-                "success": False,
-                "message": f"No entries found for {'-'.join(data.elements)} system"
-            }
+            if not entries:
+                return {
+                    "success": False,
+                    "message": f"No entries found for {'-'.join(data.elements)} system"
+                }
 
-        # Create phase diagram
-        pd = PhaseDiagram(entries)
+            return await run_hull(summarize_phase_diagram, data.elements, entries)
 
-        # Get stable entries
-        stable_entries = []
-        for entry in pd.stable_entries:
-            stable_entries.append({
-                "formula": entry.composition.reduced_formula,
-                "energy_per_atom": round(entry.energy_per_atom, 4),
-            })
-
-        # Get unstable entries with decomposition
-        unstable_entries = []
-        for entry in pd.unstable_entries:
-            try:
-                decomp, e_above_hull = pd.get_decomp_and_e_above_hull(entry)
-                decomp_formula = " + ".join([f"{v:.2f} {k.composition.reduced_formula}"
-                                             for k, v in decomp.items()])
-                unstable_entries.append({
-                    "formula": entry.composition.reduced_formula,
-                    "energy_above_hull": round(e_above_hull, 4),
-                    "decomposition": decomp_formula
-                })
-            except:
-                pass
-
-        unstable_entries = sorted(unstable_entries, key=lambda x: x["energy_above_hull"])[:20]
-
-        return {
-            "success": True,
-            "elements": data.elements,
-            "num_entries": len(entries),
-            "num_stable": len(stable_entries),
-            "stable_phases": stable_entries,
-            "unstable_phases": unstable_entries,
-            "summary": f"{'-'.join(data.elements)} system: {len(stable_entries)} stable, {len(entries) - len(stable_entries)} unstable phases"
-        }
+        # Keyed on the element order too, since the response echoes it
+        return await inflight.do(f"request:phase-diagram:{chemsys_key(data.elements)}:{','.join(data.elements)}", build)
 
     except HTTPException:
         raise
@@ -330,31 +1157,51 @@ async def get_phase_diagram(data: PhaseDiagramInput):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.get("/phase-diagram/cache/stats")
+async def phase_diagram_cache_stats():
+    """Hull cache counters and cached systems"""
+    return hull_cache.stats()
+
+
 # ============ Element Info ============
 
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak If-None-Match comparison"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in tags]
+
+
+def cacheable_json(request: Request, body: bytes, etag: str) -> Response:
+    """JSON body with ETag/Cache-Control, or 304 when the client already has it"""
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={ELEMENT_CACHE_MAX_AGE}"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
 @app.get("/element/{symbol}")
-async def get_element_info(symbol: str):
+async def get_element_info(symbol: str, request: Request):
     """Get element information"""
     try:
-        el = Element(symbol)
-        return {
-            "symbol": el.symbol,
-            "name": el.long_name,
-            "atomic_number": el.Z,
-            "atomic_mass": round(float(el.atomic_mass), 4),
-            "electronic_structure": el.electronic_structure,
-            "group": el.group,
-            "row": el.row,
-            "block": el.block,
-            "is_metal": el.is_metal,
-            "is_metalloid": el.is_metalloid,
-            "is_transition_metal": el.is_transition_metal,
-            "oxidation_states": list(el.oxidation_states) if el.oxidation_states else [],
-            "electronegativity": float(el.X) if el.X else None,
-            "atomic_radius": float(el.atomic_radius) if el.atomic_radius else None,
-        }
-    except Exception as e:
+        selected = element_index.resolve([symbol])
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    return cacheable_json(request, element_index.row(selected[0]), element_index.etag(selected))
+
+
+@app.get("/elements")
+async def get_elements(request: Request, symbols: Optional[str] = None):
+    """
+    Properties of many elements in one response: a comma-separated subset
+    (e.g. ?symbols=Li,Fe,O, in that order) or the whole table
+    """
+    try:
+        selected = element_index.resolve([s for s in symbols.split(",") if s.strip()]) if symbols else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return cacheable_json(request, element_index.body(selected), element_index.etag(selected))
 
 
 # ============ UPET (MLIP) Calculations ============
@@ -375,195 +1222,1277 @@ ELEMENT_REFERENCE_ENERGIES = {
 }
 
 
-def get_structure_from_input(material_id: str = None, cif_string: str = None) -> Structure:
+def get_structure_from_input(material_id: str = None, cif_string: str = None,
+                             structure_handle: str = None, structure_dict: dict = None) -> Structure:
     """Helper to get structure from various inputs"""
-    if material_id:
-        with MPRester(MP_API_KEY) as mpr:
-            docs = mpr.materials.summary.search(material_ids=[material_id], fields=["structure"])
-            if not docs:
-                raise ValueError(f"Material {material_id} not found")
-            return docs[0].structure
+    if structure_handle:
+        return structure_store.load(structure_handle)[0]
+    elif material_id:
+        structures = fetch_mp_structures(material_id)
+        if not structures:
+            raise ValueError(f"Material {material_id} not found")
+        return structures[0]
     elif cif_string:
-        parser = CifParser.from_str(cif_string)
-        return parser.get_structures()[0]
+        from pymatgen.io.cif import CifParser
+
+        with metrics.stage("parse_cif"):
+            return CifParser.from_str(cif_string).get_structures()[0]
+    elif structure_dict:
+        with metrics.stage("parse"):
+            return structure_from_dict(structure_dict)
     else:
-        raise ValueError("Either material_id or cif_string required")
+        raise ValueError("Either material_id, cif_string, structure_handle or structure_dict required")
 
 
-@app.post("/mlip/energy")
-async def calculate_energy(data: EnergyInput):
-    """Calculate total energy using UPET MLIP"""
-    try:
-        calc = get_upet_calculator()
-        if calc is None:
-            raise HTTPException(status_code=503, detail="UPET not available. Install with: pip install upet")
+def load_structure_with_fingerprint(material_id: str = None, cif_string: str = None,
+                                    structure_handle: str = None, structure_dict: dict = None):
+    """Resolve the input structure and its canonical fingerprint"""
+    if structure_handle:
+        return structure_store.load(structure_handle)  # fingerprinted at upload
+    structure = get_structure_from_input(material_id, cif_string, structure_dict=structure_dict)
+    return structure, structure_fingerprint(structure)
 
-        # Get structure
-        structure = get_structure_from_input(data.material_id, data.cif_string)
 
-        # Convert to ASE atoms
-        atoms = AseAtomsAdaptor.get_atoms(structure)
-        atoms.calc = calc
+def mlip_cache_version(spec: ModelSpec) -> str:
+    return f"{spec.model}-{spec.version}"
 
-        # Calculate energy
+
+def mlip_energy(structure: Structure, spec: Optional[ModelSpec] = None, include_arrays: bool = False,
+                reduce_cell: Optional[str] = None) -> dict:
+    """
+    Single-point energy and forces (runs on the MLIP pool); include_arrays
+    adds forces and stress. With reduce_cell the model sees the reduced
+    cell and results are reported for the submitted one.
+    """
+    from pymatgen.io.ase import AseAtomsAdaptor
+
+    calc = require_upet_calculator(spec)
+    reduction = CellReduction(structure, reduce_cell) if reduce_cell else None
+
+    # Convert to ASE atoms
+    atoms = AseAtomsAdaptor.get_atoms(reduction.reduced if reduction else structure)
+    atoms.calc = calc
+
+    # Calculate energy
+    start = time.perf_counter()
+    with metrics.stage("forward"):
         energy = atoms.get_potential_energy()
         forces = atoms.get_forces()
+        stress = atoms.get_stress(voigt=True) if include_arrays and atoms.pbc.all() else None
+    elapsed = time.perf_counter() - start
+    metrics.inc(metrics.ATOMS_PROCESSED.name, len(atoms))
+    if reduction:
+        energy *= reduction.factor
+        forces = reduction.expand_forces(forces)
+
+    # Per-atom values
+    n_atoms = len(structure)
+    energy_per_atom = energy / n_atoms
+    max_force = float(np.max(np.abs(forces)))
+
+    result = {
+        "success": True,
+        "formula": structure.composition.reduced_formula,
+        "n_atoms": n_atoms,
+        "total_energy_eV": round(float(energy), 6),
+        "energy_per_atom_eV": round(energy_per_atom, 6),
+        "max_force_eV_A": round(max_force, 6),
+        "model": model_label(spec),
+        "note": "Energy calculated using UPET machine learning potential"
+    }
+    if reduction:
+        result["cell_reduction"] = reduction.summary(elapsed)
+    if include_arrays:
+        result["forces_eV_A"] = np.round(forces, 6).tolist()
+        result["stress_eV_A3"] = None if stress is None else np.round(stress, 6).tolist()
+    return result
+
+
+def mlip_formation_energy(structure: Structure, elements_reference: Optional[dict] = None,
+                          spec: Optional[ModelSpec] = None, reduce_cell: Optional[str] = None) -> dict:
+    """Formation energy against elemental references (runs on the MLIP pool)"""
+    from pymatgen.io.ase import AseAtomsAdaptor
+
+    calc = require_upet_calculator(spec)
+    reduction = CellReduction(structure, reduce_cell) if reduce_cell else None
+
+    # Convert to ASE and calculate energy
+    atoms = AseAtomsAdaptor.get_atoms(reduction.reduced if reduction else structure)
+    atoms.calc = calc
+    start = time.perf_counter()
+    with metrics.stage("forward"):
+        total_energy = atoms.get_potential_energy()
+    elapsed = time.perf_counter() - start
+    metrics.inc(metrics.ATOMS_PROCESSED.name, len(atoms))
+    if reduction:
+        total_energy *= reduction.factor
+
+    # Get composition
+    comp = structure.composition
+    n_atoms = len(structure)
+
+    # Calculate reference energy
+    ref_energies = elements_reference or ELEMENT_REFERENCE_ENERGIES
+    reference_energy = 0.0
+    missing_refs = []
+
+    for el, amt in comp.as_dict().items():
+        if el in ref_energies:
+            reference_energy += ref_energies[el] * amt
+        else:
+            missing_refs.append(el)
 
-        # Per-atom values
-        n_atoms = len(atoms)
-        energy_per_atom = energy / n_atoms
-        max_force = float(np.max(np.abs(forces)))
-
+    if missing_refs:
         return {
+            "success": False,
+            "error": f"Missing reference energies for: {', '.join(missing_refs)}",
+            "available_elements": list(ref_energies.keys())
+        }
+
+    # Formation energy = E_compound - sum(E_elements)
+    formation_energy = total_energy - reference_energy
+    formation_energy_per_atom = formation_energy / n_atoms
+
+    # Stability estimate (rough heuristic)
+    stability = "likely stable" if formation_energy_per_atom < -0.1 else \
+               "metastable" if formation_energy_per_atom < 0.1 else \
+               "likely unstable"
+
+    result = {
+        "success": True,
+        "formula": comp.reduced_formula,
+        "n_atoms": n_atoms,
+        "total_energy_eV": round(float(total_energy), 6),
+        "reference_energy_eV": round(float(reference_energy), 6),
+        "formation_energy_eV": round(float(formation_energy), 6),
+        "formation_energy_per_atom_eV": round(formation_energy_per_atom, 6),
+        "stability_estimate": stability,
+        "model": model_label(spec),
+        "note": "Formation energy = E_compound - Σ(E_elements). Negative = exothermic formation."
+    }
+    if reduction:
+        result["cell_reduction"] = reduction.summary(elapsed)
+    return result
+
+
+def mlip_relax(structure: Structure, fmax: float = 0.05, steps: int = 100, progress=None,
+               spec: Optional[ModelSpec] = None, output: str = "cif", deadline: Optional[float] = None,
+               reduce_cell: Optional[str] = None, relax_cell: bool = True, measure_speedup: bool = False) -> dict:
+    """
+    Cell + position relaxation with BFGS (runs on the MLIP pool).
+    progress (a jobs.ProgressChannel) receives per-step energy, fmax and
+    cell volume and is checked for cancellation every step. output "cif"
+    returns relaxed_cif, "arrays" returns relaxed_structure (see wire).
+    At deadline (epoch seconds) the optimizer stops and the structure
+    reached so far is returned with deadline_exceeded set.
+    With reduce_cell the reduced cell is relaxed and expanded back into
+    the submitted setting; energies and volumes refer to the submitted cell.
+    measure_speedup adds one timed full-cell force call (the most expensive
+    call of the run for large cells) so the summary can report the speedup.
+    relax_cell=False keeps the cell fixed (molecules in a box).
+    """
+    from pymatgen.io.ase import AseAtomsAdaptor
+    from pymatgen.io.cif import CifWriter
+    from ase.optimize import BFGS
+
+    calc = require_upet_calculator(spec)
+    reduction = CellReduction(structure, reduce_cell) if reduce_cell else None
+    scale = reduction.factor if reduction else 1
+
+    # Convert to ASE
+    atoms = AseAtomsAdaptor.get_atoms(reduction.reduced if reduction else structure)
+    atoms.calc = calc
+
+    # Initial energy
+    start = time.perf_counter()
+    with metrics.stage("forward"):
+        initial_energy = atoms.get_potential_energy() * scale
+
+    # Relax with cell optimization
+    ecf = exp_cell_filter(atoms) if relax_cell else atoms
+    opt = BFGS(ecf, logfile=None)
+
+    if progress is not None:
+        def report():
+            progress.check_cancelled()
+            forces = ecf.get_forces()
+            progress.report(
+                step=opt.nsteps,
+                energy_eV=round(float(atoms.get_potential_energy()) * scale, 6),
+                fmax_eV_A=round(float(np.sqrt((forces ** 2).sum(axis=1).max())), 6),
+                volume_A3=round(float(atoms.get_volume()) * scale, 4),
+            )
+        opt.attach(report, interval=1)
+
+    if deadline is not None:
+        def check_deadline():
+            if time.time() > deadline:
+                raise DeadlineExceeded("Relaxation deadline reached")
+        opt.attach(check_deadline, interval=1)
+
+    deadline_exceeded = False
+    try:
+        with metrics.stage("bfgs"):
+            converged = opt.run(fmax=fmax, steps=steps)
+    except DeadlineExceeded:
+        converged, deadline_exceeded = False, True
+    finally:
+        metrics.inc(metrics.BFGS_STEPS.name, opt.nsteps)
+        metrics.inc(metrics.ATOMS_PROCESSED.name, len(atoms) * (opt.nsteps + 1))
+
+    # Final energy
+    final_energy = atoms.get_potential_energy() * scale
+    final_forces = atoms.get_forces()
+    elapsed = time.perf_counter() - start
+
+    # Convert back to pymatgen
+    relaxed_structure = AseAtomsAdaptor.get_structure(atoms)
+    full_cell_call_s = None
+    if reduction:
+        relaxed_structure = reduction.expand(relaxed_structure)
+    if reduction and measure_speedup:
+        full = AseAtomsAdaptor.get_atoms(structure)
+        full.calc = calc
+        call_start = time.perf_counter()
+        with metrics.stage("forward"):
+            full.get_forces()
+        full_cell_call_s = time.perf_counter() - call_start
+
+    if output == "arrays":
+        relaxed = {"relaxed_structure": structure_arrays(relaxed_structure)}
+    else:
+        # Get CIF of relaxed structure
+        relaxed = {"relaxed_cif": str(CifWriter(relaxed_structure))}
+
+    return {
+        "success": True,
+        "converged": bool(converged),
+        "n_steps": opt.nsteps,
+        "formula": relaxed_structure.composition.reduced_formula,
+        "initial_energy_eV": round(float(initial_energy), 6),
+        "final_energy_eV": round(float(final_energy), 6),
+        "energy_change_eV": round(float(final_energy - initial_energy), 6),
+        "max_force_eV_A": round(float(np.max(np.abs(final_forces))), 6),
+        "lattice": {
+            "a": round(relaxed_structure.lattice.a, 4),
+            "b": round(relaxed_structure.lattice.b, 4),
+            "c": round(relaxed_structure.lattice.c, 4),
+            "alpha": round(relaxed_structure.lattice.alpha, 2),
+            "beta": round(relaxed_structure.lattice.beta, 2),
+            "gamma": round(relaxed_structure.lattice.gamma, 2),
+            "volume": round(relaxed_structure.lattice.volume, 4)
+        },
+        **relaxed,
+        **({"deadline_exceeded": True} if deadline_exceeded else {}),
+        **({"cell_reduction": reduction.summary(elapsed, full_cell_call_s, opt.nsteps + 1)} if reduction else {}),
+        "model": model_label(spec)
+    }
+
+
+def mlip_md(structure: Structure, path: str, ensemble: str = "nvt", temperature_K: float = 300.0,
+            timestep_fs: float = 1.0, steps: int = 1000, interval: int = 10, pressure_GPa: float = 0.0,
+            friction_per_fs: float = 0.01, taut_fs: float = 100.0, taup_fs: float = 1000.0,
+            compressibility_per_GPa: float = 0.01, seed: Optional[int] = None, progress=None,
+            spec: Optional[ModelSpec] = None, deadline: Optional[float] = None) -> dict:
+    """
+    NVT (Langevin) or NPT (Berendsen) molecular dynamics (runs on the MLIP
+    pool). Every interval steps a frame is written to the memory-mapped
+    trajectory at path; progress receives temperature, energies, volume
+    and steps per second at most every MD_PROGRESS_INTERVAL seconds and is
+    checked for cancellation at every frame.
+    At deadline (epoch seconds) the run stops with the frames written so far.
+    """
+    from pymatgen.io.ase import AseAtomsAdaptor
+    from ase import units
+    from ase.md.langevin import Langevin
+    from ase.md.nptberendsen import NPTBerendsen
+    from ase.md.velocitydistribution import MaxwellBoltzmannDistribution, Stationary
+
+    calc = require_upet_calculator(spec)
+    atoms = AseAtomsAdaptor.get_atoms(structure)
+    atoms.calc = calc
+
+    rng = np.random.default_rng(seed)
+    MaxwellBoltzmannDistribution(atoms, temperature_K=temperature_K, rng=rng)
+    Stationary(atoms)
+    timestep = timestep_fs * units.fs
+    if ensemble == "npt":
+        dyn = NPTBerendsen(atoms, timestep, temperature_K=temperature_K, pressure_au=pressure_GPa * units.GPa,
+                           taut=taut_fs * units.fs, taup=taup_fs * units.fs,
+                           compressibility_au=compressibility_per_GPa / units.GPa)
+    else:
+        dyn = Langevin(atoms, timestep, temperature_K=temperature_K, friction=friction_per_fs / units.fs, rng=rng)
+
+    writer = TrajectoryWriter(path, len(atoms), steps // interval + 1, {
+        "formula": structure.composition.reduced_formula,
+        "numbers": atoms.numbers.tolist(),
+        "ensemble": ensemble,
+        "temperature_K": temperature_K,
+        "pressure_GPa": pressure_GPa if ensemble == "npt" else None,
+        "timestep_fs": timestep_fs,
+        "interval": interval,
+        "model": model_label(spec),
+    })
+    start = time.perf_counter()
+    last = {"time": start, "step": 0}
+
+    def write_frame():
+        epot = atoms.get_potential_energy()
+        ekin = atoms.get_kinetic_energy()
+        temperature = atoms.get_temperature()
+        writer.append(step=dyn.nsteps, time_fs=dyn.nsteps * timestep_fs, potential_energy_eV=epot,
+                      kinetic_energy_eV=ekin, temperature_K=temperature, volume_A3=atoms.get_volume(),
+                      cell=atoms.cell.array, positions=atoms.positions, forces=atoms.get_forces())
+        now = time.perf_counter()
+        if progress is not None:
+            progress.check_cancelled()
+        if progress is not None and (now - last["time"] >= MD_PROGRESS_INTERVAL or dyn.nsteps == 0):
+            recent = (dyn.nsteps - last["step"]) / (now - last["time"]) if dyn.nsteps else None
+            last.update(time=now, step=dyn.nsteps)
+            progress.report(
+                step=dyn.nsteps,
+                frames=writer.n_frames,
+                time_ps=round(dyn.nsteps * timestep_fs / 1000, 4),
+                temperature_K=round(float(temperature), 2),
+                potential_energy_eV=round(float(epot), 6),
+                total_energy_eV=round(float(epot + ekin), 6),
+                volume_A3=round(float(atoms.get_volume()), 4),
+                steps_per_s=round(recent, 2) if recent else None,
+            )
+        if deadline is not None and time.time() > deadline:
+            raise DeadlineExceeded("MD deadline reached")
+    dyn.attach(write_frame, interval=interval)
+
+    deadline_exceeded = False
+    try:
+        with metrics.stage("md"):
+            dyn.run(steps)
+    except DeadlineExceeded:
+        deadline_exceeded = True
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.inc(metrics.MD_STEPS.name, dyn.nsteps)
+        metrics.inc(metrics.ATOMS_PROCESSED.name, len(atoms) * (dyn.nsteps + 1))
+        steps_per_s = dyn.nsteps / elapsed if elapsed > 0 else None
+        writer.close(n_steps=dyn.nsteps, elapsed_s=round(elapsed, 4),
+                     steps_per_s=round(steps_per_s, 2) if steps_per_s else None)
+
+    # Averages over the written frames, read back through the mapping
+    summary = read_frames(path, fields=("temperature_K", "potential_energy_eV", "volume_A3"))
+    return {
+        "success": True,
+        "formula": structure.composition.reduced_formula,
+        "n_atoms": len(atoms),
+        "ensemble": ensemble,
+        "n_steps": dyn.nsteps,
+        "n_frames": writer.n_frames,
+        "simulated_ps": round(dyn.nsteps * timestep_fs / 1000, 4),
+        "elapsed_s": round(elapsed, 4),
+        "steps_per_s": round(steps_per_s, 2) if steps_per_s else None,
+        "ns_per_day": round(steps_per_s * timestep_fs * 86400 / 1e6, 4) if steps_per_s else None,
+        "mean_temperature_K": round(float(summary["temperature_K"].mean()), 2),
+        "mean_potential_energy_eV": round(float(summary["potential_energy_eV"].mean()), 6),
+        "mean_volume_A3": round(float(summary["volume_A3"].mean()), 4),
+        "trajectory_bytes": os.path.getsize(path),
+        **({"deadline_exceeded": True} if deadline_exceeded else {}),
+        "model": model_label(spec)
+    }
+
+
+def load_batch_structures(items: List[BatchStructureInput]) -> list:
+    """Resolve batch inputs to structures, or error strings (runs on the I/O pool)"""
+    material_ids = [item.material_id for item in items if item.material_id and not item.structure_handle]
+    with metrics.stage("mp_fetch"):
+        fetched = mp_store.get_structures(material_ids) if material_ids else {}
+
+    loaded = []
+    for item in items:
+        try:
+            if item.structure_handle:
+                loaded.append(get_structure_from_input(structure_handle=item.structure_handle))
+            elif item.material_id:
+                if item.material_id not in fetched:
+                    raise ValueError(f"Material {item.material_id} not found")
+                loaded.append(fetched[item.material_id])
+            else:
+                loaded.append(get_structure_from_input(None, item.cif_string, structure_dict=item.structure_dict))
+        except Exception as e:
+            loaded.append(str(e))
+    return loaded
+
+
+def mlip_energy_batch(structures: List[Structure], include_forces: bool = True,
+                      include_stress: bool = True, spec: Optional[ModelSpec] = None) -> List[dict]:
+    """Energy, forces and stress for one model batch (runs on the MLIP pool)"""
+    from pymatgen.io.ase import AseAtomsAdaptor
+
+    calc = require_upet_calculator(spec)
+    atoms_list = [AseAtomsAdaptor.get_atoms(structure) for structure in structures]
+    with metrics.stage("forward"):
+        predictions = predict_batch(calc, atoms_list, compute_stress=include_stress)
+    metrics.inc(metrics.ATOMS_PROCESSED.name, sum(len(atoms) for atoms in atoms_list))
+
+    results = []
+    for structure, pred in zip(structures, predictions):
+        n_atoms = len(structure)
+        result = {
             "success": True,
             "formula": structure.composition.reduced_formula,
             "n_atoms": n_atoms,
-            "total_energy_eV": round(float(energy), 6),
-            "energy_per_atom_eV": round(energy_per_atom, 6),
-            "max_force_eV_A": round(max_force, 6),
-            "model": "PET-MAD-S (PBEsol level)",
-            "note": "Energy calculated using UPET machine learning potential"
+            "total_energy_eV": round(pred["energy"], 6),
+            "energy_per_atom_eV": round(pred["energy"] / n_atoms, 6),
+            "max_force_eV_A": round(float(np.max(np.abs(pred["forces"]))), 6),
         }
+        if include_forces:
+            result["forces_eV_A"] = np.round(pred["forces"], 6).tolist()
+        if include_stress:
+            result["stress_eV_A3"] = None if pred["stress"] is None else np.round(pred["stress"], 6).tolist()
+        results.append(result)
+    return results
+
+
+def check_elastic_input(data: ElasticInput):
+    if data.eos_model not in EOS_MODELS:
+        raise ValueError(f"Unknown eos_model: {data.eos_model} (supported: {', '.join(EOS_MODELS)})")
+    if data.eos_points and not 5 <= data.eos_points <= 31:
+        raise ValueError("eos_points must be 0 or between 5 and 31")
+    if not 0 < data.eos_max_volume_strain <= 0.3:
+        raise ValueError("eos_max_volume_strain must be in (0, 0.3]")
+    if len(data.strain_magnitudes) > 5 or any(not 0 < m <= 0.05 for m in data.strain_magnitudes):
+        raise ValueError("strain_magnitudes takes up to 5 values in (0, 0.05]")
+    if not data.eos_points and not data.strain_magnitudes:
+        raise ValueError("Nothing to compute: set eos_points or strain_magnitudes")
+
+
+def mlip_elastic(structure: Structure, eos_points: int = 7, eos_max_volume_strain: float = 0.06,
+                 eos_model: str = "birch_murnaghan", strain_magnitudes: List[float] = (0.005, 0.01),
+                 relax: bool = False, fmax: float = 0.01, max_atoms_per_batch: int = DEFAULT_MAX_ATOMS_PER_BATCH,
+                 spec: Optional[ModelSpec] = None, relax_ions: bool = False,
+                 deadline: Optional[float] = None) -> dict:
+    """
+    EOS fit and elastic tensor from one strained-cell set, evaluated in
+    atom-packed model batches (runs on the MLIP pool).
+    With relax the reference is relaxed first and every cell is strained from it.
+    Cij are clamped-ion unless relax_ions, which relaxes the reference
+    positions and then the positions in each Cij cell at fixed cell
+    (one BFGS run per cell instead of a batched call).
+    Past deadline (epoch seconds) DeadlineExceeded is raised: a partial
+    strain set gives no usable fit
+    """
+    from pymatgen.io.ase import AseAtomsAdaptor
+    from ase.optimize import BFGS
+
+    def check_deadline():
+        if deadline is not None and time.time() > deadline:
+            raise DeadlineExceeded("Elastic calculation deadline reached")
+
+    calc = require_upet_calculator(spec)
+    start = time.perf_counter()
+
+    relaxation = None
+    if relax:
+        relaxed = mlip_relax(structure, fmax, MAX_RELAX_STEPS, spec=spec, output="arrays", deadline=deadline)
+        check_deadline()
+        structure = structure_from_dict(relaxed["relaxed_structure"])
+        relaxation = {"converged": relaxed["converged"], "n_steps": relaxed["n_steps"],
+                      "max_force_eV_A": relaxed["max_force_eV_A"]}
+    elif relax_ions:
+        relaxed = mlip_relax(structure, fmax, MAX_RELAX_STEPS, spec=spec, output="arrays", relax_cell=False,
+                             deadline=deadline)
+        check_deadline()
+        structure = structure_from_dict(relaxed["relaxed_structure"])
+        relaxation = {"converged": relaxed["converged"], "n_steps": relaxed["n_steps"],
+                      "max_force_eV_A": relaxed["max_force_eV_A"], "cell_fixed": True}
+
+    strain_set = StrainSet(structure, eos_points, eos_max_volume_strain, strain_magnitudes)
+    cells = strain_set.cells
+    predictions = [None] * len(cells)
+    ion_relaxed = {i for i, _, _ in strain_set.elastic} if relax_ions else set()
+    batched = [i for i in range(len(cells)) if i not in ion_relaxed]
+    batches = pack_batches([len(cells[i]) for i in batched], max_atoms=max_atoms_per_batch)
+    for batch in batches:
+        check_deadline()
+        indices = [batched[b] for b in batch]
+        atoms_list = [AseAtomsAdaptor.get_atoms(cells[i]) for i in indices]
+        with metrics.stage("forward"):
+            for i, pred in zip(indices, predict_batch(calc, atoms_list, compute_stress=bool(strain_set.elastic))):
+                predictions[i] = pred
+        metrics.inc(metrics.ATOMS_PROCESSED.name, sum(len(atoms) for atoms in atoms_list))
+
+    ion_steps = []
+    for i in sorted(ion_relaxed):
+        atoms = AseAtomsAdaptor.get_atoms(cells[i])
+        atoms.calc = calc
+        opt = BFGS(atoms, logfile=None)
+        opt.attach(check_deadline, interval=1)
+        try:
+            with metrics.stage("bfgs"):
+                converged = opt.run(fmax=fmax, steps=MAX_RELAX_STEPS)
+        finally:
+            metrics.inc(metrics.BFGS_STEPS.name, opt.nsteps)
+        metrics.inc(metrics.ATOMS_PROCESSED.name, len(atoms) * (opt.nsteps + 1))
+        predictions[i] = {"energy": float(atoms.get_potential_energy()),
+                          "stress": atoms.get_stress(voigt=True) if atoms.pbc.all() else None}
+        ion_steps.append((opt.nsteps, bool(converged)))
+
+    reference = predictions[0]
+    result = {
+        "success": True,
+        "formula": structure.composition.reduced_formula,
+        "n_atoms": len(structure),
+        "reference": {
+            "energy_eV": round(reference["energy"], 6),
+            "volume_A3": round(structure.volume, 6),
+            **({"stress_GPa": dict(zip(VOIGT, np.round(reference["stress"] * EV_A3_TO_GPA, 4).tolist()))}
+               if reference["stress"] is not None else {}),
+            **({"relaxation": relaxation} if relaxation else {}),
+        },
+    }
+    if strain_set.eos:
+        try:
+            result["eos"] = fit_eos([cells[i].volume for i in strain_set.eos],
+                                    [predictions[i]["energy"] for i in strain_set.eos], eos_model)
+        except Exception as e:
+            raise ValueError(f"EOS fit failed ({e}); the reference may be far from equilibrium, "
+                             "try relax or a larger eos_max_volume_strain")
+    if strain_set.elastic:
+        if reference["stress"] is None:
+            raise ValueError("Elastic constants need a periodic structure")
+        stresses = np.array([predictions[i]["stress"] for i, _, _ in strain_set.elastic])
+        result["elastic"] = {
+            **fit_elastic(strain_set.elastic, stresses, reference["stress"]),
+            "strain_magnitudes": list(strain_magnitudes),
+            "clamped_ion": not relax_ions,
+            **({"ion_relaxation": {"n_cells": len(ion_steps),
+                                   "all_converged": all(c for _, c in ion_steps),
+                                   "max_steps": max(n for n, _ in ion_steps)}} if ion_steps else {}),
+        }
+    result.update({
+        "n_cells": len(cells),
+        "n_batches": len(batches),
+        "elapsed_s": round(time.perf_counter() - start, 4),
+        "model": model_label(spec),
+    })
+    return result
+
+
+def reference_candidates(element: str):
+    """
+    (candidates, MP error) for an element: MP ground-state candidates, or
+    prototypes when MP has no elemental structure or cannot be reached
+    (runs on the I/O pool)
+    """
+    try:
+        with metrics.stage("mp_fetch"):
+            entries = mp_store.get_entries([element])
+    except Exception as e:
+        return candidate_structures(element, [], REFERENCE_CANDIDATES), str(e) or type(e).__name__
+    return candidate_structures(element, entries, REFERENCE_CANDIDATES), None
+
+
+def relax_reference(element: str, candidates: List[dict], spec: Optional[ModelSpec] = None,
+                    deadline: Optional[float] = None) -> dict:
+    """
+    Relax every candidate and keep the lowest energy per atom (runs on the
+    MLIP pool). Past deadline (epoch seconds) DeadlineExceeded is raised:
+    a reference from cut-short relaxations must not be stored
+    """
+    tried = []
+    for candidate in candidates:
+        structure = candidate["structure"]
+        result = mlip_relax(structure, REFERENCE_FMAX, REFERENCE_STEPS, spec=spec, output="arrays",
+                            relax_cell=candidate["relax_cell"], deadline=deadline)
+        if result.get("deadline_exceeded"):
+            raise DeadlineExceeded(f"{element} reference relaxation deadline reached")
+        tried.append({
+            "source": candidate["source"],
+            "energy_per_atom_eV": round(result["final_energy_eV"] / len(structure), 6),
+            "n_atoms": len(structure),
+            "converged": result["converged"],
+            "volume_per_atom_A3": round(result["lattice"]["volume"] / len(structure), 4),
+        })
+    best = min(tried, key=lambda c: c["energy_per_atom_eV"])
+    return {"element": element, **best, "candidates": tried, "model": model_label(spec)}
+
+
+async def elemental_reference(element: str, spec: ModelSpec, recompute: bool = False,
+                              deadline: Optional[float] = None) -> dict:
+    """
+    Stored reference of an element for this model, computed once on first
+    use. One computed from prototypes because MP failed is provisional and
+    recomputed after REFERENCE_FALLBACK_TTL. Concurrent callers share one
+    computation, bounded by the deadline of the caller that started it
+    """
+    Element(element)  # raises ValueError for unknown symbols
+    key = mlip_cache_version(spec)
+    if recompute:
+        reference_store.discard(key, element)
+    record = reference_store.get(key, element)
+    if record is not None:
+        return record
+
+    async def compute():
+        candidates, mp_error = await run_io(reference_candidates, element)
+        record = await run_mlip(relax_reference, element, candidates, spec, deadline)
+        if mp_error:
+            record["mp_error"] = mp_error
+            reference_store.put(key, element, record, ttl=REFERENCE_FALLBACK_TTL)
+            print(f"⚠ {element} reference computed from prototypes (MP unavailable: {mp_error}); not persisted")
+        else:
+            reference_store.put(key, element, record)
+        return reference_store.get(key, element) or record
+
+    return await inflight.do(f"reference:{key}:{element}", compute)
+
+
+async def formation_references(elements: List[str], source: str, overrides: Optional[dict],
+                               spec: ModelSpec, deadline: Optional[float] = None) -> dict:
+    """Reference energy per atom by element: overrides first, then MLIP references or the table"""
+    overrides = overrides or {}
+    if source == "table":
+        references = dict(ELEMENT_REFERENCE_ENERGIES)
+    elif source == "mlip":
+        needed = [el for el in elements if el not in overrides]
+        records = await asyncio.gather(*(elemental_reference(el, spec, deadline=deadline) for el in needed))
+        references = {el: record["energy_per_atom_eV"] for el, record in zip(needed, records)}
+    else:
+        raise ValueError(f"Unknown reference source: {source} (use 'mlip' or 'table')")
+    references.update(overrides)
+    return references
 
-    except HTTPException:
-        raise
+
+def mlip_available(spec: Optional[ModelSpec] = None) -> bool:
+    """Whether the UPET calculator loads (runs on the MLIP pool)"""
+    return get_upet_calculator(spec=spec) is not None
+
+
+def mlip_registry_status() -> dict:
+    """Loaded models of the worker this runs on (runs on the MLIP pool)"""
+    return model_registry.status()
+
+
+@app.post("/mlip/energy")
+async def calculate_energy(data: EnergyInput, request: Request):
+    """Calculate total energy using UPET MLIP (binary responses also carry forces and stress)"""
+    include_arrays = response_format(request) is not None
+    try:
+        spec = data.model_spec()
+        return await cached_compute(
+            "mlip/energy", {**({"arrays": True} if include_arrays else {}),
+                            **({"reduce_cell": data.reduce_cell} if data.reduce_cell else {})},
+            mlip_cache_version(spec),
+            load=lambda: run_io(load_structure_with_fingerprint, data.material_id, data.cif_string,
+                                data.structure_handle, data.structure_dict),
+            compute=lambda structure: run_mlip(mlip_energy, structure, spec, include_arrays, data.reduce_cell),
+            raw_input=raw_cif_input(data.material_id, data.cif_string, data.structure_handle),
+            request_id=input_id(data.material_id, data.cif_string, data.structure_handle, data.structure_dict),
+            exact=include_arrays,
+        )
+
+    except MLIPUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except UnknownHandleError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@app.post("/mlip/formation-energy")
-async def calculate_formation_energy(data: FormationEnergyInput):
-    """Calculate formation energy using UPET MLIP"""
+@app.post("/mlip/energy/batch")
+async def calculate_energy_batch(data: BatchEnergyInput, request: Request):
+    """
+    Energies for many structures, evaluated in atom-count-sized model
+    batches and streamed back as NDJSON as each batch finishes. Batches
+    not started by the request deadline are reported as failed
+    """
+    deadline = getattr(request.state, "deadline", None)
+    if not data.structures:
+        raise HTTPException(status_code=400, detail="No structures given")
+    spec = data.model_spec()
+    if not await run_mlip(mlip_available, spec):
+        raise HTTPException(status_code=503, detail="UPET not available. Install with: pip install upet")
+
     try:
-        calc = get_upet_calculator()
-        if calc is None:
-            raise HTTPException(status_code=503, detail="UPET not available")
+        loaded = await run_io(load_batch_structures, data.structures)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Get structure
-        structure = get_structure_from_input(data.material_id, data.cif_string)
+    def record(index: int, result: dict) -> str:
+        return json.dumps({"index": index, "id": data.structures[index].id, **result}) + "\n"
 
-        # Convert to ASE and calculate energy
-        atoms = AseAtomsAdaptor.get_atoms(structure)
-        atoms.calc = calc
-        total_energy = atoms.get_potential_energy()
+    async def stream():
+        start = time.perf_counter()
+        n_ok = n_atoms = 0
 
-        # Get composition
-        comp = structure.composition
-        n_atoms = len(atoms)
+        valid = []
+        for i, item in enumerate(loaded):
+            if isinstance(item, str):
+                yield record(i, {"success": False, "error": item})
+            else:
+                valid.append(i)
 
-        # Calculate reference energy
-        ref_energies = data.elements_reference or ELEMENT_REFERENCE_ENERGIES
-        reference_energy = 0.0
-        missing_refs = []
+        batches = pack_batches([len(loaded[i]) for i in valid], max_atoms=data.max_atoms_per_batch)
+        deadline_exceeded = False
+        for batch in batches:
+            indices = [valid[b] for b in batch]
+            deadline_exceeded = deadline_exceeded or (deadline is not None and time.time() > deadline)
+            try:
+                if deadline_exceeded:
+                    raise DeadlineExceeded("Batch deadline reached")
+                results = await run_mlip(
+                    mlip_energy_batch, [loaded[i] for i in indices], data.include_forces, data.include_stress, spec
+                )
+            except Exception as e:
+                results = [{"success": False, "error": str(e)}] * len(indices)
+            for i, result in zip(indices, results):
+                if result["success"]:
+                    n_ok += 1
+                    n_atoms += result["n_atoms"]
+                yield record(i, result)
+
+        elapsed = time.perf_counter() - start
+        yield json.dumps({
+            "summary": True,
+            "n_structures": len(loaded),
+            "n_succeeded": n_ok,
+            "n_batches": len(batches),
+            "n_atoms": n_atoms,
+            "elapsed_s": round(elapsed, 4),
+            "structures_per_s": round(n_ok / elapsed, 2) if elapsed > 0 else None,
+            **({"deadline_exceeded": True} if deadline_exceeded else {}),
+            "model": model_label(spec)
+        }) + "\n"
 
-        for el, amt in comp.as_dict().items():
-            if el in ref_energies:
-                reference_energy += ref_energies[el] * amt
-            else:
-                missing_refs.append(el)
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
-        if missing_refs:
-            return {
-                "success": False,
-                "error": f"Missing reference energies for: {', '.join(missing_refs)}",
-                "available_elements": list(ref_energies.keys())
-            }
 
-        # Formation energy = E_compound - sum(E_elements)
-        formation_energy = total_energy - reference_energy
-        formation_energy_per_atom = formation_energy / n_atoms
+@app.post("/mlip/formation-energy")
+async def calculate_formation_energy(data: FormationEnergyInput, request: Request):
+    """
+    Calculate formation energy using UPET MLIP. Elemental references not
+    yet stored are relaxed first; if that cannot finish before the
+    request deadline the call gets 504
+    """
+    deadline = getattr(request.state, "deadline", None)
+    try:
+        spec = data.model_spec()
+
+        async def compute(structure: Structure):
+            elements = [str(el) for el in structure.composition.element_composition.elements]
+            references = await formation_references(elements, data.reference, data.elements_reference, spec,
+                                                    deadline)
+            result = await run_mlip(mlip_formation_energy, structure, references, spec, data.reduce_cell)
+            return {**result, "reference_source": data.reference}
+
+        return await cached_compute(
+            "mlip/formation-energy", {"elements_reference": data.elements_reference, "reference": data.reference,
+                                      **({"reduce_cell": data.reduce_cell} if data.reduce_cell else {})},
+            mlip_cache_version(spec),
+            load=lambda: run_io(load_structure_with_fingerprint, data.material_id, data.cif_string,
+                                data.structure_handle, data.structure_dict),
+            compute=compute,
+            raw_input=raw_cif_input(data.material_id, data.cif_string, data.structure_handle),
+            request_id=input_id(data.material_id, data.cif_string, data.structure_handle, data.structure_dict),
+        )
+
+    except MLIPUnavailableError:
+        raise HTTPException(status_code=503, detail="UPET not available")
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except UnknownHandleError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Stability estimate (rough heuristic)
-        stability = "likely stable" if formation_energy_per_atom < -0.1 else \
-                   "metastable" if formation_energy_per_atom < 0.1 else \
-                   "likely unstable"
 
-        return {
-            "success": True,
-            "formula": comp.reduced_formula,
-            "n_atoms": n_atoms,
-            "total_energy_eV": round(float(total_energy), 6),
-            "reference_energy_eV": round(float(reference_energy), 6),
-            "formation_energy_eV": round(float(formation_energy), 6),
-            "formation_energy_per_atom_eV": round(formation_energy_per_atom, 6),
-            "stability_estimate": stability,
-            "model": "PET-MAD-S (PBEsol level)",
-            "note": "Formation energy = E_compound - Σ(E_elements). Negative = exothermic formation."
-        }
+async def batch_compound_energies(data: BatchFormationEnergyInput, spec: ModelSpec,
+                                  deadline: Optional[float] = None):
+    """
+    Composition and total energy of every compound, or its error.
+    DeadlineExceeded is raised when the deadline passes between batches
+    """
+    n = len(data.compounds)
+    compositions, energies, errors = [None] * n, np.full(n, np.nan), [None] * n
+
+    to_evaluate = []
+    for i, compound in enumerate(data.compounds):
+        if compound.energy_eV is None:
+            to_evaluate.append(i)
+        elif not compound.formula:
+            errors[i] = "energy_eV needs a formula"
+        else:
+            try:
+                composition = Composition(compound.formula).element_composition
+                for el in composition.elements:
+                    Element(str(el))  # rejects dummy species such as "Xx"
+                compositions[i] = composition
+                energies[i] = compound.energy_eV
+            except Exception as e:
+                errors[i] = f"Invalid formula {compound.formula}: {e}"
+    if not to_evaluate:
+        return compositions, energies, errors
+
+    if not await run_mlip(mlip_available, spec):
+        raise MLIPUnavailableError("UPET not available. Install with: pip install upet")
+    loaded = await run_io(load_batch_structures, [data.compounds[i] for i in to_evaluate])
+    valid = []
+    for i, item in zip(to_evaluate, loaded):
+        if isinstance(item, str):
+            errors[i] = item
+        else:
+            compositions[i] = item.composition.element_composition
+            valid.append((i, item))
 
-    except HTTPException:
-        raise
+    for batch in pack_batches([len(structure) for _, structure in valid], max_atoms=data.max_atoms_per_batch):
+        if deadline is not None and time.time() > deadline:
+            raise DeadlineExceeded("Batch deadline reached")
+        chunk = [valid[b] for b in batch]
+        try:
+            results = await run_mlip(mlip_energy_batch, [structure for _, structure in chunk], False, False, spec)
+        except Exception as e:
+            for i, _ in chunk:
+                errors[i] = str(e)
+            continue
+        for (i, _), result in zip(chunk, results):
+            energies[i] = result["total_energy_eV"]
+    return compositions, energies, errors
+
+
+@app.post("/mlip/formation-energy/batch")
+async def calculate_formation_energy_batch(data: BatchFormationEnergyInput, request: Request):
+    """
+    Formation energies for many compounds in one call. Structures are
+    evaluated in model batches (compounds given as formula + energy_eV skip
+    the model), then all are referenced at once through the composition
+    matrix against one set of elemental references. A call that cannot
+    finish before the request deadline gets 504
+    """
+    if not data.compounds:
+        raise HTTPException(status_code=400, detail="No compounds given")
+    start = time.perf_counter()
+    deadline = getattr(request.state, "deadline", None)
+    try:
+        spec = data.model_spec()
+        compositions, energies, errors = await batch_compound_energies(data, spec, deadline)
+
+        ok = [i for i, error in enumerate(errors) if error is None]
+        elements = sorted({str(el) for i in ok for el in compositions[i].elements}, key=lambda el: Element(el).Z)
+        references = await formation_references(elements, data.reference, data.elements_reference, spec,
+                                                deadline)
+    except MLIPUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=f"{e}; retry with fewer compounds")
+    except UnknownHandleError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # compounds x elements atom counts against one reference vector
+    matrix = np.array([[compositions[i][el] for el in elements] for i in ok], dtype=float).reshape(len(ok), -1)
+    reference_vector = np.array([references.get(el, np.nan) for el in elements], dtype=float)
+    missing = np.isnan(reference_vector)
+    reference_vector[missing] = 0.0
+    values = formation_energies(matrix, energies[ok], reference_vector)
+    lacks_reference = matrix[:, missing] > 0
+
+    results = []
+    for i, compound in enumerate(data.compounds):
+        result = {"index": i, "id": compound.id}
+        if errors[i] is not None:
+            result.update(success=False, error=errors[i])
+        results.append(result)
+    for row, i in enumerate(ok):
+        result = results[i]
+        result["formula"] = compositions[i].reduced_formula
+        if lacks_reference[row].any():
+            absent = [el for el, lacks in zip(np.array(elements)[missing], lacks_reference[row]) if lacks]
+            result.update(success=False, error=f"Missing reference energies for: {', '.join(absent)}")
+            continue
+        result.update(
+            success=True,
+            n_atoms=round(float(values["n_atoms"][row]), 6),
+            total_energy_eV=round(float(energies[i]), 6),
+            reference_energy_eV=round(float(values["reference_energy"][row]), 6),
+            formation_energy_eV=round(float(values["formation_energy"][row]), 6),
+            formation_energy_per_atom_eV=round(float(values["formation_energy_per_atom"][row]), 6),
+        )
+
+    return {
+        "results": results,
+        "references": {el: references[el] for el in elements if el in references},
+        "reference_source": data.reference,
+        "n_compounds": len(results),
+        "n_succeeded": sum(1 for result in results if result.get("success")),
+        "elapsed_s": round(time.perf_counter() - start, 4),
+        "model": model_label(spec),
+    }
+
+
+@app.get("/mlip/references")
+async def list_references(model: Optional[str] = None, version: Optional[str] = None,
+                          device: Optional[str] = None):
+    """Stored MLIP elemental references of a model"""
+    key = mlip_cache_version(requested_spec(model, version, device))
+    return {"model": key, "references": reference_store.table(key), "stats": reference_store.stats()}
+
+
+@app.post("/mlip/references/compute")
+async def compute_references(data: ReferencesInput, request: Request):
+    """
+    Relax and store the references of the given elements (stored ones are
+    returned as they are unless recompute is set). References finished
+    before the request deadline are stored even if the call gets 504
+    """
+    deadline = getattr(request.state, "deadline", None)
+    try:
+        spec = data.model_spec()
+        records = await asyncio.gather(*(elemental_reference(el, spec, data.recompute, deadline)
+                                         for el in data.elements))
+    except MLIPUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=f"{e}; retry with fewer elements")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"model": mlip_cache_version(spec), "references": dict(zip(data.elements, records))}
+
+
+@app.post("/mlip/elastic")
+async def calculate_elastic(data: ElasticInput, request: Request):
+    """
+    Equation of state and elastic tensor in one call: the strained cells
+    are generated server-side and evaluated in batched model calls.
+    Cij are clamped-ion by default (ions follow the homogeneous strain),
+    which is only right when every atom sits on a center of inversion
+    (e.g. simple Bravais lattices); set relax_ions for the relaxed-ion
+    tensor of other crystals, at the cost of one relaxation per strained
+    cell. Results are given in the Cartesian frame of the submitted
+    lattice and cached per submitted cell. A calculation that cannot
+    finish before the request deadline gets 504
+    """
+    deadline = getattr(request.state, "deadline", None)
+    try:
+        check_elastic_input(data)
+        spec = data.model_spec()
+        params = data.model_dump(exclude={"material_id", "cif_string", "structure_handle", "structure_dict",
+                                          "model", "version", "device", "max_atoms_per_batch"})
+        return await cached_compute(
+            "mlip/elastic", params, mlip_cache_version(spec),
+            load=lambda: run_io(load_structure_with_fingerprint, data.material_id, data.cif_string,
+                                data.structure_handle, data.structure_dict),
+            compute=lambda structure: run_mlip(
+                mlip_elastic, structure, data.eos_points, data.eos_max_volume_strain, data.eos_model,
+                data.strain_magnitudes, data.relax, data.fmax, data.max_atoms_per_batch, spec, data.relax_ions,
+                deadline,
+            ),
+            raw_input=raw_cif_input(data.material_id, data.cif_string, data.structure_handle),
+            request_id=input_id(data.material_id, data.cif_string, data.structure_handle, data.structure_dict),
+            exact=True,
+        )
+
+    except MLIPUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=f"{e}; retry with fewer strains or without relax")
+    except UnknownHandleError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+def relax_key(data: RelaxInput, spec: ModelSpec, output: str = "cif") -> str:
+    """Coalescing key of a relaxation request"""
+    structure_id = input_id(data.material_id, data.cif_string, data.structure_handle, data.structure_dict)
+    return make_key("request:mlip/relax", structure_id,
+                    {"fmax": data.fmax, "steps": data.steps, "output": output, "reduce_cell": data.reduce_cell,
+                     "measure_speedup": data.measure_speedup},
+                    str(spec))
+
+
+def check_relax_steps(data: RelaxInput):
+    if not 0 <= data.steps <= MAX_RELAX_STEPS:
+        raise HTTPException(status_code=400, detail=f"steps must be between 0 and {MAX_RELAX_STEPS}")
+
+
 @app.post("/mlip/relax")
-async def relax_structure(data: RelaxInput):
-    """Relax structure using UPET MLIP"""
+async def relax_structure(data: RelaxInput, request: Request):
+    """Relax structure using UPET MLIP, stopping at the request deadline"""
+    check_relax_steps(data)
+    # Binary clients get the relaxed structure as arrays instead of CIF text
+    output = "arrays" if response_format(request) else "cif"
+    deadline = getattr(request.state, "deadline", None)
     try:
-        calc = get_upet_calculator()
-        if calc is None:
-            raise HTTPException(status_code=503, detail="UPET not available")
+        async def relax():
+            structure = await run_io(get_structure_from_input, data.material_id, data.cif_string,
+                                     data.structure_handle, data.structure_dict)
+            return await run_mlip(mlip_relax, structure, data.fmax, data.steps, spec=spec, output=output,
+                                  deadline=deadline, reduce_cell=data.reduce_cell,
+                                  measure_speedup=data.measure_speedup)
+
+        spec = data.model_spec()
+        if "x-request-timeout" in request.headers:
+            # A client-chosen deadline can cut the run short, so it is not
+            # shared with callers that would wait longer for convergence
+            return await relax()
+        return await inflight.do(relax_key(data, spec, output), relax)
+
+    except MLIPUnavailableError:
+        raise HTTPException(status_code=503, detail="UPET not available")
+    except UnknownHandleError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Get structure
-        structure = get_structure_from_input(data.material_id, data.cif_string)
 
-        # Convert to ASE
-        atoms = AseAtomsAdaptor.get_atoms(structure)
-        atoms.calc = calc
+# ============ Relaxation Jobs ============
 
-        # Initial energy
-        initial_energy = atoms.get_potential_energy()
+@app.post("/mlip/relax/jobs", status_code=202)
+async def submit_relax_job(data: RelaxInput):
+    """Queue a relaxation and return its job ID; an identical queued or running job is reused"""
+    check_relax_steps(data)
+    spec = data.model_spec()
+    key = relax_key(data, spec)
+    job = job_manager.active(key)
+    if job is not None:
+        return {"job_id": job.id, "status": job.status, "coalesced": True}
+    if job_manager.queued() >= MAX_QUEUED_JOBS:
+        retry_after = job_manager.retry_after()
+        return JSONResponse(status_code=429, content={"detail": "Relaxation job queue is full",
+                                                      "retry_after": retry_after},
+                            headers={"Retry-After": str(retry_after)})
 
-        # Relax with cell optimization
-        ecf = ExpCellFilter(atoms)
-        opt = BFGS(ecf, logfile=None)
-        converged = opt.run(fmax=data.fmax, steps=data.steps)
+    try:
+        structure = await run_io(get_structure_from_input, data.material_id, data.cif_string,
+                                 data.structure_handle, data.structure_dict)
+    except UnknownHandleError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Final energy
-        final_energy = atoms.get_potential_energy()
-        final_forces = atoms.get_forces()
+    params = {
+        "material_id": data.material_id,
+        "structure_handle": data.structure_handle,
+        "model": str(spec),
+        "formula": structure.composition.reduced_formula,
+        "n_atoms": len(structure),
+        "fmax": data.fmax,
+        "steps": data.steps,
+        "reduce_cell": data.reduce_cell,
+    }
 
-        # Convert back to pymatgen
-        relaxed_structure = AseAtomsAdaptor.get_structure(atoms)
+    async def run_job(job: Job):
+        with metrics.request_context("relax_job"):
+            return await run_mlip(mlip_relax, structure, data.fmax, data.steps, job.channel, spec,
+                                  deadline=time.time() + RELAX_JOB_TIMEOUT, reduce_cell=data.reduce_cell,
+                                  measure_speedup=data.measure_speedup)
 
-        # Get CIF of relaxed structure
-        cif_writer = CifWriter(relaxed_structure)
-        relaxed_cif = str(cif_writer)
+    # A duplicate may have been submitted while the structure loaded
+    job = job_manager.active(key) or job_manager.submit("relax", params, run_job, key=key)
+    return {"job_id": job.id, "status": job.status}
 
-        return {
-            "success": True,
-            "converged": converged,
-            "n_steps": opt.nsteps,
-            "formula": relaxed_structure.composition.reduced_formula,
-            "initial_energy_eV": round(float(initial_energy), 6),
-            "final_energy_eV": round(float(final_energy), 6),
-            "energy_change_eV": round(float(final_energy - initial_energy), 6),
-            "max_force_eV_A": round(float(np.max(np.abs(final_forces))), 6),
-            "lattice": {
-                "a": round(relaxed_structure.lattice.a, 4),
-                "b": round(relaxed_structure.lattice.b, 4),
-                "c": round(relaxed_structure.lattice.c, 4),
-                "alpha": round(relaxed_structure.lattice.alpha, 2),
-                "beta": round(relaxed_structure.lattice.beta, 2),
-                "gamma": round(relaxed_structure.lattice.gamma, 2),
-                "volume": round(relaxed_structure.lattice.volume, 4)
-            },
-            "relaxed_cif": relaxed_cif,
-            "model": "PET-MAD-S (PBEsol level)"
-        }
 
-    except HTTPException:
-        raise
+@app.get("/mlip/relax/jobs")
+async def list_relax_jobs():
+    """Queued, running and recently finished relaxation jobs"""
+    return {
+        "queued": job_manager.queued(),
+        "running": job_manager.running(),
+        "jobs": [job.to_dict(include_result=False) for job in job_manager.list("relax")]
+    }
+
+
+def get_job_or_404(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@app.get("/mlip/relax/jobs/{job_id}")
+async def get_relax_job(job_id: str):
+    """Job status, latest progress and result when finished"""
+    return get_job_or_404(job_id).to_dict()
+
+
+@app.get("/mlip/relax/jobs/{job_id}/events")
+async def stream_relax_job(job_id: str, request: Request):
+    """Per-step energy, fmax and cell volume as Server-Sent Events"""
+    job = get_job_or_404(job_id)
+    last_id = request.headers.get("last-event-id")
+    start = int(last_id) + 1 if last_id and last_id.isdigit() else 0
+    return StreamingResponse(
+        job_manager.stream(job, start),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.delete("/mlip/relax/jobs/{job_id}")
+async def cancel_relax_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return {"job_id": job.id, "status": job.status}
+
+
+# ============ Molecular Dynamics Jobs ============
+
+def check_md_input(data: MDInput):
+    if data.ensemble not in ("nvt", "npt"):
+        raise HTTPException(status_code=400, detail=f"Unknown ensemble: {data.ensemble} (use 'nvt' or 'npt')")
+    if not 0 < data.steps <= MAX_MD_STEPS:
+        raise HTTPException(status_code=400, detail=f"steps must be between 1 and {MAX_MD_STEPS}")
+    if not 1 <= data.interval <= data.steps:
+        raise HTTPException(status_code=400, detail="interval must be between 1 and steps")
+    if not 0 < data.timestep_fs <= 10 or data.temperature_K < 0:
+        raise HTTPException(status_code=400, detail="timestep_fs must be in (0, 10] and temperature_K >= 0")
+
+
+@app.post("/mlip/md/jobs", status_code=202)
+async def submit_md_job(data: MDInput):
+    """
+    Queue an MD run and return its job ID. Frames go to a preallocated
+    memory-mapped trajectory served by /mlip/md/jobs/{job_id}/frames
+    """
+    check_md_input(data)
+    spec = data.model_spec()
+    if job_manager.queued() >= MAX_QUEUED_JOBS:
+        retry_after = job_manager.retry_after()
+        return JSONResponse(status_code=429, content={"detail": "Job queue is full", "retry_after": retry_after},
+                            headers={"Retry-After": str(retry_after)})
+
+    try:
+        structure = await run_io(get_structure_from_input, data.material_id, data.cif_string,
+                                 data.structure_handle, data.structure_dict)
+    except UnknownHandleError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    n_frames = data.steps // data.interval + 1
+    size = trajectory_bytes(len(structure), n_frames)
+    if size > MD_MAX_TRAJECTORY_MB * 1024 * 1024:
+        raise HTTPException(status_code=400, detail=f"Trajectory would need {size / 1024 ** 2:.0f} MB "
+                                                    f"(limit {MD_MAX_TRAJECTORY_MB:.0f} MB); raise interval")
+
+    params = {
+        "material_id": data.material_id,
+        "structure_handle": data.structure_handle,
+        "model": str(spec),
+        "formula": structure.composition.reduced_formula,
+        "n_atoms": len(structure),
+        **data.model_dump(include={"ensemble", "temperature_K", "timestep_fs", "steps", "interval",
+                                   "pressure_GPa", "seed"}),
+        "n_frames": n_frames,
+        "trajectory_bytes": size,
+    }
+
+    async def run_job(job: Job):
+        path = trajectory_store.path(job.id)
+        with metrics.request_context("md_job"):
+            return await run_mlip(
+                mlip_md, structure, path, data.ensemble, data.temperature_K, data.timestep_fs, data.steps,
+                data.interval, data.pressure_GPa, data.friction_per_fs, data.taut_fs, data.taup_fs,
+                data.compressibility_per_GPa, data.seed, job.channel, spec, deadline=time.time() + MD_JOB_TIMEOUT,
+            )
+
+    job = job_manager.submit("md", params, run_job)
+    # Files of jobs that dropped out of the history go with them
+    await run_io(trajectory_store.prune, [j.id for j in job_manager.list()])
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/mlip/md/jobs")
+async def list_md_jobs():
+    """Queued, running and recently finished MD jobs"""
+    return {
+        "queued": job_manager.queued(),
+        "running": job_manager.running(),
+        "jobs": [job.to_dict(include_result=False) for job in job_manager.list("md")],
+        "trajectories": await run_io(trajectory_store.stats),
+    }
+
+
+def get_md_job_or_404(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None or job.kind != "md":
+        raise HTTPException(status_code=404, detail=f"MD job {job_id} not found")
+    return job
+
+
+def get_trajectory_or_404(job_id: str) -> str:
+    get_md_job_or_404(job_id)
+    if not trajectory_store.exists(job_id):
+        raise HTTPException(status_code=404, detail=f"MD job {job_id} has no trajectory yet")
+    return trajectory_store.path(job_id)
+
+
+@app.get("/mlip/md/jobs/{job_id}")
+async def get_md_job(job_id: str):
+    """Job status, live throughput (latest progress) and result when finished"""
+    job = get_md_job_or_404(job_id)
+    data = job.to_dict()
+    if trajectory_store.exists(job_id):
+        data["trajectory"] = await run_io(read_meta, trajectory_store.path(job_id))
+    return data
+
+
+@app.get("/mlip/md/jobs/{job_id}/events")
+async def stream_md_job(job_id: str, request: Request):
+    """Per-frame temperature, energies, volume and steps/s as Server-Sent Events"""
+    job = get_md_job_or_404(job_id)
+    last_id = request.headers.get("last-event-id")
+    start = int(last_id) + 1 if last_id and last_id.isdigit() else 0
+    return StreamingResponse(
+        job_manager.stream(job, start),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/mlip/md/jobs/{job_id}/frames")
+async def get_md_frames(job_id: str, request: Request, start: int = 0, stop: Optional[int] = None,
+                        stride: int = 1, fields: str = "step,time_fs,potential_energy_eV,temperature_K,positions"):
+    """
+    Frames start:stop:stride (Python slice semantics over the frames
+    written so far), read straight from the memory-mapped trajectory.
+    fields is a comma-separated subset of the frame fields; msgpack/npz
+    clients get typed arrays
+    """
+    path = get_trajectory_or_404(job_id)
+    names = [name.strip() for name in fields.split(",") if name.strip()] or list(FIELDS)
+    try:
+        frames = await run_io(read_frames, path, start, stop, stride, names, MD_MAX_FRAMES_PER_REQUEST)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    n = len(frames["indices"])
+    payload = {"job_id": job_id, "n_frames": n, "frames": frames}
+    fmt = response_format(request)
+    if fmt is not None:
+        # Arrays go out as typed buffers without a JSON round trip
+        return Response(encode(payload, fmt), media_type=RESPONSE_MEDIA_TYPES[fmt], headers={"Vary": "Accept"})
+    return {**payload, "frames": {name: values.tolist() for name, values in frames.items()}}
+
+
+@app.get("/mlip/md/jobs/{job_id}/trajectory")
+async def download_md_trajectory(job_id: str):
+    """The raw .npy trajectory (structured frames; np.load(path, mmap_mode="r") reads it lazily)"""
+    path = get_trajectory_or_404(job_id)
+    return FileResponse(path, media_type="application/octet-stream", filename=f"md-{job_id}.npy")
+
+
+@app.delete("/mlip/md/jobs/{job_id}")
+async def cancel_md_job(job_id: str):
+    """Cancel a queued or running MD job; the frames written so far stay readable"""
+    job = job_manager.cancel(get_md_job_or_404(job_id).id)
+    return {"job_id": job.id, "status": job.status}
+
 
 @app.get("/mlip/status")
 async def mlip_status():
     """Check MLIP availability and status"""
-    calc = get_upet_calculator()
-    if calc is None:
+    if not await run_mlip(mlip_available):
         return {
             "available": False,
             "message": "UPET not installed or failed to load",
@@ -571,34 +2500,342 @@ async def mlip_status():
         }
     return {
         "available": True,
-        "model": "PET-MAD-S",
-        "version": "1.0.2",
+        "model": resolve_spec().model.upper(),
+        "version": resolve_spec().version,
         "theory_level": "PBEsol",
         "capabilities": [
             "Energy calculation",
             "Force calculation",
             "Formation energy",
-            "Structure relaxation"
-        ]
+            "Structure relaxation",
+            "Molecular dynamics (NVT/NPT)"
+        ],
+        "available_models": [str(spec) for spec in MLIP_MODELS],
+        "registry": await run_mlip(mlip_registry_status)
     }
 
 
+# ============ Stability Screening ============
+
+# Bounded queue length between pipeline stages, structures per MP query
+SCREEN_QUEUE_SIZE = int(os.environ.get("SCREEN_QUEUE_SIZE", 8))
+SCREEN_FETCH_CHUNK = int(os.environ.get("SCREEN_FETCH_CHUNK", 16))
+SCREEN_MAX_CANDIDATES = int(os.environ.get("SCREEN_MAX_CANDIDATES", 500))
+SCREEN_RANKING_TOP = 20  # ranking entries sent when the hull changes
+# Screening is not admitted as one request: each evaluation queues for an
+# mlip slot at this priority (after every admitted MLIP route), and the
+# whole stream stops at SCREEN_TIMEOUT seconds (or X-Request-Timeout)
+SCREEN_PRIORITY = int(os.environ.get("SCREEN_PRIORITY", 3))
+SCREEN_TIMEOUT = float(os.environ.get("SCREEN_TIMEOUT", 1800))
+
+
+@asynccontextmanager
+async def screening_slot(deadline: float):
+    """
+    Hold an mlip admission slot for one unit of screening work. A full
+    queue or displacement by a cheaper request waits and retries until
+    the deadline
+    """
+    queue = admission.queues["mlip"]
+    while True:
+        try:
+            await queue.acquire(SCREEN_PRIORITY, deadline)
+            break
+        except Saturated as e:
+            if time.time() + e.retry_after >= deadline:
+                raise DeadlineExceeded(str(e))
+            await asyncio.sleep(e.retry_after)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        queue.release(time.perf_counter() - start)
+
+
+def rank_screening_entries(elements: List[str], entries: list, max_e_above_hull: Optional[float],
+                           max_candidates: int, max_atoms: int) -> list:
+    """
+    (entry, MP e_above_hull) of the chemsys compounds, most stable first,
+    one per material (runs on the hull pool)
+    """
+    with metrics.stage("hull"):
+        hull, indices = hull_cache.get(elements, entries)
+    with hull.lock:
+        ranked = sorted(((hull.entries[i], float(hull.e_above_hull[i])) for i in indices),
+                        key=lambda pair: pair[1])
+    selected, seen = [], set()
+    for entry, e_above in ranked:
+        if len(entry_elements(entry)) < 2 or entry.composition.num_atoms > max_atoms:
+            continue  # elements are the MLIP references
+        if max_e_above_hull is not None and e_above > max_e_above_hull:
+            break
+        material_id = material_id_of(entry)
+        if material_id is not None and material_id in seen:
+            continue
+        seen.add(material_id)
+        selected.append((entry, e_above))
+        if len(selected) >= max_candidates:
+            break
+    return selected
+
+
+def fetch_structures(material_ids: List[str]) -> dict:
+    """Structures by material_id through the local MP store (runs on the I/O pool)"""
+    with metrics.stage("mp_fetch"):
+        return mp_store.get_structures(material_ids)
+
+
+def place_on_hull(hull: Hull, entry, candidate_ids: set) -> dict:
+    """
+    Add one MLIP entry to the screening hull and rank every candidate
+    placed so far (runs on the hull pool)
+    """
+    with metrics.stage("hull"), hull.lock:
+        changed = hull.add_entries([entry])
+        index = hull.index_of(entry)
+        decomposition = " + ".join(f"{amount:.2f} {phase.composition.reduced_formula}"
+                                   for phase, amount in hull.decomposition(index))
+        ranking = sorted(
+            ({"id": e.entry_id, "formula": e.composition.reduced_formula,
+              "e_above_hull_eV": round(float(hull.e_above_hull[i]), 4), "stable": bool(hull.stable[i])}
+             for i, e in enumerate(hull.entries) if e.entry_id in candidate_ids),
+            key=lambda row: row["e_above_hull_eV"],
+        )
+    return {"changed": changed, "decomposition": decomposition, "ranking": ranking}
+
+
+@app.post("/screening/stability")
+async def screen_stability(data: ScreeningInput, request: Request):
+    """
+    Stability screen of a chemical system, streamed as NDJSON. MP compounds
+    are fetched, evaluated with the MLIP (relaxed by default) and placed on
+    an MLIP hull whose elemental endpoints are the self-consistent MLIP
+    references; each candidate's e_above_hull and rank stream back as it
+    is placed. Fetching, inference and hull placement run concurrently,
+    joined by bounded queues. Each MLIP evaluation takes its own low
+    priority mlip slot, so interactive MLIP requests are not starved
+    """
+    elements = sorted(set(data.elements))
+    try:
+        if not 2 <= len(elements) <= 4:
+            raise ValueError("Stability screening requires 2-4 elements")
+        for el in elements:
+            Element(el)
+        if not 0 < data.max_candidates <= SCREEN_MAX_CANDIDATES:
+            raise ValueError(f"max_candidates must be between 1 and {SCREEN_MAX_CANDIDATES}")
+        if data.relax and not 0 < data.steps <= MAX_RELAX_STEPS:
+            raise ValueError(f"steps must be between 1 and {MAX_RELAX_STEPS}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    spec = data.model_spec()
+    if not await run_mlip(mlip_available, spec):
+        raise HTTPException(status_code=503, detail="UPET not available. Install with: pip install upet")
+
+    from pymatgen.entries.computed_entries import ComputedEntry
+
+    request.state.deadline = deadline = request_deadline(request, SCREEN_TIMEOUT)
+
+    async def compute_references() -> dict:
+        async with screening_slot(deadline):
+            return await formation_references(elements, "mlip", None, spec, deadline)
+
+    # Elemental endpoints relax alongside the first candidates
+    references = asyncio.ensure_future(compute_references())
+    state = {"hull": None, "ids": set(), "ranking": [], "skipped": 0, "failed": 0}
+
+    async def fetch(emit):
+        entries = await run_io(fetch_chemsys_entries, elements)
+        if not entries:
+            raise ValueError(f"No entries found for {'-'.join(elements)} system")
+        ranked = await run_hull(rank_screening_entries, elements, entries, data.max_dft_e_above_hull,
+                                data.max_candidates, data.max_atoms)
+        await emit({"event": "candidates", "elements": elements, "n_entries": len(entries),
+                    "n_candidates": len(ranked)})
+        for start in range(0, len(ranked), SCREEN_FETCH_CHUNK):
+            chunk = ranked[start:start + SCREEN_FETCH_CHUNK]
+            ids = [material_id_of(entry) for entry, _ in chunk if getattr(entry, "structure", None) is None]
+            ids = [material_id for material_id in ids if material_id]
+            fetched = await run_io(fetch_structures, ids) if ids else {}
+            for entry, e_above in chunk:
+                material_id = material_id_of(entry)
+                candidate_id = material_id or str(entry.entry_id or entry.composition.reduced_formula)
+                formula = entry.composition.reduced_formula
+                structure = getattr(entry, "structure", None) or fetched.get(material_id)
+                if structure is None or structure.composition.reduced_formula != formula:
+                    state["skipped"] += 1
+                    await emit({"event": "skipped", "id": candidate_id, "formula": formula,
+                                "reason": "no structure available"})
+                    continue
+                yield Candidate(candidate_id, formula, structure, {"dft_e_above_hull_eV": round(e_above, 4)})
+
+    async def evaluate(candidate: Candidate) -> dict:
+        async with screening_slot(deadline):
+            if data.relax:
+                result = await run_mlip(mlip_relax, candidate.structure, data.fmax, data.steps, spec=spec,
+                                        output="arrays", deadline=deadline)
+                return {"success": True, "energy_eV": result["final_energy_eV"],
+                        "converged": result["converged"], "n_steps": result["n_steps"]}
+            result = await run_mlip(mlip_energy, candidate.structure, spec)
+            return {"success": True, "energy_eV": result["total_energy_eV"]}
+
+    async def place(candidate: Candidate, result: dict, emit):
+        if not result["success"]:
+            state["failed"] += 1
+            await emit({"event": "failed", "id": candidate.id, "formula": candidate.formula, "error": result["error"]})
+            return
+        if state["hull"] is None:
+            reference_entries = [ComputedEntry(el, energy, entry_id=f"mlip-reference:{el}")
+                                 for el, energy in (await references).items()]
+            state["hull"] = await run_hull(Hull, reference_entries, elements)
+
+        composition = candidate.structure.composition
+        entry = ComputedEntry(composition, result["energy_eV"], entry_id=candidate.id)
+        state["ids"].add(candidate.id)
+        placed = await run_hull(place_on_hull, state["hull"], entry, set(state["ids"]))
+        state["ranking"] = placed["ranking"]
+        row = next(row for row in placed["ranking"] if row["id"] == candidate.id)
+        await emit({
+            "event": "result",
+            **row,
+            "rank": placed["ranking"].index(row) + 1,
+            "n_placed": len(placed["ranking"]),
+            "energy_per_atom_eV": round(result["energy_eV"] / composition.num_atoms, 6),
+            **candidate.prior,
+            "decomposition": placed["decomposition"] or None,
+            **{key: result[key] for key in ("converged", "n_steps") if key in result},
+            "hull_changed": placed["changed"],
+        })
+        if placed["changed"] and len(placed["ranking"]) > 1:
+            # A new stable phase moves the hull under earlier candidates
+            await emit({"event": "ranking", "ranking": placed["ranking"][:SCREEN_RANKING_TOP]})
+
+    workers = data.workers or POOL_CONFIG["mlip"]["workers"] + 1
+    pipeline = Pipeline(fetch, evaluate, place, workers=min(max(1, workers), 16), queue_size=SCREEN_QUEUE_SIZE,
+                        deadline=deadline)
+
+    async def stream():
+        try:
+            async for event in pipeline.run():
+                yield json.dumps(event) + "\n"
+            n_placed = len(state["ranking"])
+            stages = pipeline.stage_report()
+            yield json.dumps({
+                "event": "summary",
+                "elements": elements,
+                "n_placed": n_placed,
+                "n_stable": sum(1 for row in state["ranking"] if row["stable"]),
+                "n_skipped": state["skipped"],
+                "n_failed": state["failed"],
+                **({"deadline_exceeded": True} if pipeline.deadline_exceeded else {}),
+                "references": references.result() if references.done() and not references.cancelled()
+                and references.exception() is None else None,
+                "ranking": state["ranking"],
+                "stages": stages,
+                "candidates_per_s": round(n_placed / stages["wall_s"], 3) if stages["wall_s"] > 0 else None,
+                "model": model_label(spec),
+            }) + "\n"
+        finally:
+            if not references.done():
+                references.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+# ============ Materials Project Store ============
+
+@app.post("/mp/prefetch")
+async def prefetch_materials(data: MaterialIdsInput):
+    """Fetch many material_ids into the local MP store in batched queries"""
+    try:
+        structures = await run_io(mp_store.get_structures, data.material_ids)
+        return {
+            "success": True,
+            "requested": len(data.material_ids),
+            "available": len(structures),
+            "missing": [mid for mid in data.material_ids if mid not in structures]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/mp/store/stats")
+async def mp_store_stats():
+    """Local MP store counters"""
+    return mp_store.stats()
+
+
+# ============ Admission Control ============
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """Active, waiting and rejected requests per endpoint class"""
+    return {**admission.stats(), "relax_jobs": {"queued": job_manager.queued(), "max_queued": MAX_QUEUED_JOBS}}
+
+
+# ============ Result Cache ============
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Result cache hit/miss counters, plus request coalescing"""
+    return {**result_cache.stats(), "coalescing": inflight.stats()}
+
+
+@app.delete("/cache")
+async def clear_cache():
+    """Drop the in-memory tier of the result cache"""
+    result_cache.clear()
+    return {"success": True}
+
+
 # ============ Health Check ============
 
 @app.get("/health")
 async def health_check():
-    # Check UPET availability
-    upet_available = get_upet_calculator() is not None
+    # Check UPET availability without waiting on the MLIP pool
+    upet_available = importlib.util.find_spec("upet") is not None
 
     return {
         "status": "healthy",
         "pymatgen": "2024.1.26",
         "ase": "3.22.1",
         "mp_api": "0.39.5",
-        "upet_mlip": upet_available
+        "upet_mlip": upet_available,
+        "ready": warmup_state["status"] == "done",
+        "workers": pool_status()
     }
 
 
+@app.get("/health/live")
+async def liveness():
+    """Process is up and the event loop responds"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Ready once startup warm-up has finished without errors; 503 while
+    imports or models are still cold or failed to warm up
+    """
+    ready = warmup_state["status"] == "done" and not warmup_state["errors"]
+    body = {"ready": ready, **warmup_state}
+    if not ready:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Request, stage, BFGS step, atom and model-load metrics in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/startup/profile")
+async def startup_profile():
+    """Timed import and initialization steps (STARTUP_PROFILE=1 also prints them)"""
+    return profile_report()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,236 @@
+"""
+Per-stage timing and Prometheus metrics
+Work running on the pools records stages and counters into a per-call
+collector that travels back with the result, so process workers report
+the same way as threads. The event loop applies them to the process-wide
+metrics under the current request's endpoint and keeps them for the
+Server-Timing header and the optional cProfile summary
+"""
+
+import contextvars
+import cProfile
+import io
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1.0, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_label_text(self.labels, k)} {v}" for k, v in self._values.items()]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., sum, count]
+        self._values: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            row = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, row in self._values.items():
+                for bound, count in zip(self.buckets, row):
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {count}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {row[-1]}")
+                lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {row[-2]}")
+                lines.append(f"{self.name}_count{_label_text(self.labels, key)} {row[-1]}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram("materials_request_seconds", "Request latency", ("endpoint", "method", "status"))
+STAGE_SECONDS = Histogram("materials_stage_seconds", "Time per request stage", ("endpoint", "stage"))
+BFGS_STEPS = Counter("materials_bfgs_steps_total", "BFGS optimizer steps", ("endpoint",))
+MD_STEPS = Counter("materials_md_steps_total", "Molecular dynamics steps", ("endpoint",))
+ATOMS_PROCESSED = Counter("materials_atoms_processed_total", "Atoms evaluated by the MLIP", ("endpoint",))
+MODEL_LOAD_SECONDS = Histogram("materials_model_load_seconds", "MLIP model load time", ("model",))
+COALESCED = Counter("materials_coalesced_requests_total", "Requests served by an identical in-flight computation",
+                    ("endpoint",))
+ADMISSION_REJECTED = Counter("materials_admission_rejected_total", "Requests rejected with 429 by admission control",
+                             ("endpoint", "class"))
+
+REGISTRY = {m.name: m for m in (REQUEST_SECONDS, STAGE_SECONDS, BFGS_STEPS, MD_STEPS, ATOMS_PROCESSED,
+                                 MODEL_LOAD_SECONDS, COALESCED, ADMISSION_REJECTED)}
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY.values():
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+# ============ Worker side ============
+
+_local = threading.local()
+
+
+def _collector() -> Optional[dict]:
+    return getattr(_local, "collector", None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a stage of the current pool call"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record("stage", name, time.perf_counter() - start)
+
+
+def inc(metric: str, value: float = 1.0, **labels):
+    record("inc", metric, value, labels)
+
+
+def observe(metric: str, value: float, **labels):
+    record("observe", metric, value, labels)
+
+
+def record(kind: str, name: str, value: float, labels: Optional[dict] = None):
+    collector = _collector()
+    if collector is None:
+        # Not inside a measured call (e.g. directly on the event loop)
+        apply({"stages": {name: [value, 1]} if kind == "stage" else {},
+               "events": [] if kind == "stage" else [(kind, name, value, labels or {})]})
+    elif kind == "stage":
+        total = collector["stages"].setdefault(name, [0.0, 0])
+        total[0] += value
+        total[1] += 1
+    else:
+        collector["events"].append((kind, name, value, labels or {}))
+
+
+def measured_call(fn, args: tuple, kwargs: dict, profile: bool = False):
+    """Run fn on a pool worker; returns (result, measurements)"""
+    _local.collector = collector = {"stages": {}, "events": [], "profile": None}
+    profiler = cProfile.Profile() if profile else None
+    try:
+        if profiler:
+            profiler.enable()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            if profiler:
+                profiler.disable()
+                collector["profile"] = profile_summary(profiler, getattr(fn, "__name__", str(fn)))
+        return result, collector
+    finally:
+        _local.collector = None
+
+
+def profile_summary(profiler: cProfile.Profile, name: str, limit: int = 25) -> dict:
+    """Top functions by cumulative time"""
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+        rows.append({"function": f"{filename}:{line}({func})", "ncalls": nc,
+                     "tottime_s": round(tt, 6), "cumtime_s": round(ct, 6)})
+    rows.sort(key=lambda r: -r["cumtime_s"])
+    return {"call": name, "total_s": round(stats.total_tt, 6), "top": rows[:limit]}
+
+
+# ============ Event-loop side ============
+
+class RequestMetrics:
+    def __init__(self, endpoint: str, profile: bool = False):
+        self.endpoint = endpoint
+        self.profile = profile
+        self.stages: Dict[str, List[float]] = {}
+        self.profiles: List[dict] = []
+
+
+_request: contextvars.ContextVar[Optional[RequestMetrics]] = contextvars.ContextVar("request_metrics", default=None)
+
+
+@contextmanager
+def request_context(endpoint: str, profile: bool = False):
+    """Attribute measurements made inside the block to endpoint"""
+    ctx = RequestMetrics(endpoint, profile)
+    token = _request.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _request.reset(token)
+
+
+def current_request() -> Optional[RequestMetrics]:
+    return _request.get()
+
+
+def apply(measurements: dict):
+    """Record a measured call's stages and events under the current request"""
+    ctx = _request.get()
+    endpoint = ctx.endpoint if ctx else ""
+    for name, (seconds, count) in measurements["stages"].items():
+        STAGE_SECONDS.observe(seconds, endpoint=endpoint, stage=name)
+        if ctx is not None:
+            total = ctx.stages.setdefault(name, [0.0, 0])
+            total[0] += seconds
+            total[1] += count
+    for kind, name, value, labels in measurements["events"]:
+        metric = REGISTRY[name]
+        labels = {"endpoint": endpoint, **labels}
+        if kind == "inc":
+            metric.inc(value, **labels)
+        else:
+            metric.observe(value, **labels)
+    if ctx is not None and measurements.get("profile"):
+        ctx.profiles.append(measurements["profile"])
+
+
+def server_timing(ctx: RequestMetrics, total_s: float) -> str:
+    """Server-Timing header value: one metric per stage plus the total"""
+    parts = []
+    for name, (seconds, count) in ctx.stages.items():
+        desc = f';desc="{count} calls"' if count > 1 else ""
+        parts.append(f"{name};dur={seconds * 1000:.2f}{desc}")
+    parts.append(f"total;dur={total_s * 1000:.2f}")
+    return ", ".join(parts)
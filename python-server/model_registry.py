@@ -0,0 +1,150 @@
+"""
+MLIP model registry
+Holds loaded calculators per (model, version, device) with LRU eviction
+of loaded weights, and warms models up with a dummy forward pass
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+import metrics
+
+DEFAULT_MODEL = os.environ.get("UPET_MODEL", "pet-mad-s")  # Fast and universal
+DEFAULT_VERSION = os.environ.get("UPET_VERSION", "1.0.2")
+DEFAULT_DEVICE = os.environ.get("UPET_DEVICE", "cpu")
+
+
+class ModelSpec(NamedTuple):
+    model: str
+    version: str
+    device: str
+
+    def __str__(self):
+        return f"{self.model}:{self.version}:{self.device}"
+
+
+def resolve_spec(model: Optional[str] = None, version: Optional[str] = None,
+                 device: Optional[str] = None) -> ModelSpec:
+    """Fill unset parts of a model spec with the server defaults"""
+    return ModelSpec(model or DEFAULT_MODEL, version or DEFAULT_VERSION, device or DEFAULT_DEVICE)
+
+
+class UnknownModelError(ValueError):
+    """Raised for a model/version/device the server is not configured to serve"""
+
+
+def check_spec(spec: ModelSpec, allowed: Sequence[ModelSpec]) -> ModelSpec:
+    """spec if it is one of the allowed ones, else UnknownModelError"""
+    if spec not in allowed:
+        raise UnknownModelError(f"Model {spec} is not served (available: {', '.join(map(str, allowed))})")
+    return spec
+
+
+def parse_specs(text: str) -> List[ModelSpec]:
+    """Parse 'model:version:device,...'; omitted parts use the defaults"""
+    specs = []
+    for item in text.split(","):
+        item = item.strip()
+        if item:
+            parts = item.split(":") + [None, None]
+            specs.append(resolve_spec(parts[0], parts[1], parts[2]))
+    return specs
+
+
+def load_upet(spec: ModelSpec):
+    from upet.calculator import UPETCalculator
+    return UPETCalculator(model=spec.model, version=spec.version, device=spec.device)
+
+
+class ModelRegistry:
+    """LRU set of loaded calculators, one per model/version/device"""
+
+    def __init__(self, max_loaded: int = 2, loader: Callable[[ModelSpec], object] = load_upet):
+        self.max_loaded = max(1, max_loaded)
+        self.loader = loader
+        self._models: "OrderedDict[ModelSpec, object]" = OrderedDict()
+        self._warm = set()
+        self._load_times = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def get(self, spec: ModelSpec):
+        """Loaded calculator for spec, loading (and evicting) as needed"""
+        with self._lock:
+            if spec in self._models:
+                self._models.move_to_end(spec)
+                return self._models[spec]
+            load_lock = self._load_locks.setdefault(spec, threading.Lock())
+
+        # One loader per spec; other specs keep serving meanwhile
+        with load_lock:
+            with self._lock:
+                if spec in self._models:
+                    return self._models[spec]
+            start = time.perf_counter()
+            with metrics.stage("model_load"):
+                calc = self.loader(spec)
+            elapsed = time.perf_counter() - start
+            metrics.observe(metrics.MODEL_LOAD_SECONDS.name, elapsed, model=str(spec))
+
+            with self._lock:
+                self._models[spec] = calc
+                self._load_times[spec] = elapsed
+                while len(self._models) > self.max_loaded:
+                    evicted, _ = self._models.popitem(last=False)
+                    self._warm.discard(evicted)
+                    self._release_memory(evicted)
+            print(f"✓ MLIP model {spec} loaded in {elapsed:.2f}s")
+            return calc
+
+    def _release_memory(self, spec: ModelSpec):
+        if spec.device.startswith("cuda"):
+            try:
+                import torch
+                torch.cuda.empty_cache()
+            except ImportError:
+                pass
+
+    def warm_up(self, spec: ModelSpec) -> float:
+        """Load spec and run one dummy forward pass; returns the time taken"""
+        from ase.build import bulk
+
+        start = time.perf_counter()
+        calc = self.get(spec)
+        atoms = bulk("Si", "diamond", a=5.43)
+        atoms.calc = calc
+        atoms.get_potential_energy()
+        atoms.get_forces()
+        with self._lock:
+            self._warm.add(spec)
+        return time.perf_counter() - start
+
+    def is_warm(self, spec: ModelSpec) -> bool:
+        with self._lock:
+            return spec in self._warm
+
+    def evict(self, spec: ModelSpec) -> bool:
+        with self._lock:
+            if self._models.pop(spec, None) is None:
+                return False
+            self._warm.discard(spec)
+        self._release_memory(spec)
+        return True
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "max_loaded": self.max_loaded,
+                "default": str(resolve_spec()),
+                "loaded": [
+                    {
+                        "spec": str(spec),
+                        "warm": spec in self._warm,
+                        "load_time_s": round(self._load_times.get(spec, 0.0), 3),
+                    }
+                    for spec in self._models
+                ],
+            }
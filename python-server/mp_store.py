@@ -0,0 +1,331 @@
+"""
+Local Materials Project store
+Persistent, TTL-refreshed store of MP structures (by material_id) and
+ComputedEntry sets (by chemsys), backed by one MPRester client per I/O
+thread. Can run fully offline from a pre-seeded snapshot.
+"""
+
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from monty.json import MontyDecoder, MontyEncoder
+
+BATCH_SIZE = 500  # material_ids per summary query
+
+
+def chemsys_key(elements: Iterable[str]) -> str:
+    """Canonical chemsys string, e.g. ['O', 'Li'] -> 'Li-O'"""
+    return "-".join(sorted(set(elements)))
+
+
+def material_id_of(entry) -> Optional[str]:
+    """Material ID of an MP entry (entry IDs look like mp-149 or mp-149-GGA), if it has one"""
+    match = re.match(r"^((?:mp|mvc)-\d+)", str(entry.entry_id or ""))
+    return match.group(1) if match else None
+
+
+class MPStoreMissError(KeyError):
+    """Raised in offline mode when a record is not in the local store"""
+
+
+class _Fetch:
+    """One remote fetch in progress, which other threads missing the same key wait for"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class MPStore:
+    """Per-thread MP clients plus in-memory (LRU) and on-disk record store"""
+
+    def __init__(self, api_key: str = "", store_dir: Optional[str] = None, ttl: float = 7 * 86400,
+                 offline: bool = False, client_factory: Optional[Callable] = None,
+                 max_structures: int = 10000, max_entry_sets: int = 128):
+        self.api_key = api_key
+        self.store_dir = store_dir
+        self.ttl = ttl
+        self.offline = offline
+        self._client_factory = client_factory
+        # MPRester holds a requests.Session, which is not thread-safe: one per I/O thread
+        self._local = threading.local()
+        self._clients: list = []
+        self._lock = threading.RLock()
+        # key -> (fetched_at, value), least recently used first; evicted records stay on disk
+        self._structures: "OrderedDict[str, tuple]" = OrderedDict()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._limits = {"structures": max_structures, "entries": max_entry_sets}
+        self._entry_keys_on_disk = set()
+        self._fetching: Dict[str, _Fetch] = {}
+        self.counters = {"hits": 0, "misses": 0, "remote_queries": 0, "fetched_structures": 0,
+                         "fetched_entry_sets": 0, "coalesced_fetches": 0, "evictions": 0}
+
+        if store_dir:
+            os.makedirs(os.path.join(store_dir, "structures"), exist_ok=True)
+            os.makedirs(os.path.join(store_dir, "entries"), exist_ok=True)
+            self._entry_keys_on_disk = {
+                name[:-len(".json")] for name in os.listdir(os.path.join(store_dir, "entries"))
+                if name.endswith(".json")
+            }
+
+    # ---------- Client ----------
+
+    @property
+    def client(self):
+        """This thread's MPRester (and HTTP session), reused across its requests"""
+        client = getattr(self._local, "client", None)
+        if client is None:
+            if self.offline:
+                raise MPStoreMissError("MP store is offline")
+            if self._client_factory is not None:
+                client = self._client_factory()
+            else:
+                from mp_api.client import MPRester
+                client = MPRester(self.api_key)
+            self._local.client = client
+            with self._lock:
+                self._clients.append(client)
+        return client
+
+    def close(self):
+        with self._lock:
+            for client in self._clients:
+                if hasattr(client, "session"):
+                    client.session.close()
+            self._clients = []
+            self._local = threading.local()
+
+    # ---------- Single-flight ----------
+
+    def _claim(self, key: str):
+        """(fetch, True) if this thread should fetch key, or (fetch, False) to wait for another's"""
+        fetch = self._fetching.get(key)
+        if fetch is not None:
+            self.counters["coalesced_fetches"] += 1
+            return fetch, False
+        fetch = self._fetching[key] = _Fetch()
+        return fetch, True
+
+    def _release(self, keys: Iterable[str], error: Optional[BaseException] = None):
+        with self._lock:
+            for key in keys:
+                fetch = self._fetching.pop(key)
+                fetch.error = error
+                fetch.done.set()
+
+    @staticmethod
+    def _wait(fetch: _Fetch):
+        fetch.done.wait()
+        if fetch.error is not None:
+            raise fetch.error
+
+    # ---------- Persistence ----------
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.store_dir, kind, f"{key}.json")
+
+    def _load_record(self, kind: str, key: str):
+        if not self.store_dir:
+            return None
+        path = self._path(kind, key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                record = json.load(f)
+            return record["fetched_at"], MontyDecoder().process_decoded(record["value"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_record(self, kind: str, key: str, fetched_at: float, value):
+        if not self.store_dir:
+            return
+        path = self._path(kind, key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"fetched_at": fetched_at, "value": value}, f, cls=MontyEncoder)
+        os.replace(tmp, path)
+
+    def _remember(self, table: OrderedDict, kind: str, key: str, record: tuple):
+        table[key] = record
+        table.move_to_end(key)
+        if self.offline and not self.store_dir:
+            return  # a snapshot-only store has nowhere to reload evicted records from
+        while len(table) > self._limits[kind]:
+            table.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _lookup(self, table: OrderedDict, kind: str, key: str):
+        """Fresh record from memory or disk, or None"""
+        record = table.get(key)
+        if record is None:
+            record = self._load_record(kind, key)
+            if record is not None:
+                self._remember(table, kind, key, record)
+        else:
+            table.move_to_end(key)
+        if record is None:
+            return None
+        fetched_at, value = record
+        if not self.offline and time.time() - fetched_at > self.ttl:
+            return None
+        return value
+
+    def _store(self, table: OrderedDict, kind: str, key: str, value):
+        fetched_at = time.time()
+        self._remember(table, kind, key, (fetched_at, value))
+        self._save_record(kind, key, fetched_at, value)
+
+    # ---------- Structures ----------
+
+    def get_structures(self, material_ids: List[str]) -> Dict[str, object]:
+        """
+        Structures for many material_ids, fetching all misses in batched
+        queries. Misses another thread is already fetching are waited for
+        """
+        found, missing, waiting = {}, [], {}
+        material_ids = list(dict.fromkeys(material_ids))
+        with self._lock:
+            for mid in material_ids:
+                structure = self._lookup(self._structures, "structures", mid)
+                if structure is not None:
+                    found[mid] = structure
+                elif not self.offline:
+                    fetch, owner = self._claim(f"structures:{mid}")
+                    if owner:
+                        missing.append(mid)
+                    else:
+                        waiting[mid] = fetch
+            self.counters["hits"] += len(found)
+            self.counters["misses"] += len(material_ids) - len(found)
+
+        for start in range(0, len(missing), BATCH_SIZE):
+            batch = missing[start:start + BATCH_SIZE]
+            try:
+                docs = self.client.materials.summary.search(
+                    material_ids=batch, fields=["material_id", "structure"]
+                )
+            except BaseException as e:
+                self._release([f"structures:{mid}" for mid in missing[start:]], e)
+                raise
+            with self._lock:
+                self.counters["remote_queries"] += 1
+                for doc in docs or []:
+                    if doc.structure is None:
+                        continue
+                    mid = str(doc.material_id)
+                    self._store(self._structures, "structures", mid, doc.structure)
+                    self.counters["fetched_structures"] += 1
+                    found[mid] = doc.structure
+            self._release([f"structures:{mid}" for mid in batch])
+
+        for mid, fetch in waiting.items():
+            self._wait(fetch)
+            with self._lock:
+                structure = self._lookup(self._structures, "structures", mid)
+            if structure is not None:
+                found[mid] = structure
+
+        return found
+
+    def get_structure(self, material_id: str):
+        """Structure for one material_id, or None if MP has no such material"""
+        return self.get_structures([material_id]).get(material_id)
+
+    # ---------- Entries ----------
+
+    def _entries_from_parent(self, elements: set) -> Optional[list]:
+        """Serve a subsystem from any stored superset chemsys"""
+        for key in set(self._entries) | self._entry_keys_on_disk:
+            if elements < set(key.split("-")):
+                entries = self._lookup(self._entries, "entries", key)
+                if entries is not None:
+                    return [e for e in entries if {str(el) for el in e.composition.elements} <= elements]
+        return None
+
+    def get_entries(self, elements: List[str]) -> list:
+        """
+        ComputedEntry set for a chemical system (including all subsystems);
+        concurrent misses for one chemsys share a single remote query
+        """
+        key = chemsys_key(elements)
+        while True:
+            with self._lock:
+                entries = self._lookup(self._entries, "entries", key)
+                if entries is None:
+                    entries = self._entries_from_parent(set(key.split("-")))
+                if entries is not None:
+                    self.counters["hits"] += 1
+                    return entries
+                if self.offline:
+                    self.counters["misses"] += 1
+                    raise MPStoreMissError(f"Chemical system {key} not in local MP store")
+                fetch, owner = self._claim(f"entries:{key}")
+                if owner:
+                    self.counters["misses"] += 1
+            if owner:
+                break
+            # Another thread is querying this chemsys; its result is looked up again
+            self._wait(fetch)
+
+        try:
+            entries = self.client.get_entries_in_chemsys(key.split("-"))
+            with self._lock:
+                self.counters["remote_queries"] += 1
+                self.counters["fetched_entry_sets"] += 1
+                self._store(self._entries, "entries", key, entries)
+                if self.store_dir:
+                    self._entry_keys_on_disk.add(key)
+        except BaseException as e:
+            self._release([f"entries:{key}"], e)
+            raise
+        self._release([f"entries:{key}"])
+        return entries
+
+    # ---------- Snapshots ----------
+
+    def load_snapshot(self, path: str) -> int:
+        """Seed the store from a snapshot written by save_snapshot"""
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt") as f:
+            data = json.load(f)
+        decoder = MontyDecoder()
+        with self._lock:
+            for mid, record in data.get("structures", {}).items():
+                self._remember(self._structures, "structures", mid,
+                               (record["fetched_at"], decoder.process_decoded(record["value"])))
+            for key, record in data.get("entries", {}).items():
+                self._remember(self._entries, "entries", key,
+                               (record["fetched_at"], decoder.process_decoded(record["value"])))
+        return len(data.get("structures", {})) + len(data.get("entries", {}))
+
+    def save_snapshot(self, path: str):
+        """Write everything held in memory (the most recently used records) to one JSON (optionally .gz) file"""
+        with self._lock:
+            data = {
+                "structures": {k: {"fetched_at": t, "value": v} for k, (t, v) in self._structures.items()},
+                "entries": {k: {"fetched_at": t, "value": v} for k, (t, v) in self._entries.items()},
+            }
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "wt") as f:
+            json.dump(data, f, cls=MontyEncoder)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.counters,
+                "structures": len(self._structures),
+                "entry_sets": len(self._entries),
+                "max_structures": self._limits["structures"],
+                "max_entry_sets": self._limits["entries"],
+                "in_flight_fetches": len(self._fetching),
+                "offline": self.offline,
+                "ttl_s": self.ttl,
+                "store_dir": self.store_dir,
+            }
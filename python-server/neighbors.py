@@ -0,0 +1,117 @@
+"""
+Periodic neighbor-list engine
+Vectorized, PBC-aware pair search over NumPy coordinate arrays
+"""
+
+from typing import List, Sequence, Tuple
+import numpy as np
+
+DEFAULT_BOND_CUTOFF = 3.5  # Angstrom
+NUMERICAL_TOL = 1e-8
+
+
+def _kdtree_pairs(cart_coords: np.ndarray, lattice_matrix: np.ndarray, cutoff: float,
+                  pbc: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """KD-tree fallback when pymatgen's cell-list extension is unavailable"""
+    from scipy.spatial import cKDTree
+
+    # Number of images needed along each axis so that the cutoff sphere is covered
+    inv = np.linalg.inv(lattice_matrix)
+    reach = (np.ceil(cutoff * np.linalg.norm(inv, axis=0)).astype(int) + 1) * pbc
+    ranges = [np.arange(-n, n + 1) for n in reach]
+    images = np.array(np.meshgrid(*ranges, indexing="ij")).reshape(3, -1).T
+
+    n = len(cart_coords)
+    shifted = (cart_coords[None, :, :] + (images @ lattice_matrix)[:, None, :]).reshape(-1, 3)
+    tree = cKDTree(shifted)
+    center_tree = cKDTree(cart_coords)
+    sparse = center_tree.sparse_distance_matrix(tree, cutoff + NUMERICAL_TOL, output_type="coo_matrix")
+
+    centers = sparse.row.astype(np.int64)
+    points = (sparse.col % n).astype(np.int64)
+    offsets = images[sparse.col // n].astype(float)
+    distances = sparse.data
+    return centers, points, offsets, distances
+
+
+def neighbor_pairs(cart_coords: np.ndarray, lattice_matrix: np.ndarray, cutoff: float,
+                   pbc: Sequence[bool] = (True, True, True)) -> Tuple[np.ndarray, ...]:
+    """
+    Unique periodic neighbor pairs within cutoff.
+
+    Returns (i, j, offsets, distances) with every bond counted once:
+    i < j, or i == j for self-image bonds with a positive image offset.
+    """
+    cart_coords = np.ascontiguousarray(cart_coords, dtype=float)
+    lattice_matrix = np.ascontiguousarray(lattice_matrix, dtype=float)
+    pbc_arr = np.ascontiguousarray(pbc, dtype=int)
+
+    try:
+        from pymatgen.optimization.neighbors import find_points_in_spheres
+        centers, points, offsets, distances = find_points_in_spheres(
+            cart_coords, cart_coords, r=float(cutoff), pbc=pbc_arr,
+            lattice=lattice_matrix, tol=NUMERICAL_TOL,
+        )
+    except ImportError:
+        centers, points, offsets, distances = _kdtree_pairs(cart_coords, lattice_matrix, cutoff, pbc_arr)
+
+    # Every bond is found from both ends; keep one direction
+    keep = (centers < points) & (distances > NUMERICAL_TOL)
+    same = (centers == points) & (distances > NUMERICAL_TOL)
+    if np.any(same):
+        # Self-image bond: keep the copy whose first non-zero offset is positive
+        off = offsets[same]
+        first = off[np.arange(len(off)), np.argmax(off != 0, axis=1)]
+        keep[np.flatnonzero(same)[first > 0]] = True
+
+    return centers[keep], points[keep], offsets[keep], distances[keep]
+
+
+def bond_analysis(species: List[str], cart_coords: np.ndarray, lattice_matrix: np.ndarray,
+                  cutoff: float = DEFAULT_BOND_CUTOFF, top_n: int = 20,
+                  pbc: Sequence[bool] = (True, True, True)) -> Tuple[list, list]:
+    """
+    Shortest bonds and per-element-pair bond statistics.
+
+    Returns (bond_lengths, bond_statistics). bond_lengths keeps the
+    top-N format used by analyze_structure.
+    """
+    i, j, _, dist = neighbor_pairs(cart_coords, lattice_matrix, cutoff, pbc)
+    if len(dist) == 0:
+        return [], []
+
+    # Element codes for the pair statistics
+    elements, codes = np.unique(np.asarray(species), return_inverse=True)
+    a, b = codes[i], codes[j]
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    pair_code = lo * len(elements) + hi
+
+    # Top-N shortest bonds without a full sort
+    k = min(top_n, len(dist))
+    idx = np.argpartition(dist, k - 1)[:k]
+    idx = idx[np.lexsort((j[idx], i[idx], dist[idx]))]
+    bond_lengths = [
+        {"bond": f"{species[i[n]]}-{species[j[n]]}", "length": round(float(dist[n]), 4)}
+        for n in idx
+    ]
+
+    uniq, inverse, counts = np.unique(pair_code, return_inverse=True, return_counts=True)
+    sums = np.bincount(inverse, weights=dist)
+    mins = np.full(len(uniq), np.inf)
+    maxs = np.zeros(len(uniq))
+    np.minimum.at(mins, inverse, dist)
+    np.maximum.at(maxs, inverse, dist)
+
+    bond_statistics = []
+    for n, code in enumerate(uniq):
+        el1, el2 = elements[code // len(elements)], elements[code % len(elements)]
+        bond_statistics.append({
+            "pair": f"{el1}-{el2}",
+            "count": int(counts[n]),
+            "min": round(float(mins[n]), 4),
+            "mean": round(float(sums[n] / counts[n]), 4),
+            "max": round(float(maxs[n]), 4),
+        })
+    bond_statistics.sort(key=lambda x: x["min"])
+
+    return bond_lengths, bond_statistics
@@ -0,0 +1,170 @@
+"""
+Self-consistent MLIP elemental references
+For each model/version, an element's reference energy is the lowest MLIP
+energy per atom among its relaxed ground-state candidates: the lowest
+Materials Project polymorphs, or simple prototypes when MP has none.
+Computed once, persisted as one JSON file per model and reused across
+requests and restarts. References that fell back to prototypes because
+MP could not be reached are provisional: kept in memory for a limited
+time and never written to disk
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from mp_store import material_id_of
+
+# Bond lengths (Angstrom) of elements whose ground state is a diatomic molecule
+DIATOMIC = {"H": 0.74, "N": 1.10, "O": 1.21, "F": 1.42, "Cl": 1.99, "Br": 2.28, "I": 2.67}
+MOLECULE_BOX = 12.0  # Angstrom, cubic box around a dimer
+
+
+def prototype_candidates(element: str) -> List[dict]:
+    """Dimer in a box for diatomic elements, otherwise fcc, bcc and hcp from the metallic/atomic radius"""
+    from pymatgen.core import Element, Lattice, Structure
+
+    if element in DIATOMIC:
+        half = DIATOMIC[element] / 2 / MOLECULE_BOX
+        dimer = Structure(Lattice.cubic(MOLECULE_BOX), [element, element],
+                          [[0.5, 0.5, 0.5 - half], [0.5, 0.5, 0.5 + half]])
+        return [{"source": "prototype:dimer", "structure": dimer, "relax_cell": False}]
+
+    el = Element(element)
+    radius = float(el.metallic_radius or el.atomic_radius or 1.5)
+    fcc = Structure(Lattice.cubic(2 * math.sqrt(2) * radius), [element] * 4,
+                    [[0, 0, 0], [0.5, 0.5, 0], [0.5, 0, 0.5], [0, 0.5, 0.5]])
+    bcc = Structure(Lattice.cubic(4 * radius / math.sqrt(3)), [element] * 2, [[0, 0, 0], [0.5, 0.5, 0.5]])
+    hcp = Structure(Lattice.hexagonal(2 * radius, 2 * radius * math.sqrt(8 / 3)), [element] * 2,
+                    [[1 / 3, 2 / 3, 0.25], [2 / 3, 1 / 3, 0.75]])
+    return [{"source": f"prototype:{name}", "structure": s, "relax_cell": True}
+            for name, s in (("fcc", fcc), ("bcc", bcc), ("hcp", hcp))]
+
+
+def candidate_structures(element: str, entries: Iterable, max_candidates: int = 3) -> List[dict]:
+    """
+    Lowest-energy distinct elemental polymorphs among MP entries (those that
+    carry a structure), falling back to prototypes
+    """
+    elemental = [
+        e for e in entries
+        if getattr(e, "structure", None) is not None and {str(el) for el in e.composition.elements} == {element}
+    ]
+    elemental.sort(key=lambda e: e.energy_per_atom)
+    candidates, seen = [], set()
+    for entry in elemental:
+        material_id = material_id_of(entry) or str(entry.entry_id or entry.composition.reduced_formula)
+        if material_id in seen:
+            continue
+        seen.add(material_id)
+        candidates.append({"source": material_id, "structure": entry.structure, "relax_cell": True})
+        if len(candidates) >= max_candidates:
+            break
+    return candidates or prototype_candidates(element)
+
+
+def formation_energies(compositions: np.ndarray, energies: np.ndarray, references: np.ndarray) -> dict:
+    """
+    Vectorized formation energies.
+
+    compositions is the (compounds x elements) atom-count matrix, energies
+    the total energy per compound and references the energy per atom of
+    each element column.
+    """
+    reference_energy = compositions @ references
+    n_atoms = compositions.sum(axis=1)
+    formation = energies - reference_energy
+    return {
+        "n_atoms": n_atoms,
+        "reference_energy": reference_energy,
+        "formation_energy": formation,
+        "formation_energy_per_atom": formation / n_atoms,
+    }
+
+
+class ReferenceStore:
+    """Elemental reference records per model key, in memory and optionally on disk"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._tables: Dict[str, Dict[str, dict]] = {}
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "computed": 0, "loaded_from_disk": 0, "provisional": 0, "expired": 0}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, model_key: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^A-Za-z0-9._-]", "_", model_key) + ".json")
+
+    def _table(self, model_key: str) -> Dict[str, dict]:
+        table = self._tables.get(model_key)
+        if table is None:
+            table = {}
+            if self.directory and os.path.exists(self._path(model_key)):
+                try:
+                    with open(self._path(model_key)) as f:
+                        table = json.load(f)["references"]
+                    self.counters["loaded_from_disk"] += len(table)
+                except (OSError, ValueError, KeyError):
+                    table = {}
+            self._tables[model_key] = table
+        return table
+
+    def _save(self, model_key: str):
+        """Write the durable records of a model (called with the lock held)"""
+        if not self.directory:
+            return
+        durable = {el: r for el, r in self._tables[model_key].items() if not r.get("provisional")}
+        path = self._path(model_key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"model": model_key, "references": durable}, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+
+    def get(self, model_key: str, element: str) -> Optional[dict]:
+        with self._lock:
+            table = self._table(model_key)
+            record = table.get(element)
+            if record is not None and record.get("expires_at", math.inf) < time.time():
+                del table[element]
+                self.counters["expired"] += 1
+                record = None
+            if record is not None:
+                self.counters["hits"] += 1
+            return record
+
+    def table(self, model_key: str) -> Dict[str, dict]:
+        with self._lock:
+            return dict(self._table(model_key))
+
+    def put(self, model_key: str, element: str, record: dict, ttl: Optional[float] = None):
+        """Store a record; with ttl (seconds) it is provisional: memory only, recomputed once expired"""
+        now = time.time()
+        with self._lock:
+            table = self._table(model_key)
+            table[element] = {**record, "computed_at": now}
+            self.counters["computed"] += 1
+            if ttl is not None:
+                table[element].update(provisional=True, expires_at=now + ttl)
+                self.counters["provisional"] += 1
+            self._save(model_key)
+
+    def discard(self, model_key: str, element: str):
+        """Forget a record so the next lookup recomputes it"""
+        with self._lock:
+            if self._table(model_key).pop(element, None) is not None:
+                self._save(model_key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.counters,
+                "models": {key: len(table) for key, table in self._tables.items()},
+                "directory": self.directory,
+            }
@@ -0,0 +1,158 @@
+"""
+Streaming screening pipeline
+Three stages run concurrently and are joined by bounded queues:
+candidate fetching, MLIP evaluation (several workers) and hull placement.
+A full queue makes the stage before it wait, so memory stays bounded and
+the slowest stage sets the pace; events flow out as each candidate is
+placed
+"""
+
+import asyncio
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+_DONE = object()
+
+
+class Candidate:
+    """One structure to screen"""
+
+    __slots__ = ("id", "formula", "structure", "prior")
+
+    def __init__(self, id: str, formula: str, structure, prior: Optional[dict] = None):
+        self.id = id
+        self.formula = formula
+        self.structure = structure
+        self.prior = prior or {}  # e.g. the MP energy above hull
+
+
+class StageStats:
+    def __init__(self):
+        self.items = 0
+        self.busy = 0.0
+        self.max_queue = 0
+
+    def to_dict(self, wall: float) -> dict:
+        return {
+            "items": self.items,
+            "busy_s": round(self.busy, 4),
+            "utilization": round(self.busy / wall, 3) if wall > 0 else None,
+            "max_queue": self.max_queue,
+        }
+
+
+class Pipeline:
+    """
+    fetch(emit) is an async iterator of Candidates, evaluate(candidate)
+    returns a result dict (exceptions become "failed" events) and
+    place(candidate, result, emit) runs one at a time in completion order.
+    emit(event) sends an event to the output stream. At deadline (epoch
+    seconds) every stage is stopped and a "deadline" event is sent
+    """
+
+    def __init__(self, fetch: Callable[..., AsyncIterator[Candidate]],
+                 evaluate: Callable[[Candidate], Awaitable[dict]],
+                 place: Callable[..., Awaitable[None]], workers: int = 1, queue_size: int = 8,
+                 deadline: Optional[float] = None):
+        self.fetch = fetch
+        self.evaluate = evaluate
+        self.place = place
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.deadline = deadline
+        self.deadline_exceeded = False
+        self.stats = {"fetch": StageStats(), "evaluate": StageStats(), "place": StageStats()}
+        self.started = None
+
+    def stage_report(self) -> dict:
+        wall = time.perf_counter() - self.started
+        return {"wall_s": round(wall, 4), **{name: s.to_dict(wall) for name, s in self.stats.items()}}
+
+    async def run(self) -> AsyncIterator[dict]:
+        self.started = time.perf_counter()
+        candidates = asyncio.Queue(self.queue_size)
+        evaluated = asyncio.Queue(self.queue_size)
+        events = asyncio.Queue(self.queue_size)
+
+        async def emit(event: dict):
+            await events.put(event)
+
+        async def put(queue: asyncio.Queue, item, stats: StageStats):
+            await queue.put(item)
+            stats.max_queue = max(stats.max_queue, queue.qsize())
+
+        async def fetch_stage():
+            stats = self.stats["fetch"]
+            try:
+                iterator = self.fetch(emit).__aiter__()
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        candidate = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    finally:
+                        stats.busy += time.perf_counter() - start
+                    stats.items += 1
+                    await put(candidates, candidate, self.stats["evaluate"])
+            finally:
+                for _ in range(self.workers):
+                    await candidates.put(_DONE)
+
+        async def evaluate_stage():
+            stats = self.stats["evaluate"]
+            try:
+                while True:
+                    candidate = await candidates.get()
+                    if candidate is _DONE:
+                        return
+                    start = time.perf_counter()
+                    try:
+                        result = await self.evaluate(candidate)
+                    except Exception as e:
+                        result = {"success": False, "error": str(e)}
+                    stats.busy += time.perf_counter() - start
+                    stats.items += 1
+                    await put(evaluated, (candidate, result), self.stats["place"])
+            finally:
+                await evaluated.put(_DONE)
+
+        async def place_stage():
+            stats = self.stats["place"]
+            finished = 0
+            while finished < self.workers:
+                item = await evaluated.get()
+                if item is _DONE:
+                    finished += 1
+                    continue
+                start = time.perf_counter()
+                await self.place(*item, emit)
+                stats.busy += time.perf_counter() - start
+                stats.items += 1
+
+        async def supervise():
+            tasks = [asyncio.ensure_future(fetch_stage()), asyncio.ensure_future(place_stage())]
+            tasks += [asyncio.ensure_future(evaluate_stage()) for _ in range(self.workers)]
+            timeout = None if self.deadline is None else max(0.0, self.deadline - time.time())
+            try:
+                await asyncio.wait_for(asyncio.gather(*tasks), timeout)
+            except asyncio.TimeoutError:
+                self.deadline_exceeded = True
+                await events.put({"event": "deadline",
+                                  "error": "Deadline reached; remaining candidates were not screened"})
+            except Exception as e:
+                await events.put({"event": "error", "error": str(e)})
+            finally:
+                for task in tasks:
+                    task.cancel()
+            await events.put(_DONE)  # not reached when the consumer went away
+
+        supervisor = asyncio.ensure_future(supervise())
+        try:
+            while True:
+                event = await events.get()
+                if event is _DONE:
+                    break
+                yield event
+        finally:
+            supervisor.cancel()
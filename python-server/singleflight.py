@@ -0,0 +1,64 @@
+"""
+Single-flight request coalescing
+Concurrent calls with the same key share one running computation; callers
+arriving while it runs attach to it instead of starting their own
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict
+
+import metrics
+
+
+class SingleFlight:
+    """In-flight computations by key, on one event loop"""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[str, int] = {}
+        self.counters = {"leaders": 0, "joined": 0, "abandoned": 0}
+
+    def _done(self, key: str, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+            self._waiters.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # retrieved here so an unawaited failure is not logged
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        """
+        Await fn() once per key across concurrent callers.
+
+        Every caller gets the same result (or exception). A caller that is
+        cancelled (e.g. the client disconnected) leaves the shared
+        computation to the others; when the last one leaves it is cancelled,
+        and that caller waits for it to settle so its admission slot covers
+        any pool work still finishing.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            self.counters["leaders"] += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.counters["joined"] += 1
+            metrics.inc(metrics.COALESCED.name)
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._calls.get(key) is task and self._waiters[key] == 1 and not task.done():
+                # Detached first, so callers arriving meanwhile start afresh
+                del self._calls[key]
+                del self._waiters[key]
+                self.counters["abandoned"] += 1
+                task.cancel()
+                await asyncio.wait([task])
+            raise
+        finally:
+            if self._calls.get(key) is task:
+                self._waiters[key] -= 1
+
+    def stats(self) -> dict:
+        return {**self.counters, "in_flight": len(self._calls)}
@@ -0,0 +1,82 @@
+"""
+Startup profiling and deferred imports
+Heavy libraries are imported on first use or in an explicit warm-up phase
+per endpoint group; every import and initialization step is timed
+"""
+
+import importlib
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterable, List
+
+# Modules each endpoint group needs on first use
+IMPORT_GROUPS = {
+    "analysis": ["pymatgen.symmetry.analyzer", "pymatgen.analysis.local_env", "pymatgen.io.cif"],
+    "conversion": ["pymatgen.io.cif", "pymatgen.io.vasp", "pymatgen.io.ase", "ase.io"],
+    "phase_diagram": ["pymatgen.analysis.phase_diagram"],
+    "mp": ["mp_api.client"],
+    "mlip": ["pymatgen.io.ase", "pymatgen.io.cif", "ase.optimize", "ase.filters"],
+}
+
+PROFILE_ENABLED = os.environ.get("STARTUP_PROFILE", "0") == "1"
+_process_start = time.perf_counter()
+startup_profile = {"steps": [], "groups": {}}
+
+
+@contextmanager
+def profile_step(name: str):
+    """Time one import or initialization step"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_profile["steps"].append({"step": name, "seconds": round(time.perf_counter() - start, 4)})
+
+
+def resolve_groups(text: str) -> List[str]:
+    """'all' or a comma-separated list of IMPORT_GROUPS names"""
+    if text.strip() == "all":
+        return list(IMPORT_GROUPS)
+    groups = [g.strip() for g in text.split(",") if g.strip()]
+    unknown = [g for g in groups if g not in IMPORT_GROUPS]
+    if unknown:
+        raise ValueError(f"Unknown import groups: {', '.join(unknown)}")
+    return groups
+
+
+def warm_import_groups(groups: Iterable[str]) -> dict:
+    """Import every module of the given groups; returns seconds per module"""
+    timings = {}
+    for group in groups:
+        group_start = time.perf_counter()
+        for module in IMPORT_GROUPS[group]:
+            start = time.perf_counter()
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                if module != "ase.filters":  # ASE < 3.23 keeps the filters in ase.constraints
+                    raise
+                importlib.import_module("ase.constraints")
+            timings[module] = round(time.perf_counter() - start, 4)
+        startup_profile["groups"][group] = round(time.perf_counter() - group_start, 4)
+    return timings
+
+
+def profile_report() -> dict:
+    """Recorded steps, slowest first, plus time since process start"""
+    return {
+        "since_process_start_s": round(time.perf_counter() - _process_start, 4),
+        "steps": sorted(startup_profile["steps"], key=lambda s: -s["seconds"]),
+        "import_groups": startup_profile["groups"],
+    }
+
+
+def print_report():
+    report = profile_report()
+    print("Startup profile")
+    for step in report["steps"]:
+        print(f"  {step['seconds']:8.4f}s  {step['step']}")
+    for group, seconds in report["import_groups"].items():
+        print(f"  {seconds:8.4f}s  warm-up: {group}")
+    print(f"  {report['since_process_start_s']:8.4f}s  total since process start")
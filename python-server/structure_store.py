@@ -0,0 +1,168 @@
+"""
+Uploaded structure store
+Structures uploaded once are kept as compact arrays (lattice matrix,
+species index array, fractional coordinates) under a handle, so chained
+requests on the same structure skip CIF parsing and fingerprinting.
+Bounded by a memory budget with least-recently-used eviction
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class UnknownHandleError(LookupError):
+    """Raised for a handle that was never uploaded or has been evicted"""
+
+
+def upload_handle(content: str, fmt: str) -> str:
+    """Handle of an upload; the same text and format always map to the same handle"""
+    return "st-" + hashlib.sha256(f"{fmt}\n{content.strip()}".encode()).hexdigest()[:24]
+
+
+class CompactStructure:
+    """Array-backed copy of a pymatgen Structure"""
+
+    __slots__ = ("lattice", "species", "species_index", "frac_coords", "site_properties", "charge")
+
+    def __init__(self, lattice: np.ndarray, species: List[Dict[str, float]], species_index: np.ndarray,
+                 frac_coords: np.ndarray, site_properties: Optional[dict] = None, charge: float = 0.0):
+        self.lattice = lattice
+        self.species = species  # distinct site occupancies, e.g. {"Fe2+": 1.0}
+        self.species_index = species_index
+        self.frac_coords = frac_coords
+        self.site_properties = site_properties or {}
+        self.charge = charge
+
+    @classmethod
+    def from_structure(cls, structure) -> "CompactStructure":
+        table: Dict[tuple, int] = {}
+        index = np.empty(len(structure), dtype=np.int32)
+        for i, site in enumerate(structure):
+            occupancy = tuple((str(sp), float(occ)) for sp, occ in site.species.items())
+            index[i] = table.setdefault(occupancy, len(table))
+        properties = {}
+        for name, values in structure.site_properties.items():
+            array = np.asarray(values)
+            properties[name] = array if array.dtype != object else list(values)
+        return cls(
+            lattice=np.array(structure.lattice.matrix, dtype=np.float64),
+            species=[dict(occupancy) for occupancy in table],
+            species_index=index if len(table) > 1 << 15 else index.astype(np.int16),
+            frac_coords=np.array(structure.frac_coords, dtype=np.float64),
+            site_properties=properties,
+            charge=float(structure.charge or 0.0),
+        )
+
+    def to_structure(self):
+        from pymatgen.core import Lattice, Structure
+
+        species = [self.species[i] for i in self.species_index]
+        properties = {name: list(values) for name, values in self.site_properties.items()} or None
+        return Structure(Lattice(self.lattice), species, self.frac_coords, charge=self.charge,
+                         site_properties=properties)
+
+    @property
+    def n_sites(self) -> int:
+        return len(self.species_index)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory footprint"""
+        size = self.lattice.nbytes + self.species_index.nbytes + self.frac_coords.nbytes
+        size += sum(64 + 48 * len(occupancy) for occupancy in self.species)
+        for values in self.site_properties.values():
+            size += values.nbytes if isinstance(values, np.ndarray) else 64 * len(values)
+        return size + 256
+
+
+class StructureRecord:
+    def __init__(self, handle: str, compact: CompactStructure, fingerprint: str, formula: str):
+        self.handle = handle
+        self.compact = compact
+        self.fingerprint = fingerprint
+        self.formula = formula
+        self.nbytes = compact.nbytes
+        self.hits = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "handle": self.handle,
+            "formula": self.formula,
+            "n_atoms": self.compact.n_sites,
+            "fingerprint": self.fingerprint,
+            "bytes": self.nbytes,
+            "hits": self.hits,
+        }
+
+
+class StructureStore:
+    """LRU store of uploaded structures, bounded by max_bytes"""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._records: "OrderedDict[str, StructureRecord]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"uploads": 0, "hits": 0, "misses": 0, "evictions": 0}
+
+    def put(self, handle: str, compact: CompactStructure, fingerprint: str, formula: str) -> StructureRecord:
+        record = StructureRecord(handle, compact, fingerprint, formula)
+        if record.nbytes > self.max_bytes:
+            raise ValueError(f"Structure needs {record.nbytes} bytes, over the store budget of {self.max_bytes}")
+        with self._lock:
+            self.counters["uploads"] += 1
+            old = self._records.pop(handle, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._records[handle] = record
+            self._bytes += record.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._records.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.counters["evictions"] += 1
+        return record
+
+    def record(self, handle: str) -> Optional[StructureRecord]:
+        """Stored record, refreshing its LRU position"""
+        with self._lock:
+            record = self._records.get(handle)
+            if record is None:
+                self.counters["misses"] += 1
+                return None
+            self._records.move_to_end(handle)
+            self.counters["hits"] += 1
+            record.hits += 1
+            return record
+
+    def load(self, handle: str) -> Tuple[object, str]:
+        """(Structure, fingerprint) for a handle"""
+        record = self.record(handle)
+        if record is None:
+            raise UnknownHandleError(f"Structure handle {handle} not found (unknown or evicted; upload it again)")
+        return record.compact.to_structure(), record.fingerprint
+
+    def delete(self, handle: str) -> bool:
+        with self._lock:
+            record = self._records.pop(handle, None)
+            if record is None:
+                return False
+            self._bytes -= record.nbytes
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.counters,
+                "entries": len(self._records),
+                "memory_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+# Server modules are imported top-level, as uvicorn runs them from python-server/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app_client(tmp_path_factory):
+    """
+    Test client of the API: offline MP store, no model preload, analysis on
+    threads, and references and trajectories under a temporary directory
+    """
+    root = tmp_path_factory.mktemp("server")
+    os.environ.update({
+        "MLIP_PRELOAD": "",
+        "MP_OFFLINE": "1",
+        "REFERENCE_DIR": str(root / "references"),
+        "MD_TRAJECTORY_DIR": str(root / "trajectories"),
+    })
+    import executor
+    executor.POOL_CONFIG["analysis"]["kind"] = "thread"
+
+    import main
+    from fastapi.testclient import TestClient
+    with TestClient(main.app) as client:
+        yield client
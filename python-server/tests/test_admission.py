@@ -0,0 +1,57 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from admission import AdmissionControl, admission_route
+
+
+def make_app():
+    control = AdmissionControl({"/stream": ("mlip", 1)},
+                               {"mlip": {"max_concurrent": 1, "max_queue": 4, "timeout": 5.0}})
+    app = FastAPI()
+    app.router.route_class = admission_route(control)
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            await asyncio.sleep(0.05)
+            yield b"chunk\n"
+
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    return app, control.queues["mlip"]
+
+
+async def call(app, messages):
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": "/stream", "raw_path": b"/stream", "query_string": b"",
+             "root_path": "", "headers": [], "client": ("test", 1), "server": ("test", 80)}
+    incoming = list(messages)
+    sent = []
+
+    async def receive():
+        if incoming:
+            return incoming.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        await asyncio.sleep(0.01)  # a socket write; a disconnect can land here before the body starts
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent
+
+
+def test_slot_released_after_stream_completes():
+    app, queue = make_app()
+    sent = asyncio.run(call(app, [{"type": "http.request", "body": b"", "more_body": False}]))
+    assert any(m.get("body") == b"chunk\n" for m in sent)
+    assert queue.active == 0
+
+
+def test_slot_released_when_client_leaves_before_first_chunk():
+    app, queue = make_app()
+    asyncio.run(call(app, [{"type": "http.disconnect"}]))
+    assert queue.active == 0
+    assert queue.counters["admitted"] == 1
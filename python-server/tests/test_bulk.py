@@ -0,0 +1,69 @@
+import io
+import json
+import zipfile
+
+import pytest
+from pymatgen.core import Lattice, Structure
+from pymatgen.io.cif import CifWriter
+
+from conversion import iter_archive
+
+
+def cif(a=5.64):
+    return str(CifWriter(Structure.from_spacegroup("Fm-3m", Lattice.cubic(a), ["Na", "Cl"],
+                                                   [[0, 0, 0], [0.5, 0.5, 0.5]])))
+
+
+def zip_of(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, text in members.items():
+            archive.writestr(name, text)
+    return buffer.getvalue()
+
+
+def records(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_oversized_archive_member_is_reported_not_read():
+    data = zip_of({"a.cif": cif(), "big.xyz": "1\n\nH 0 0 0\n" + " " * 100_000, "notes.txt": "skip"})
+    members = list(iter_archive(data, max_member_bytes=50_000))
+    assert [(name, fmt) for name, fmt, _ in members] == [("a.cif", "cif"), ("big.xyz", None)]
+    assert "larger than 50000 bytes" in members[1][2]
+
+
+def test_bulk_analysis_of_an_archive(app_client):
+    members = {"a.cif": cif() + cif(5.5), "b.cif": cif(5.5), "bad.cif": "data_bad\n_cell_length_a 1\n"}
+    response = app_client.post("/analyze/bulk", content=zip_of(members))
+    assert response.status_code == 200
+    lines = records(response)
+    results = {r["id"]: r for r in lines if not r.get("summary")}
+    assert set(results) == {"a.cif#0", "a.cif#1", "b.cif#0", "bad.cif#0"}
+    assert not results.pop("bad.cif#0")["success"]
+    assert all(r["success"] and r["formula"] == "NaCl" for r in results.values())
+    assert lines[-1]["summary"] and lines[-1]["n_succeeded"] == 3
+
+
+@pytest.mark.parametrize("declared", [True, False])
+def test_body_over_the_bulk_cap_gets_413(app_client, monkeypatch, declared):
+    import main
+
+    monkeypatch.setattr(main, "MAX_BULK_BYTES", 1000)
+    body = cif().encode() * 2
+    if declared:
+        response = app_client.post("/analyze/bulk", content=body)
+    else:
+        # Chunked upload without Content-Length is cut off by the bytes received
+        response = app_client.post("/analyze/bulk", content=iter([body[:800], body[800:]]))
+    assert response.status_code == 413
+
+
+def test_oversized_member_in_bulk_upload(app_client, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "MAX_BULK_MEMBER_BYTES", 2000)
+    response = app_client.post("/analyze/bulk", content=zip_of({"a.cif": cif(), "big.cif": cif() * 5}))
+    results = {r["id"]: r for r in records(response) if not r.get("summary")}
+    assert results["a.cif#0"]["success"]
+    assert "larger than 2000 bytes" in results["big.cif"]["error"]
@@ -0,0 +1,72 @@
+import asyncio
+
+from pymatgen.core import Lattice, Structure
+
+from cache import ResultCache, exact_fingerprint, make_key, structure_fingerprint
+
+
+def orthorhombic(a, b, c, first="Na"):
+    species = [first, "Cl" if first == "Na" else "Na"]
+    return Structure(Lattice.orthorhombic(a, b, c), species, [[0, 0, 0], [0.5, 0.5, 0.5]])
+
+
+def test_canonical_fingerprint_ignores_setting_and_site_order():
+    reference = orthorhombic(3, 4, 5)
+    permuted_axes = orthorhombic(5, 4, 3)
+    reordered = Structure(reference.lattice, ["Cl", "Na"], [[0.5, 0.5, 0.5], [0, 0, 0]])
+    assert structure_fingerprint(reference) == structure_fingerprint(permuted_axes)
+    assert structure_fingerprint(reference) == structure_fingerprint(reordered)
+
+
+def test_exact_fingerprint_tracks_setting_and_site_order():
+    reference = orthorhombic(3, 4, 5)
+    reordered = Structure(reference.lattice, ["Cl", "Na"], [[0.5, 0.5, 0.5], [0, 0, 0]])
+    assert exact_fingerprint(reference) == exact_fingerprint(orthorhombic(3, 4, 5))
+    assert exact_fingerprint(reference) != exact_fingerprint(orthorhombic(5, 4, 3))
+    assert exact_fingerprint(reference) != exact_fingerprint(reordered)
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResultCache(max_bytes=60)
+    cache.put("a", {"v": "x" * 20})
+    cache.put("b", {"v": "y" * 20})
+    cache.get("a")
+    cache.put("c", {"v": "z" * 20})
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+
+
+def test_orientation_dependent_results_are_not_shared():
+    main = __import__("main")
+
+    def lattice_of(structure):
+        async def compute():
+            return {"abc": list(structure.lattice.abc)}
+        return compute()
+
+    async def run(structure, exact):
+        async def load():
+            return structure, structure_fingerprint(structure)
+        return await main.cached_compute("test/orientation", {"exact": exact}, "v1", load=load,
+                                         compute=lattice_of, exact=exact)
+
+    first, second = orthorhombic(3, 4, 5.5), orthorhombic(5.5, 4, 3)
+    assert asyncio.run(run(first, True))["abc"] == [3, 4, 5.5]
+    assert asyncio.run(run(second, True))["abc"] == [5.5, 4, 3]
+    # Scalar results share the canonical key
+    asyncio.run(run(first, False))
+    assert asyncio.run(run(second, False))["abc"] == [3, 4, 5.5]
+
+
+def test_raw_cif_alias_only_for_parsed_cif():
+    main = __import__("main")
+    assert main.raw_cif_input(cif_string="data_x") == "data_x"
+    assert main.raw_cif_input(material_id="mp-149", cif_string="data_x") is None
+    assert main.raw_cif_input(cif_string="data_x", structure_handle="abc") is None
+
+
+def test_make_key_depends_on_params_and_version():
+    fingerprint = exact_fingerprint(orthorhombic(3, 4, 5))
+    key = make_key("mlip/energy", fingerprint, {"arrays": True}, "m-1")
+    assert key != make_key("mlip/energy", fingerprint, {}, "m-1")
+    assert key != make_key("mlip/energy", fingerprint, {"arrays": True}, "m-2")
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from pymatgen.core import Lattice, Structure
+
+from cell_reduction import CellReduction
+
+
+def rocksalt():
+    return Structure.from_spacegroup("Fm-3m", Lattice.cubic(5.64), ["Na", "Cl"], [[0, 0, 0], [0.5, 0.5, 0.5]])
+
+
+def test_primitive_cell_maps_every_site():
+    structure = rocksalt()
+    reduction = CellReduction(structure, "primitive")
+    assert len(reduction.reduced) == 2
+    assert reduction.factor == 4
+    for i, site in enumerate(structure):
+        assert reduction.reduced[reduction.site_map[i]].specie == site.specie
+
+
+def test_expand_reproduces_submitted_cell():
+    structure = rocksalt()
+    reduction = CellReduction(structure, "primitive")
+    expanded = reduction.expand(reduction.reduced)
+    assert np.allclose(expanded.lattice.matrix, structure.lattice.matrix)
+    assert [s.specie for s in expanded] == [s.specie for s in structure]
+    assert np.allclose(expanded.cart_coords, structure.cart_coords, atol=1e-6)
+
+
+def test_strain_in_reduced_cell_carries_to_submitted_cell():
+    structure = rocksalt()
+    reduction = CellReduction(structure, "primitive")
+    strain = np.diag([1.01, 1.0, 0.99])
+    strained = reduction.reduced.copy()
+    strained.lattice = Lattice(reduction.reduced.lattice.matrix @ strain)
+    expanded = reduction.expand(strained)
+    assert np.allclose(expanded.lattice.matrix, structure.lattice.matrix @ strain)
+
+
+def test_forces_are_copied_to_equivalent_sites():
+    structure = rocksalt()
+    reduction = CellReduction(structure, "niggli")
+    forces = np.arange(len(reduction.reduced) * 3, dtype=float).reshape(-1, 3)
+    expanded = reduction.expand_forces(forces)
+    assert expanded.shape == (len(structure), 3)
+    assert np.array_equal(expanded, forces[reduction.site_map])
+
+
+def test_disordered_structure_is_rejected():
+    structure = Structure(Lattice.cubic(4), [{"Na": 0.5, "K": 0.5}], [[0, 0, 0]])
+    with pytest.raises(ValueError):
+        CellReduction(structure)
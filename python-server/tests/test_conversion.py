@@ -0,0 +1,54 @@
+import pytest
+from pymatgen.core import Lattice, Structure
+
+from conversion import convert_frames, format_for_name, iter_frames, normalize_format, read_frame, write_frame
+
+
+def structures():
+    return [
+        Structure.from_spacegroup("Fm-3m", Lattice.cubic(5.64), ["Na", "Cl"], [[0, 0, 0], [0.5, 0.5, 0.5]]),
+        Structure(Lattice.hexagonal(3.2, 5.2), ["Zn", "O"], [[1 / 3, 2 / 3, 0], [1 / 3, 2 / 3, 0.38]]),
+        Structure(Lattice.cubic(2.87), ["Fe", "Fe"], [[0, 0, 0], [0.5, 0.5, 0.5]]),
+    ]
+
+
+@pytest.mark.parametrize("fmt", ["cif", "poscar", "extxyz"])
+def test_multi_frame_text_splits_into_frames(fmt):
+    frames = [write_frame(s, fmt) for s in structures()]
+    content = ("\n" if fmt == "cif" else "").join(frames)
+    split = list(iter_frames(content, fmt))
+    assert len(split) == 3
+    for text, structure in zip(split, structures()):
+        assert read_frame(text, fmt).matches(structure)
+
+
+def test_plain_xyz_frames_split():
+    content = "2\nfirst\nH 0 0 0\nH 0 0 0.74\n3\nsecond\nO 0 0 0\nH 0 0.76 0.59\nH 0 -0.76 0.59\n"
+    assert [text.splitlines()[1] for text in iter_frames(content, "xyz")] == ["first", "second"]
+
+
+@pytest.mark.parametrize("to_format", ["cif", "poscar", "extxyz"])
+def test_round_trip_preserves_structure(to_format):
+    # CIF frames are read as primitive cells, so structures are compared with StructureMatcher
+    source = [write_frame(s, "cif") for s in structures()]
+    results = convert_frames(source, "cif", to_format)
+    assert all(r["success"] for r in results)
+    for result, structure in zip(results, structures()):
+        assert result["formula"] == structure.composition.reduced_formula
+        assert read_frame(result["output"], to_format).matches(structure)
+
+
+def test_bad_frame_fails_alone():
+    frames = [write_frame(structures()[0], "poscar"), "not a poscar\n", write_frame(structures()[2], "poscar")]
+    results = convert_frames(frames, "poscar", "cif")
+    assert [r["success"] for r in results] == [True, False, True]
+    assert results[1]["error"]
+
+
+def test_format_names():
+    assert normalize_format("VASP") == "poscar"
+    with pytest.raises(ValueError):
+        normalize_format("pdb")
+    assert format_for_name("dir/CONTCAR_relaxed") == "poscar"
+    assert format_for_name("traj.xyz") == "extxyz"
+    assert format_for_name("README.md") is None
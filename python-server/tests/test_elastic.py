@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from ase.calculators.lj import LennardJones
+from pymatgen.core import Lattice, Structure
+from pymatgen.io.ase import AseAtomsAdaptor
+
+from elastic import StrainSet, fit_elastic, fit_eos, voigt_strain
+
+SIGMA = 1.0
+CUTOFF = 4.0
+
+
+def lj_fcc(a):
+    return Structure(Lattice.cubic(a), ["Ar"] * 4, [[0, 0, 0], [0.5, 0.5, 0], [0.5, 0, 0.5], [0, 0.5, 0.5]])
+
+
+def evaluate(cells):
+    energies, stresses = [], []
+    for cell in cells:
+        atoms = AseAtomsAdaptor.get_atoms(cell)
+        atoms.calc = LennardJones(sigma=SIGMA, epsilon=1.0, rc=CUTOFF, smooth=True)
+        energies.append(atoms.get_potential_energy())
+        stresses.append(atoms.get_stress(voigt=True))
+    return np.array(energies), np.array(stresses)
+
+
+@pytest.fixture(scope="module")
+def equilibrium():
+    strain_set = StrainSet(lj_fcc(1.55), eos_points=9, eos_max_volume_strain=0.08, strain_magnitudes=None)
+    energies, _ = evaluate(strain_set.cells)
+    eos = fit_eos([strain_set.cells[i].volume for i in strain_set.eos], energies[strain_set.eos])
+    return lj_fcc(eos["v0_A3"] ** (1 / 3)), eos
+
+
+def test_shear_strain_is_engineering_strain():
+    strain = voigt_strain(5, 0.02)
+    assert strain[0, 1] == strain[1, 0] == pytest.approx(0.01)
+    assert np.trace(strain) == 0
+
+
+def test_strain_set_layout():
+    strain_set = StrainSet(lj_fcc(1.55), eos_points=7, strain_magnitudes=(0.005, 0.01))
+    assert len(strain_set.eos) == 7 and strain_set.eos[3] == 0  # the reference is the midpoint
+    assert len(strain_set.elastic) == 6 * 2 * 2
+    volumes = [strain_set.cells[i].volume for i in strain_set.eos]
+    assert volumes == sorted(volumes)
+
+
+def test_cubic_lj_crystal(equilibrium):
+    structure, eos = equilibrium
+    strain_set = StrainSet(structure, eos_points=0, strain_magnitudes=(0.002, 0.004))
+    _, stresses = evaluate(strain_set.cells)
+    result = fit_elastic(strain_set.elastic, stresses[1:], stresses[0])
+    c = np.array(result["C_GPa"])
+
+    assert c[0, 0] == pytest.approx(c[1, 1], rel=1e-3) == pytest.approx(c[2, 2], rel=1e-3)
+    assert c[0, 1] == pytest.approx(c[0, 2], rel=1e-3) == pytest.approx(c[1, 2], rel=1e-3)
+    assert c[3, 3] == pytest.approx(c[4, 4], rel=1e-3) == pytest.approx(c[5, 5], rel=1e-3)
+    assert np.abs(c[:3, 3:]).max() < 1e-3 * c[0, 0]
+    assert result["mechanically_stable"]
+    # Central pair forces at zero pressure obey the Cauchy relation C12 = C44
+    assert c[0, 1] == pytest.approx(c[3, 3], rel=0.02)
+    # The EOS bulk modulus agrees with the tensor's
+    assert result["bulk_modulus_voigt_GPa"] == pytest.approx(eos["b0_GPa"], rel=0.02)
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from elements import ElementIndex
+
+
+@pytest.fixture(scope="module")
+def index():
+    return ElementIndex()
+
+
+def test_index_is_in_atomic_number_order(index):
+    assert index.symbols[:3] == ["H", "He", "Li"]
+    assert len(set(index.symbols)) == len(index)  # the D and T isotopes are not listed as H
+    assert json.loads(index.row("H"))["atomic_mass"] == pytest.approx(1.008, abs=1e-3)
+    assert json.loads(index.row("fe"))["atomic_number"] == 26
+    assert json.loads(index.body())["count"] == len(index)
+
+
+def test_subset_keeps_request_order_and_drops_duplicates(index):
+    symbols = index.resolve(["O", "li", "Fe", "o"])
+    assert symbols == ["O", "Li", "Fe"]
+    assert [e["symbol"] for e in json.loads(index.body(symbols))["elements"]] == symbols
+    with pytest.raises(ValueError, match="Xx"):
+        index.resolve(["Fe", "Xx"])
+
+
+def test_etag_depends_on_the_selection(index):
+    assert index.etag(["Fe"]) == index.etag(["Fe"])
+    assert index.etag(["Fe", "O"]) != index.etag(["O", "Fe"])
+    assert index.etag() != index.etag(["Fe"])
+
+
+def test_element_etag_and_not_modified(app_client):
+    first = app_client.get("/element/Fe")
+    assert first.status_code == 200
+    assert first.json()["symbol"] == "Fe"
+    etag = first.headers["etag"]
+    assert "max-age" in first.headers["cache-control"]
+
+    cached = app_client.get("/element/fe", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert app_client.get("/element/O", headers={"If-None-Match": etag}).status_code == 200
+    assert app_client.get("/element/Xx").status_code == 400
+
+
+def test_elements_subset_and_table(app_client):
+    subset = app_client.get("/elements", params={"symbols": "Li,Fe,O"})
+    assert [e["symbol"] for e in subset.json()["elements"]] == ["Li", "Fe", "O"]
+    table = app_client.get("/elements")
+    assert table.json()["count"] > 100
+    assert app_client.get("/elements", headers={"If-None-Match": table.headers["etag"]}).status_code == 304
+    assert app_client.get("/elements", params={"symbols": "Li,Qq"}).status_code == 400
@@ -0,0 +1,51 @@
+import asyncio
+import gc
+import threading
+import time
+
+import executor
+
+
+def test_cancelled_caller_waits_for_running_work():
+    started, release = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    async def main():
+        call = asyncio.ensure_future(executor.run_io(work))
+        while not started.is_set():
+            await asyncio.sleep(0.001)
+        call.cancel()
+        threading.Timer(0.1, release.set).start()
+        start = time.perf_counter()
+        await asyncio.gather(call, return_exceptions=True)
+        return time.perf_counter() - start, call.cancelled()
+
+    waited, cancelled = asyncio.run(main())
+    assert cancelled
+    assert waited >= 0.09
+
+
+def test_failure_of_abandoned_work_is_not_logged():
+    started = threading.Event()
+
+    def work():
+        started.set()
+        time.sleep(0.05)
+        raise RuntimeError("model missing")
+
+    async def main():
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda _, context: errors.append(context))
+        call = asyncio.ensure_future(executor.run_io(work))
+        while not started.is_set():
+            await asyncio.sleep(0.001)
+        call.cancel()
+        await asyncio.gather(call, return_exceptions=True)
+        gc.collect()
+        return errors
+
+    assert asyncio.run(main()) == []
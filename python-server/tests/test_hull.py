@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from pymatgen.analysis.phase_diagram import PhaseDiagram
+from pymatgen.core import Composition
+from pymatgen.entries.computed_entries import ComputedEntry
+
+from hull import Hull, HullCache
+
+ELEMENTS = ["Fe", "Li", "O"]
+
+
+def random_entries(n, seed=0):
+    rng = np.random.default_rng(seed)
+    entries = [ComputedEntry(el, -float(rng.uniform(1, 3)), entry_id=f"el-{el}") for el in ELEMENTS]
+    for i in range(n):
+        counts = rng.integers(0, 5, size=3)
+        if counts.sum() == 0:
+            counts[0] = 1
+        composition = Composition(dict(zip(ELEMENTS, counts.tolist())))
+        energy = -float(rng.uniform(1, 4)) * composition.num_atoms
+        entries.append(ComputedEntry(composition, energy, entry_id=f"x-{i}"))
+    return entries
+
+
+def assert_matches_pymatgen(hull, entries):
+    pd = PhaseDiagram(entries)
+    for i, entry in enumerate(hull.entries):
+        expected = pd.get_e_above_hull(entry, allow_negative=True)
+        assert hull.e_above_hull[i] == pytest.approx(expected, abs=1e-10), entry.entry_id
+        assert bool(hull.stable[i]) == (abs(expected) < 1e-10 and entry in pd.stable_entries)
+
+
+def test_static_hull_matches_phase_diagram():
+    entries = random_entries(60)
+    assert_matches_pymatgen(Hull(entries, ELEMENTS), entries)
+
+
+def test_incremental_hull_matches_phase_diagram():
+    entries = random_entries(60, seed=1)
+    hull = Hull(entries[:20], ELEMENTS)
+    for start in range(20, len(entries), 8):
+        hull.add_entries(entries[start:start + 8])
+        assert_matches_pymatgen(hull, entries[:start + 8])
+
+
+def test_decomposition_weights_sum_to_one():
+    entries = random_entries(30, seed=2)
+    hull = Hull(entries, ELEMENTS)
+    for i in range(len(hull.entries)):
+        amounts = [amount for _, amount in hull.decomposition(i)]
+        assert sum(amounts) == pytest.approx(1.0)
+
+
+def test_cache_serves_subsystem_from_parent():
+    entries = random_entries(30, seed=3)
+    cache = HullCache()
+    cache.get(ELEMENTS, entries)
+    binary = [e for e in entries if {str(el) for el in e.composition.elements} <= {"Li", "O"}]
+    hull, indices = cache.get(["Li", "O"], binary)
+    assert cache.counters["parent_hits"] == 1
+    pd = PhaseDiagram(binary)
+    for i in indices:
+        assert hull.e_above_hull[i] == pytest.approx(pd.get_e_above_hull(hull.entries[i]), abs=1e-10)
+
+
+def test_cache_applies_corrected_energies():
+    entries = random_entries(30, seed=4)
+    cache = HullCache()
+    cache.get(ELEMENTS, entries)
+    corrected = entries[:-1] + [ComputedEntry(entries[-1].composition, entries[-1].energy - 50.0,
+                                              entry_id=entries[-1].entry_id)]
+    hull, indices = cache.get(ELEMENTS, corrected)
+    assert cache.counters["stale_rebuilds"] == 1
+    assert len(indices) == len(corrected)
+    assert_matches_pymatgen(hull, corrected)
+
+
+def test_cache_drops_withdrawn_entries():
+    entries = random_entries(30, seed=5)
+    cache = HullCache()
+    cache.get(ELEMENTS, entries)
+    remaining = entries[:-5]
+    hull, indices = cache.get(ELEMENTS, remaining)
+    assert {hull.entries[i].entry_id for i in indices} == {e.entry_id for e in remaining}
+    assert_matches_pymatgen(hull, remaining)
+
+    # The parent hull still holds a binary phase the subsystem no longer has
+    binary = [e for e in remaining if {str(el) for el in e.composition.elements} <= {"Li", "O"}][:-1]
+    hull, indices = cache.get(["Li", "O"], binary)
+    assert cache.counters["parent_hits"] == 0
+    assert {hull.entries[i].entry_id for i in indices} == {e.entry_id for e in binary}
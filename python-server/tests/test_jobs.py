@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+from executor import run_io
+from jobs import JobManager
+
+
+def stepping_runner(steps, delay=0.01):
+    """Runner reporting every step from the I/O pool and honouring cancellation"""
+    def work(channel):
+        for step in range(steps):
+            channel.check_cancelled()
+            channel.report(step=step)
+            time.sleep(delay)
+        return {"steps": steps}
+
+    async def runner(job):
+        return await run_io(work, job.channel)
+
+    return runner
+
+
+def test_job_reports_progress_and_completes():
+    async def main():
+        manager = JobManager(poll_interval=0.01)
+        job = manager.submit("relax", {}, stepping_runner(5))
+        events = [chunk async for chunk in manager.stream(job)]
+        await manager.stop()
+        return job, events
+
+    job, events = asyncio.run(main())
+    assert job.status == "completed"
+    assert job.result == {"steps": 5}
+    assert [e["step"] for e in job.events] == list(range(5))
+    assert events[-1].startswith("event: completed")
+
+
+def test_running_job_cancels_and_queued_job_never_starts():
+    async def main():
+        manager = JobManager(workers=1, poll_interval=0.01)
+        running = manager.submit("relax", {}, stepping_runner(1000))
+        queued = manager.submit("relax", {}, stepping_runner(5))
+        while not running.events:
+            await asyncio.sleep(0.01)
+        manager.cancel(queued.id)
+        manager.cancel(running.id)
+        while running.status == "running":
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        await manager.stop()
+        return running, queued
+
+    running, queued = asyncio.run(main())
+    assert running.status == "cancelled"
+    assert len(running.events) < 1000
+    assert queued.status == "cancelled"
+    assert queued.started_at is None
+
+
+def test_runner_receives_its_own_job():
+    async def main():
+        manager = JobManager(poll_interval=0.01)
+        seen = []
+
+        async def runner(job):
+            seen.append(job.id)
+            return {}
+
+        job = manager.submit("md", {}, runner)
+        while job.status != "completed":
+            await asyncio.sleep(0.01)
+        await manager.stop()
+        return job, seen
+
+    job, seen = asyncio.run(main())
+    assert seen == [job.id]
+
+
+def test_active_key_dedupes_until_the_job_ends():
+    async def main():
+        manager = JobManager(poll_interval=0.01)
+        job = manager.submit("relax", {}, stepping_runner(3), key="k")
+        assert manager.active("k") is job
+        while job.status != "completed":
+            await asyncio.sleep(0.01)
+        await manager.stop()
+        return manager.active("k")
+
+    assert asyncio.run(main()) is None
+
+
+def test_stop_with_a_running_job_shuts_down_cleanly():
+    async def main():
+        manager = JobManager(poll_interval=0.01)
+        loop = asyncio.get_running_loop()
+        errors = []
+        loop.set_exception_handler(lambda _, context: errors.append(context))
+        job = manager.submit("relax", {}, stepping_runner(20))
+        while not job.events:
+            await asyncio.sleep(0.01)
+        await manager.stop()
+        await asyncio.sleep(0.05)
+        return errors
+
+    assert asyncio.run(main()) == []
+
+
+def test_history_is_bounded():
+    async def main():
+        manager = JobManager(poll_interval=0.01, history=2)
+        jobs = [manager.submit("relax", {}, stepping_runner(1, delay=0)) for _ in range(4)]
+        while any(job.status != "completed" for job in jobs):
+            await asyncio.sleep(0.01)
+        await manager.stop()
+        return manager, jobs
+
+    manager, jobs = asyncio.run(main())
+    assert [job.id for job in manager.list()] == [job.id for job in jobs[-2:]]
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from ase.build import bulk
+from ase.calculators.lj import LennardJones
+
+from mlip_batch import pack_batches, predict_batch
+
+
+def test_batches_cover_every_structure_once_within_the_atom_budget():
+    rng = np.random.default_rng(0)
+    sizes = rng.integers(1, 120, size=200).tolist()
+    batches = pack_batches(sizes, max_atoms=500, max_structures=16)
+    assert sorted(i for batch in batches for i in batch) == list(range(len(sizes)))
+    for batch in batches:
+        assert sum(sizes[i] for i in batch) <= 500
+        assert len(batch) <= 16
+    loads = [sum(sizes[i] for i in batch) for batch in batches]
+    assert loads == sorted(loads)  # small batches stream back first
+
+
+def test_oversized_structure_gets_its_own_batch():
+    batches = pack_batches([10, 5000, 20], max_atoms=100)
+    assert [1] in batches
+    assert sorted(map(sorted, batches)) == [[0, 2], [1]]
+
+
+class BatchedLJ:
+    """Calculator exposing the batched compute_energy interface, backed by ASE LJ"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def compute_energy(self, atoms_list, compute_forces_and_stresses=True):
+        self.calls += 1
+        energies, forces, stresses = [], [], []
+        for atoms in atoms_list:
+            atoms = atoms.copy()
+            atoms.calc = LennardJones(sigma=2.3, epsilon=0.1, rc=6.0)
+            energies.append(atoms.get_potential_energy())
+            forces.append(atoms.get_forces())
+            stresses.append(atoms.get_stress(voigt=False))
+        return {"energy": energies, "forces": forces, "stress": stresses}
+
+
+def test_batched_path_matches_one_by_one():
+    atoms_list = [bulk("Ar", "fcc", a=a) for a in (5.2, 5.3, 5.4)]
+    for atoms in atoms_list:
+        atoms.rattle(0.05, seed=1)
+    calc = BatchedLJ()
+    batched = predict_batch(calc, [a.copy() for a in atoms_list])
+    single = predict_batch(LennardJones(sigma=2.3, epsilon=0.1, rc=6.0), [a.copy() for a in atoms_list])
+    assert calc.calls == 1
+    for b, s in zip(batched, single):
+        assert b["energy"] == pytest.approx(s["energy"])
+        assert np.allclose(b["forces"], s["forces"])
+        assert np.allclose(b["stress"], s["stress"])  # 3x3 converted to Voigt order
+
+
+def test_molecules_get_no_stress():
+    from ase.build import molecule
+
+    results = predict_batch(LennardJones(), [molecule("H2O")])
+    assert results[0]["stress"] is None
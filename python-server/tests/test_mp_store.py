@@ -0,0 +1,114 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from pymatgen.core import Lattice, Structure
+from pymatgen.entries.computed_entries import ComputedEntry
+
+from mp_store import MPStore, MPStoreMissError
+
+
+class FakeMP:
+    """MPRester stand-in counting queries; each one takes delay seconds"""
+
+    def __init__(self, log, delay=0.0, fail=False):
+        self.log, self.delay, self.fail = log, delay, fail
+        self.materials = SimpleNamespace(summary=SimpleNamespace(search=self.search))
+
+    def _query(self, what):
+        self.log.append((threading.get_ident(), what))
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("MP unreachable")
+
+    def search(self, material_ids, fields):
+        self._query(tuple(material_ids))
+        return [SimpleNamespace(material_id=mid, structure=Structure(Lattice.cubic(3.0), ["Li"], [[0, 0, 0]]))
+                for mid in material_ids]
+
+    def get_entries_in_chemsys(self, elements):
+        self._query("-".join(elements))
+        return [ComputedEntry(el, -1.0, entry_id=f"mp-{i}") for i, el in enumerate(elements)]
+
+
+def concurrently(fn, n):
+    results, errors = [None] * n, [None] * n
+    barrier = threading.Barrier(n)
+
+    def run(i):
+        barrier.wait()
+        try:
+            results[i] = fn()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_entry_misses_share_one_query():
+    log = []
+    store = MPStore(client_factory=lambda: FakeMP(log, delay=0.1))
+    results, errors = concurrently(lambda: store.get_entries(["O", "Li"]), 6)
+    assert errors == [None] * 6
+    assert [what for _, what in log] == ["Li-O"]
+    assert all(len(r) == 2 for r in results)
+    assert store.counters["coalesced_fetches"] == 5
+
+
+def test_concurrent_structure_misses_share_one_query():
+    log = []
+    store = MPStore(client_factory=lambda: FakeMP(log, delay=0.1))
+    results, _ = concurrently(lambda: store.get_structures(["mp-1", "mp-2"]), 4)
+    assert len(log) == 1
+    assert all(set(r) == {"mp-1", "mp-2"} for r in results)
+
+
+def test_fetch_error_reaches_waiters():
+    log = []
+    store = MPStore(client_factory=lambda: FakeMP(log, delay=0.1, fail=True))
+    _, errors = concurrently(lambda: store.get_entries(["Li", "O"]), 3)
+    assert len(log) == 1
+    assert all(isinstance(e, ConnectionError) for e in errors)
+    assert store.stats()["in_flight_fetches"] == 0
+
+
+def test_each_thread_gets_its_own_client():
+    store = MPStore(client_factory=lambda: FakeMP([]))
+    results, _ = concurrently(lambda: (store.client, store.client), 3)
+    assert all(first is second for first, second in results)
+    assert len({id(first) for first, _ in results}) == 3
+    store.close()
+    assert store._clients == []
+
+
+def test_tables_are_lru_bounded_and_reload_from_disk(tmp_path):
+    log = []
+    store = MPStore(store_dir=str(tmp_path), client_factory=lambda: FakeMP(log), max_entry_sets=2)
+    for chemsys in (["Li"], ["O"], ["Na"]):
+        store.get_entries(chemsys)
+    assert list(store._entries) == ["O", "Na"]
+    assert store.counters["evictions"] == 1
+
+    store.get_entries(["Li"])  # evicted from memory, read back from disk
+    assert len(log) == 3
+    assert list(store._entries) == ["Na", "Li"]
+
+
+def test_offline_snapshot_store_does_not_evict(tmp_path):
+    online = MPStore(client_factory=lambda: FakeMP([]))
+    for chemsys in (["Li"], ["O"], ["Na"]):
+        online.get_entries(chemsys)
+    online.save_snapshot(str(tmp_path / "snapshot.json"))
+
+    offline = MPStore(offline=True, max_entry_sets=1)
+    offline.load_snapshot(str(tmp_path / "snapshot.json"))
+    assert [e.entry_id for e in offline.get_entries(["Li"])] == ["mp-0"]
+    assert len(offline.get_entries(["Na"])) == 1
+    with pytest.raises(MPStoreMissError):
+        offline.get_entries(["Fe"])
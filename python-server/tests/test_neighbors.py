@@ -0,0 +1,57 @@
+import sys
+
+import numpy as np
+import pytest
+from pymatgen.core import Lattice, Structure
+
+from neighbors import bond_analysis, neighbor_pairs
+
+
+def rocksalt():
+    return Structure.from_spacegroup("Fm-3m", Lattice.cubic(5.64), ["Na", "Cl"], [[0, 0, 0], [0.5, 0.5, 0.5]])
+
+
+def triclinic():
+    rng = np.random.default_rng(0)
+    lattice = Lattice.from_parameters(3.1, 3.7, 4.2, 77, 101, 95)
+    return Structure(lattice, ["Si", "O", "O", "Mg"], rng.random((4, 3)))
+
+
+def pymatgen_pair_count(structure, cutoff):
+    """Bonds counted once: every directed neighbor pair pymatgen finds, halved"""
+    return sum(len(n) for n in structure.get_all_neighbors(cutoff)) // 2
+
+
+@pytest.mark.parametrize("make", [rocksalt, triclinic])
+@pytest.mark.parametrize("cutoff", [2.5, 3.5, 6.0])
+def test_pair_count_matches_pymatgen(make, cutoff):
+    structure = make()
+    i, j, _, dist = neighbor_pairs(structure.cart_coords, structure.lattice.matrix, cutoff)
+    assert len(dist) == pymatgen_pair_count(structure, cutoff)
+    assert np.all(dist <= cutoff + 1e-6)
+
+
+def test_cutoff_beyond_cell_counts_self_images_once():
+    # One atom in a 2 A cube: 6 nearest images at 2 A, 12 at 2.83 A, 8 at 3.46 A; half of each kept
+    structure = Structure(Lattice.cubic(2.0), ["Cu"], [[0, 0, 0]])
+    i, j, offsets, dist = neighbor_pairs(structure.cart_coords, structure.lattice.matrix, 3.5)
+    assert len(dist) == pymatgen_pair_count(structure, 3.5) == 13
+    assert np.all(i == j)
+    assert not any((o == -p).all() for n, o in enumerate(offsets) for p in offsets[n + 1:])
+
+
+def test_kdtree_fallback_matches_cell_list(monkeypatch):
+    structure = triclinic()
+    args = (structure.cart_coords, structure.lattice.matrix, 5.0)
+    i, j, _, dist = neighbor_pairs(*args)
+    monkeypatch.setitem(sys.modules, "pymatgen.optimization.neighbors", None)  # import raises ImportError
+    fi, fj, _, fdist = neighbor_pairs(*args)
+    assert sorted(zip(fi, fj, np.round(fdist, 8))) == sorted(zip(i, j, np.round(dist, 8)))
+
+
+def test_bond_statistics_of_rocksalt():
+    structure = rocksalt()
+    lengths, stats = bond_analysis([str(s.specie) for s in structure], structure.cart_coords,
+                                   structure.lattice.matrix, cutoff=3.0)
+    assert lengths[0] == {"bond": "Na-Cl", "length": 2.82}
+    assert stats == [{"pair": "Cl-Na", "count": 24, "min": 2.82, "mean": 2.82, "max": 2.82}]
@@ -0,0 +1,57 @@
+import time
+
+import numpy as np
+import pytest
+from pymatgen.core import Composition, Lattice, Structure
+from pymatgen.entries.computed_entries import ComputedStructureEntry
+
+from references import ReferenceStore, candidate_structures, formation_energies
+
+
+def test_durable_records_survive_a_restart(tmp_path):
+    store = ReferenceStore(str(tmp_path))
+    store.put("model/v1", "Fe", {"energy_per_atom": -8.3})
+    store.put("model/v1", "O", {"energy_per_atom": -4.9}, ttl=60)
+    assert store.get("model/v1", "O")["provisional"]
+
+    reloaded = ReferenceStore(str(tmp_path))
+    assert reloaded.get("model/v1", "Fe")["energy_per_atom"] == -8.3
+    assert reloaded.get("model/v1", "O") is None  # provisional records stay in memory
+    assert reloaded.counters["loaded_from_disk"] == 1
+
+
+def test_provisional_record_expires(monkeypatch):
+    store = ReferenceStore()
+    store.put("m", "Fe", {"energy_per_atom": -8.3}, ttl=10)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert store.get("m", "Fe") is None
+    assert store.counters["expired"] == 1
+
+
+def test_discard_removes_the_persisted_record(tmp_path):
+    store = ReferenceStore(str(tmp_path))
+    store.put("m", "Fe", {"energy_per_atom": -8.3})
+    store.discard("m", "Fe")
+    assert ReferenceStore(str(tmp_path)).get("m", "Fe") is None
+
+
+def test_candidates_prefer_lowest_mp_polymorphs():
+    def entry(energy, entry_id):
+        structure = Structure(Lattice.cubic(2.87), ["Fe", "Fe"], [[0, 0, 0], [0.5, 0.5, 0.5]])
+        return ComputedStructureEntry(structure, energy, entry_id=entry_id)
+
+    entries = [entry(-15.0, "mp-2"), entry(-16.6, "mp-13"), entry(-16.0, "mp-13")]
+    assert [c["source"] for c in candidate_structures("Fe", entries)] == ["mp-13", "mp-2"]
+    assert [c["source"] for c in candidate_structures("Fe", [])] == \
+        ["prototype:fcc", "prototype:bcc", "prototype:hcp"]
+    assert candidate_structures("O", [])[0]["source"] == "prototype:dimer"
+
+
+def test_formation_energies_match_per_compound_arithmetic():
+    compounds = [Composition("Fe2O3"), Composition("FeO")]
+    matrix = np.array([[c["Fe"], c["O"]] for c in compounds])
+    references = np.array([-8.3, -4.9])
+    result = formation_energies(matrix, np.array([-38.0, -13.5]), references)
+    assert result["formation_energy"] == pytest.approx([-38.0 - (2 * -8.3 + 3 * -4.9), -13.5 - (-8.3 - 4.9)])
+    assert result["formation_energy_per_atom"] == pytest.approx(result["formation_energy"] / [5, 2])
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+from screening import Candidate, Pipeline
+
+
+def make_pipeline(count, delay=0.0, fail=(), **kwargs):
+    evaluating = {"now": 0, "max": 0}
+
+    async def fetch(emit):
+        for i in range(count):
+            yield Candidate(f"c{i}", "Fe2O3", structure=None)
+
+    async def evaluate(candidate):
+        evaluating["now"] += 1
+        evaluating["max"] = max(evaluating["max"], evaluating["now"])
+        try:
+            await asyncio.sleep(delay)
+            if candidate.id in fail:
+                raise ValueError("no model")
+            return {"success": True, "energy": -1.0}
+        finally:
+            evaluating["now"] -= 1
+
+    async def place(candidate, result, emit):
+        await emit({"event": "placed", "id": candidate.id, "success": result["success"]})
+
+    return Pipeline(fetch, evaluate, place, **kwargs), evaluating
+
+
+async def collect(pipeline):
+    return [event async for event in pipeline.run()]
+
+
+def test_every_candidate_is_placed_once():
+    pipeline, _ = make_pipeline(20, fail={"c3"}, workers=3, queue_size=2)
+    events = asyncio.run(collect(pipeline))
+    assert sorted(e["id"] for e in events) == sorted(f"c{i}" for i in range(20))
+    assert [e["id"] for e in events if not e["success"]] == ["c3"]
+    report = pipeline.stage_report()
+    assert report["place"]["items"] == 20
+    assert all(report[stage]["max_queue"] <= 2 for stage in ("evaluate", "place"))
+
+
+def test_workers_evaluate_concurrently():
+    pipeline, evaluating = make_pipeline(8, delay=0.05, workers=4)
+    start = time.perf_counter()
+    asyncio.run(collect(pipeline))
+    assert evaluating["max"] == 4
+    assert time.perf_counter() - start < 0.3  # 8 x 0.05 s one at a time
+
+
+def test_deadline_stops_the_stages():
+    pipeline, evaluating = make_pipeline(100, delay=0.05, deadline=time.time() + 0.2)
+    events = asyncio.run(collect(pipeline))
+    assert pipeline.deadline_exceeded
+    assert events[-1]["event"] == "deadline"
+    assert 0 < len(events) - 1 < 100
+    assert evaluating["now"] == 0  # in-flight evaluations were cancelled
+
+
+def test_consumer_leaving_early_cancels_the_stages():
+    async def main():
+        pipeline, evaluating = make_pipeline(100, delay=0.01)
+        stream = pipeline.run()
+        await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0.05)
+        return pipeline, evaluating
+
+    pipeline, evaluating = asyncio.run(main())
+    assert pipeline.stats["evaluate"].items < 100
+    assert evaluating["now"] == 0
@@ -0,0 +1,83 @@
+import asyncio
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_computation():
+    async def main():
+        flight, calls = SingleFlight(), []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return {"value": 42}
+
+        results = await asyncio.gather(*(flight.do("k", compute) for _ in range(5)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert flight.counters == {"leaders": 1, "joined": 4, "abandoned": 0}
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_failure_reaches_every_caller():
+    async def main():
+        flight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise ValueError("bad input")
+
+        return await asyncio.gather(*(flight.do("k", compute) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(main()))
+
+
+def test_leaving_caller_keeps_computation_for_the_others():
+    async def main():
+        flight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("k", compute))
+        second = asyncio.ensure_future(flight.do("k", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return flight, await second
+
+    flight, result = asyncio.run(main())
+    assert result == "done"
+    assert flight.counters["abandoned"] == 0
+
+
+def test_last_caller_leaving_cancels_computation():
+    async def main():
+        flight, state = SingleFlight(), {"finished": False, "cancelled": False}
+
+        async def compute():
+            try:
+                await asyncio.sleep(1)
+                state["finished"] = True
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+
+        callers = [asyncio.ensure_future(flight.do("k", compute)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+
+        async def again():
+            return "fresh"
+
+        return flight, state, await flight.do("k", again)
+
+    flight, state, result = asyncio.run(main())
+    assert state == {"finished": False, "cancelled": True}
+    assert flight.counters["abandoned"] == 1
+    assert result == "fresh"
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from pymatgen.core import Lattice, Structure
+from pymatgen.io.cif import CifWriter
+
+from structure_store import CompactStructure, StructureStore, UnknownHandleError, upload_handle
+
+
+def disordered():
+    structure = Structure(Lattice.hexagonal(3.1, 5.0), [{"Fe2+": 0.5, "Ni2+": 0.5}, "O2-", "O2-"],
+                          [[0, 0, 0], [1 / 3, 2 / 3, 0.25], [2 / 3, 1 / 3, 0.75]])
+    structure.add_site_property("magmom", [2.0, 0.0, 0.0])
+    return structure
+
+
+def test_compact_round_trip_keeps_occupancies_and_properties():
+    structure = disordered()
+    back = CompactStructure.from_structure(structure).to_structure()
+    assert back == structure
+    assert back.site_properties == {"magmom": [2.0, 0.0, 0.0]}
+    assert [site.species for site in back] == [site.species for site in structure]
+
+
+def test_compact_form_is_smaller_than_the_cif():
+    structure = Structure(Lattice.cubic(10.0), ["Si"] * 500, np.random.default_rng(0).random((500, 3)))
+    compact = CompactStructure.from_structure(structure)
+    assert compact.species_index.dtype == np.int16
+    assert compact.nbytes < len(str(CifWriter(structure)))
+
+
+def test_lru_eviction_within_the_byte_budget():
+    compact = CompactStructure.from_structure(disordered())
+    store = StructureStore(max_bytes=3 * compact.nbytes)
+    for handle in ("a", "b", "c"):
+        store.put(handle, compact, "fp", "FeO")
+    store.record("a")  # a becomes most recent, so b is evicted next
+    store.put("d", compact, "fp", "FeO")
+    assert store.record("b") is None
+    assert all(store.record(h) is not None for h in ("a", "c", "d"))
+    assert store.stats()["memory_bytes"] == 3 * compact.nbytes
+    with pytest.raises(UnknownHandleError):
+        store.load("b")
+
+
+def test_structure_over_the_budget_is_rejected():
+    compact = CompactStructure.from_structure(disordered())
+    with pytest.raises(ValueError):
+        StructureStore(max_bytes=compact.nbytes - 1).put("a", compact, "fp", "FeO")
+
+
+def test_handles_are_content_addressed():
+    assert upload_handle("data_x\n", "cif") == upload_handle("  data_x  ", "cif")
+    assert upload_handle("data_x", "cif") != upload_handle("data_x", "poscar")
+
+
+def test_handle_upload_is_reused_by_analysis(app_client):
+    cif = str(CifWriter(Structure.from_spacegroup("Fm-3m", Lattice.cubic(5.64), ["Na", "Cl"],
+                                                  [[0, 0, 0], [0.5, 0.5, 0.5]])))
+    first = app_client.post("/structures", json={"content": cif}).json()
+    again = app_client.post("/structures", json={"content": cif}).json()
+    assert (first["reused"], again["reused"]) == (False, True)
+    assert first["handle"] == again["handle"]
+
+    by_handle = app_client.post("/analyze/cif", json={"structure_handle": first["handle"]}).json()
+    assert by_handle["formula"] == "NaCl"
+    assert app_client.delete(f"/structures/{first['handle']}").status_code == 200
+    assert app_client.post("/analyze/cif", json={"structure_handle": first["handle"]}).status_code == 404
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from trajectory import TrajectoryStore, TrajectoryWriter, count_frames, read_frames, read_meta
+
+N_ATOMS = 3
+
+
+def write(path, n_frames, capacity=None):
+    writer = TrajectoryWriter(str(path), N_ATOMS, capacity or n_frames, {"ensemble": "nvt"})
+    for step in range(n_frames):
+        writer.append(
+            step=step, time_fs=step * 0.5, potential_energy_eV=-step, kinetic_energy_eV=0.1,
+            temperature_K=300.0, volume_A3=10.0, cell=np.eye(3),
+            positions=np.full((N_ATOMS, 3), step, dtype=float), forces=np.zeros((N_ATOMS, 3)),
+        )
+    return writer
+
+
+@pytest.mark.parametrize("start, stop, stride", [(0, None, 1), (2, 9, 3), (-4, None, 1), (0, None, 7), (5, 2, 1)])
+def test_slices_follow_python_semantics(tmp_path, start, stop, stride):
+    path = tmp_path / "run.npy"
+    write(path, 12).close()
+    frames = read_frames(str(path), start, stop, stride, fields=["step", "positions"])
+    expected = list(range(12))[start:stop:stride]
+    assert frames["indices"].tolist() == expected
+    assert frames["step"].tolist() == expected
+    assert frames["positions"].shape == (len(expected), N_ATOMS, 3)
+    assert count_frames(12, start, stop, stride) == len(expected)
+
+
+def test_only_completed_frames_are_readable(tmp_path):
+    path = tmp_path / "run.npy"
+    writer = write(path, 4, capacity=10)
+    writer.close(status="cancelled")
+    assert read_meta(str(path))["n_frames"] == 4
+    assert read_frames(str(path), fields=["step"])["step"].tolist() == [0, 1, 2, 3]
+
+
+def test_oversized_selection_is_rejected_before_reading(tmp_path):
+    path = tmp_path / "run.npy"
+    write(path, 50).close()
+    with pytest.raises(ValueError, match="50 frames requested"):
+        read_frames(str(path), max_frames=10)
+    assert len(read_frames(str(path), stride=5, max_frames=10)["indices"]) == 10
+
+
+def test_unknown_fields_and_bad_stride(tmp_path):
+    path = tmp_path / "run.npy"
+    write(path, 2).close()
+    with pytest.raises(ValueError, match="Unknown fields"):
+        read_frames(str(path), fields=["velocities"])
+    with pytest.raises(ValueError):
+        read_frames(str(path), stride=0)
+
+
+def test_store_prunes_unknown_jobs(tmp_path):
+    store = TrajectoryStore(str(tmp_path))
+    write(store.path("aa"), 1).close()
+    write(store.path("bb"), 1).close()
+    store.prune(keep=["aa"])
+    assert store.exists("aa") and not store.exists("bb")
+    with pytest.raises(ValueError):
+        store.path("../etc")
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from pymatgen.core import Lattice, Structure
+
+from wire import decode, encode, negotiate, request_format, structure_arrays, structure_from_dict
+
+
+def zno():
+    return Structure(Lattice.hexagonal(3.25, 5.2), ["Zn", "Zn", "O", "O"],
+                     [[1 / 3, 2 / 3, 0], [2 / 3, 1 / 3, 0.5], [1 / 3, 2 / 3, 0.38], [2 / 3, 1 / 3, 0.88]])
+
+
+def test_structure_arrays_round_trip():
+    structure = zno()
+    data = structure_arrays(structure)
+    assert data["numbers"] == [30, 30, 8, 8]
+    back = structure_from_dict(data)
+    assert np.allclose(back.lattice.matrix, structure.lattice.matrix)
+    assert np.allclose(back.cart_coords, structure.cart_coords)
+    assert structure_from_dict(structure.as_dict()) == structure
+
+
+def test_frac_coords_and_symbols_are_accepted():
+    back = structure_from_dict({"lattice": np.eye(3) * 4.0, "species": ["Na", "Cl"],
+                                "frac_coords": [[0, 0, 0], [0.5, 0.5, 0.5]]})
+    assert back.composition.reduced_formula == "NaCl"
+    with pytest.raises(ValueError):
+        structure_from_dict({"lattice": np.eye(3), "numbers": [1, 1], "positions": [[0, 0, 0]]})
+
+
+def test_disordered_structure_has_no_array_form():
+    with pytest.raises(ValueError):
+        structure_arrays(Structure(Lattice.cubic(3.0), [{"Fe": 0.5, "Ni": 0.5}], [[0, 0, 0]]))
+
+
+@pytest.mark.parametrize("fmt", ["msgpack", "npz"])
+def test_encode_decode_round_trip(fmt):
+    payload = {"formula": "ZnO", "energy": -9.5, "tags": ["a", "b"], "empty": [],
+               "structure": structure_arrays(zno()),
+               "frames": [{"forces": [[0.1, 0.0, -0.1]] * 4}, {"forces": [[0.0, 0.2, 0.0]] * 4}]}
+    back = decode(encode(payload, fmt), fmt)
+    assert back["formula"] == "ZnO" and back["energy"] == -9.5
+    assert back["tags"] == ["a", "b"] and list(back["empty"]) == []
+    positions = back["structure"]["positions"]
+    assert isinstance(positions, np.ndarray) and positions.dtype == np.float64 and positions.shape == (4, 3)
+    assert np.array_equal(positions, zno().cart_coords)
+    assert back["structure"]["numbers"].tolist() == [30, 30, 8, 8]
+    assert np.array_equal(back["frames"][1]["forces"], [[0.0, 0.2, 0.0]] * 4)
+
+
+def test_plain_npz_decodes_to_named_arrays():
+    import io
+
+    buffer = io.BytesIO()
+    np.savez(buffer, positions=np.zeros((2, 3)))
+    assert decode(buffer.getvalue(), "npz")["positions"].shape == (2, 3)
+
+
+def test_negotiation():
+    assert request_format("application/msgpack; charset=binary") == "msgpack"
+    assert request_format("application/json") is None
+    assert negotiate("application/x-npz") == "npz"
+    assert negotiate("application/json, application/x-npz;q=0.5") is None
+    assert negotiate("application/json;q=0.5, application/msgpack") == "msgpack"
+    assert negotiate("application/msgpack, */*") is None  # JSON wins ties
+    assert negotiate(None) is None
+
+
+def test_binary_request_and_response(app_client):
+    body = encode({"structure_dict": structure_arrays(zno()), "format": "cif"}, "msgpack")
+    response = app_client.post("/structures", content=body, headers={"Content-Type": "application/msgpack",
+                                                                     "Accept": "application/x-npz"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-npz"
+    assert response.headers["vary"] == "Accept"
+    assert decode(response.content, "npz")["formula"] == "ZnO"
+
+    bad = app_client.post("/structures", content=b"\xc1", headers={"Content-Type": "application/msgpack"})
+    assert bad.status_code == 400
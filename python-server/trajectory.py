@@ -0,0 +1,158 @@
+"""
+Memory-mapped MD trajectories
+Each run preallocates one .npy file of fixed-size frames (step, time,
+energies, temperature, volume, cell, positions, forces) and writes frames
+in place as it advances; a small JSON sidecar records the metadata and
+how many frames are complete. Readers slice the mapping, so serving a
+range of frames never loads the whole file, and clients can np.load the
+file with mmap_mode="r" themselves
+"""
+
+import json
+import os
+import re
+import shutil
+import time
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+SCALAR_FIELDS = ("step", "time_fs", "potential_energy_eV", "kinetic_energy_eV", "temperature_K", "volume_A3")
+ARRAY_FIELDS = ("cell", "positions", "forces")
+FIELDS = SCALAR_FIELDS + ARRAY_FIELDS
+
+META_FLUSH_INTERVAL = 0.5  # seconds between frame-count updates while running
+
+
+def frame_dtype(n_atoms: int) -> np.dtype:
+    """One trajectory frame; forces are stored as float32 to halve the file"""
+    return np.dtype([
+        ("step", "<i8"),
+        ("time_fs", "<f8"),
+        ("potential_energy_eV", "<f8"),
+        ("kinetic_energy_eV", "<f8"),
+        ("temperature_K", "<f8"),
+        ("volume_A3", "<f8"),
+        ("cell", "<f8", (3, 3)),
+        ("positions", "<f8", (n_atoms, 3)),
+        ("forces", "<f4", (n_atoms, 3)),
+    ])
+
+
+def trajectory_bytes(n_atoms: int, n_frames: int) -> int:
+    return frame_dtype(n_atoms).itemsize * n_frames
+
+
+def _write_json(path: str, data: dict):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class TrajectoryWriter:
+    """Fills a preallocated trajectory frame by frame (runs wherever the dynamics run)"""
+
+    def __init__(self, path: str, n_atoms: int, n_frames: int, meta: dict):
+        self.path = path
+        self.meta_path = path + ".json"
+        self.frames = np.lib.format.open_memmap(path, mode="w+", dtype=frame_dtype(n_atoms), shape=(n_frames,))
+        self.meta = {**meta, "n_atoms": n_atoms, "capacity": n_frames, "n_frames": 0, "complete": False}
+        self._flushed_at = 0.0
+        _write_json(self.meta_path, self.meta)
+
+    @property
+    def n_frames(self) -> int:
+        return self.meta["n_frames"]
+
+    def append(self, **values):
+        """Write the next frame; values are keyed by field name"""
+        frame = self.frames[self.n_frames]
+        for name in FIELDS:
+            frame[name] = values[name]
+        self.meta["n_frames"] += 1
+        now = time.monotonic()
+        if now - self._flushed_at >= META_FLUSH_INTERVAL:
+            self._flushed_at = now
+            _write_json(self.meta_path, self.meta)  # frame data is already visible through the page cache
+
+    def close(self, **meta):
+        self.frames.flush()
+        self.meta.update(meta, complete=True)
+        _write_json(self.meta_path, self.meta)
+        del self.frames
+
+
+def read_meta(path: str) -> dict:
+    with open(path + ".json") as f:
+        return json.load(f)
+
+
+def count_frames(n_frames: int, start: int = 0, stop: Optional[int] = None, stride: int = 1) -> int:
+    """Frames selected by start:stop:stride out of n_frames, without touching the data"""
+    return len(range(n_frames)[start:stop:stride])
+
+
+def read_frames(path: str, start: int = 0, stop: Optional[int] = None, stride: int = 1,
+                fields: Sequence[str] = FIELDS, max_frames: Optional[int] = None) -> dict:
+    """
+    Frames start:stop:stride of the completed ones, one array per field.
+    Only the selected frames and fields are copied out of the mapping, and
+    a selection over max_frames is rejected before anything is copied
+    """
+    unknown = set(fields) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))} (available: {', '.join(FIELDS)})")
+    if stride < 1:
+        raise ValueError("stride must be at least 1")
+    meta = read_meta(path)
+    n = count_frames(meta["n_frames"], start, stop, stride)
+    if max_frames is not None and n > max_frames:
+        raise ValueError(f"{n} frames requested (limit {max_frames}); use stride or a smaller range")
+    frames = np.load(path, mmap_mode="r")[:meta["n_frames"]]
+    selected = frames[start:stop:stride]
+    return {
+        "indices": np.arange(meta["n_frames"])[start:stop:stride],
+        **{name: np.array(selected[name]) for name in fields},
+    }
+
+
+class TrajectoryStore:
+    """Trajectory files under one directory, named by job ID"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, job_id: str) -> str:
+        if not re.fullmatch(r"[0-9a-f]+", job_id):
+            raise ValueError(f"Invalid job ID: {job_id}")
+        return os.path.join(self.directory, f"{job_id}.npy")
+
+    def exists(self, job_id: str) -> bool:
+        return os.path.exists(self.path(job_id) + ".json")
+
+    def job_ids(self) -> List[str]:
+        return [name[:-len(".npy.json")] for name in os.listdir(self.directory) if name.endswith(".npy.json")]
+
+    def delete(self, job_id: str):
+        for path in (self.path(job_id), self.path(job_id) + ".json"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def prune(self, keep: Iterable[str]):
+        """Delete trajectories of jobs no longer in the job history"""
+        keep = set(keep)
+        for job_id in self.job_ids():
+            if job_id not in keep:
+                self.delete(job_id)
+
+    def stats(self) -> dict:
+        ids = self.job_ids()
+        size = sum(os.path.getsize(self.path(i)) for i in ids if os.path.exists(self.path(i)))
+        return {
+            "directory": self.directory,
+            "trajectories": len(ids),
+            "bytes": size,
+            "free_bytes": shutil.disk_usage(self.directory).free,
+        }
@@ -0,0 +1,263 @@
+"""
+Binary structure transport
+Structures travel as arrays (lattice, cartesian positions, atomic numbers)
+and numeric results (forces, stress) as typed arrays instead of CIF text
+or nested JSON lists. Bodies are msgpack or npz, picked by Content-Type
+for requests and by Accept for responses; JSON stays the default
+"""
+
+import importlib.util
+import io
+import json
+from typing import Callable, Optional
+
+import numpy as np
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+from fastapi.routing import APIRoute
+
+MEDIA_TYPES = {
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/x-npz": "npz",
+}
+RESPONSE_MEDIA_TYPES = {"msgpack": "application/msgpack", "npz": "application/x-npz"}
+
+_ARRAY = "__ndarray__"
+_NPZ_META = "__meta__"
+
+
+class UnsupportedMediaError(ValueError):
+    """Raised for a binary format whose codec is not installed"""
+
+
+def msgpack_available() -> bool:
+    return importlib.util.find_spec("msgpack") is not None
+
+
+# ============ Structures ============
+
+def structure_arrays(structure) -> dict:
+    """Array form of an ordered structure (lists, so it also serializes as JSON)"""
+    if not structure.is_ordered:
+        raise ValueError("Array transport needs an ordered structure (no partial occupancies)")
+    return {
+        "lattice": structure.lattice.matrix.tolist(),
+        "numbers": [site.specie.Z for site in structure],
+        "positions": structure.cart_coords.tolist(),
+    }
+
+
+def structure_from_dict(data: dict):
+    """
+    Structure from a structure_dict: either a pymatgen Structure.as_dict()
+    or the array form (lattice plus numbers or species, and positions or
+    frac_coords)
+    """
+    from pymatgen.core import Lattice, Structure
+
+    if "sites" in data:
+        return Structure.from_dict(data)
+    if "lattice" not in data:
+        raise ValueError("structure_dict needs a lattice")
+    species = data.get("numbers", data.get("species"))
+    if species is None:
+        raise ValueError("structure_dict needs numbers or species")
+    species = [int(z) for z in species] if np.issubdtype(np.asarray(species).dtype, np.integer) else list(species)
+    if "positions" in data:
+        coords, cartesian = data["positions"], True
+    elif "frac_coords" in data:
+        coords, cartesian = data["frac_coords"], False
+    else:
+        raise ValueError("structure_dict needs positions or frac_coords")
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+    if len(coords) != len(species):
+        raise ValueError(f"structure_dict has {len(species)} species but {len(coords)} positions")
+    return Structure(Lattice(np.asarray(data["lattice"], dtype=np.float64).reshape(3, 3)), species, coords,
+                     coords_are_cartesian=cartesian)
+
+
+# ============ Codecs ============
+
+def _to_arrays(value):
+    """Numeric (nested) lists become ndarrays; everything else is kept"""
+    if isinstance(value, dict):
+        return {k: _to_arrays(v) for k, v in value.items()}
+    if isinstance(value, list):
+        if value and not isinstance(value[0], (dict, str)):
+            try:
+                array = np.asarray(value)
+            except ValueError:  # ragged
+                array = None
+            if array is not None and array.dtype.kind in "biuf":
+                return array
+        return [_to_arrays(v) for v in value]
+    return value
+
+
+def _to_lists(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {k: _to_lists(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_lists(v) for v in value]
+    return value
+
+
+def _pack_array(array: np.ndarray) -> dict:
+    array = np.ascontiguousarray(array)
+    return {_ARRAY: {"dtype": array.dtype.str, "shape": list(array.shape), "data": array.tobytes()}}
+
+
+def _msgpack_default(value):
+    if isinstance(value, np.ndarray):
+        return _pack_array(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _msgpack_hook(obj: dict):
+    spec = obj.get(_ARRAY)
+    if isinstance(spec, dict) and "data" in spec:
+        return np.frombuffer(spec["data"], dtype=np.dtype(spec["dtype"])).reshape(spec["shape"])
+    return obj
+
+
+def _split_npz(value, path: str, arrays: dict):
+    """Replace arrays in value with references to npz members"""
+    if isinstance(value, np.ndarray):
+        arrays[path] = value
+        return {_ARRAY: path}
+    if isinstance(value, dict):
+        return {k: _split_npz(v, f"{path}/{k}" if path else str(k), arrays) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_split_npz(v, f"{path}/{i}", arrays) for i, v in enumerate(value)]
+    return _to_lists(value)
+
+
+def _join_npz(value, arrays):
+    if isinstance(value, dict):
+        if set(value) == {_ARRAY}:
+            return arrays[value[_ARRAY]]
+        return {k: _join_npz(v, arrays) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_join_npz(v, arrays) for v in value]
+    return value
+
+
+def encode(payload: dict, fmt: str) -> bytes:
+    """Serialize a JSON-style payload; numeric lists are sent as typed arrays"""
+    payload = _to_arrays(payload)
+    if fmt == "msgpack":
+        if not msgpack_available():
+            raise UnsupportedMediaError("msgpack is not installed")
+        import msgpack
+        return msgpack.packb(payload, default=_msgpack_default, use_bin_type=True)
+
+    arrays = {}
+    meta = _split_npz(payload, "", arrays)
+    buffer = io.BytesIO()
+    np.savez(buffer, **{_NPZ_META: np.array(json.dumps(meta))}, **arrays)
+    return buffer.getvalue()
+
+
+def decode(body: bytes, fmt: str) -> dict:
+    """Inverse of encode; arrays come back as ndarrays"""
+    if fmt == "msgpack":
+        if not msgpack_available():
+            raise UnsupportedMediaError("msgpack is not installed")
+        import msgpack
+        return msgpack.unpackb(body, object_hook=_msgpack_hook, raw=False)
+
+    with np.load(io.BytesIO(body), allow_pickle=False) as archive:
+        arrays = {name: archive[name] for name in archive.files}
+    meta = arrays.pop(_NPZ_META, None)
+    if meta is None:  # plain npz of named arrays
+        return arrays
+    return _join_npz(json.loads(str(meta)), arrays)
+
+
+# ============ Content negotiation ============
+
+def request_format(content_type: Optional[str]) -> Optional[str]:
+    """Binary format of a request body, None for JSON"""
+    if not content_type:
+        return None
+    return MEDIA_TYPES.get(content_type.split(";")[0].strip().lower())
+
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    """Binary format the client prefers over JSON, if any"""
+    best, best_q = None, 0.0
+    for part in (accept or "").split(","):
+        media, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        fmt = MEDIA_TYPES.get(media.lower())
+        if fmt == "msgpack" and not msgpack_available():
+            continue
+        if media.lower() in ("application/json", "*/*", "application/*") and q >= best_q:
+            best, best_q = None, q  # JSON wins ties
+        elif fmt and q > best_q:
+            best, best_q = fmt, q
+    return best
+
+
+def response_format(request: Request) -> Optional[str]:
+    """Binary response format negotiated for this request (see WireRoute)"""
+    return getattr(request.state, "wire_format", None)
+
+
+class WireRoute(APIRoute):
+    """
+    Route that decodes msgpack/npz request bodies into the endpoint's JSON
+    model and encodes JSON responses as the format named in Accept
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            fmt_in = request_format(request.headers.get("content-type"))
+            if fmt_in:
+                request = await _as_json_request(request, fmt_in)
+            fmt_out = negotiate(request.headers.get("accept"))
+            request.state.wire_format = fmt_out
+
+            response = await handler(request)
+            if fmt_out is None or not 200 <= response.status_code < 300 \
+                    or response.media_type != "application/json":
+                return response
+            headers = {k: v for k, v in response.headers.items() if k not in ("content-length", "content-type")}
+            headers["Vary"] = "Accept"
+            return Response(encode(json.loads(response.body), fmt_out), status_code=response.status_code,
+                            media_type=RESPONSE_MEDIA_TYPES[fmt_out], headers=headers)
+
+        return route_handler
+
+
+async def _as_json_request(request: Request, fmt: str) -> Request:
+    try:
+        payload = _to_lists(decode(await request.body(), fmt))
+    except UnsupportedMediaError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode {fmt} body: {e}")
+    body = json.dumps(payload).encode()
+    scope = dict(request.scope)
+    scope["headers"] = [(k, v) for k, v in request.scope["headers"] if k not in (b"content-type", b"content-length")]
+    scope["headers"] += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request(scope, receive)